@@ -1,7 +1,20 @@
-__all__ = ['avro_object', 'avro_tools']
+__all__ = ['avro_object', 'avro_tools', 'avro_batch', 'avro_reader',
+           'json_backend', 'schema_registry', 'avro_bulk',
+           'avro_async', 'avro_index', 'avro_columns',
+           'schema_inference', 'avro_codec', 'instrumentation']
 
+from .avro_async import AvroAsync
+from .avro_batch import AvroBatch, available_codecs
+from .avro_bulk import convert_many
+from .avro_codec import AvroCodec
+from .avro_columns import AvroColumns, StringColumn
+from .avro_index import AvroIndex
 from .avro_object import AvroObject
+from .avro_reader import AvroReader
 from .avro_tools import AvroTools
+from .instrumentation import Instrumentation
+from .schema_inference import SchemaInference
+from .schema_registry import SchemaRegistry
 
 name = 'avro_object'
 version = '0.9.1'
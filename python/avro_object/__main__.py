@@ -0,0 +1,60 @@
+"""
+Command line interface
+
+python -m avro_object convert --schema delivery.avsc --out-dir out --workers 4 --codec deflate *.json
+"""
+import argparse
+import sys
+
+from .avro_bulk import convert_many
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='avro_object',
+        description='Helper tools for (de)serialization of objects using Apache Avro')
+    commands = parser.add_subparsers(dest='command')
+
+    convert = commands.add_parser(
+        'convert', help='Convert JSON files to Avro containers')
+    convert.add_argument('sources', nargs='+', help='JSON files')
+    convert.add_argument('--schema', required=True,
+                         help='Avro schema (file, URL or JSON)')
+    convert.add_argument('--out-dir', required=True, help='Output folder')
+    convert.add_argument('--workers', type=int, default=None,
+                         help='Number of processes (default: CPU count)')
+    convert.add_argument('--block-size', type=int, default=1000,
+                         help='Records per Avro block')
+    convert.add_argument('--validate', default='eager',
+                         choices=['eager', 'on_write', 'none'],
+                         help='Validation policy')
+    convert.add_argument('--codec', default='null',
+                         help='Compression codec (null, deflate, bzip2, xz, '
+                              'snappy, zstandard, lz4)')
+
+    args = parser.parse_args(args)
+    if args.command != 'convert':
+        parser.print_help()
+        return 2
+
+    try:
+        results = convert_many(args.sources, args.schema, args.out_dir,
+                               args.workers, args.block_size, args.validate,
+                               args.codec)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    failures = 0
+    for result in results:
+        if result['error']:
+            failures += 1
+            print(f"{result['source']}: {result['error']}", file=sys.stderr)
+        else:
+            print(f"{result['source']} -> {result['output']}: "
+                  f"{result['records']} records, {len(result['errors'])} errors")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
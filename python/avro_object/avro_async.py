@@ -0,0 +1,68 @@
+import asyncio
+import functools
+import weakref
+
+from .avro_tools import AvroTools
+
+
+class AvroAsync:
+    """
+    asyncio helpers for AvroObject
+
+    Blocking work (file reads, HTTP requests, encoding and decoding) is
+    offloaded to the event loop default executor, limited to concurrency
+    simultaneous calls per event loop.
+    """
+    concurrency = 16
+    _semaphores = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def set_concurrency(cls, concurrency: int):
+        """
+        Set the limit of simultaneous executor calls (for new event loops)
+
+        :param concurrency: maximum simultaneous calls
+        """
+        cls.concurrency = max(int(concurrency), 1)
+        cls._semaphores = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def _semaphore(cls, loop) -> asyncio.Semaphore:
+        semaphore = cls._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = cls._semaphores[loop] = asyncio.Semaphore(
+                cls.concurrency)
+        return semaphore
+
+    @classmethod
+    async def run(cls, func, *args, **kwargs):
+        """
+        Run blocking function in the executor, respecting the concurrency limit
+
+        :param func: function
+        :return: function result
+        """
+        loop = asyncio.get_event_loop()
+        async with cls._semaphore(loop):
+            return await loop.run_in_executor(
+                None, functools.partial(func, *args, **kwargs))
+
+    @classmethod
+    async def fetch_json(cls, source: str, json_backend: str = None) -> tuple:
+        '''Load JSON from various medium without blocking the event loop
+
+        :param source: string JSON, file name, URL, another registered source by add_fetch_method
+        :rtype: tuple (bool Success, parsed object or error message, origin, str JSON)
+        '''
+        return await cls.run(AvroTools.fetch_json_object, source, json_backend)
+
+    @classmethod
+    async def fetch_schema(cls, source) -> tuple:
+        '''Load and parse schema (using the schema cache) without blocking the event loop
+
+        :param source: dict, string JSON, file name, URL
+        :rtype: tuple (bool Success, parsed schema or error message, origin)
+        '''
+        if not isinstance(source, str):
+            return AvroTools.fetch_schema(source)
+        return await cls.run(AvroTools.fetch_schema, source)
@@ -0,0 +1,240 @@
+import io
+
+from fastavro import validate as validate_data
+from fastavro.write import Writer
+
+from .avro_tools import VALIDATION_POLICIES, AvroTools
+
+# Blocks are flushed by record count, so the byte based interval must never
+# be reached before block_size records are written
+_NO_SYNC_INTERVAL = 1 << 62
+
+CODECS = ('null', 'deflate', 'bzip2', 'xz', 'snappy', 'zstandard', 'lz4')
+_available_codecs = None
+
+
+def available_codecs() -> list:
+    """
+    :return: Codecs supported by fastavro with the installed compression libraries
+    :rtype: list
+    """
+    global _available_codecs
+    if _available_codecs is None:
+        codecs = []
+        for codec in CODECS:
+            try:
+                write_container(io.BytesIO(), 'null', [None], codec=codec)
+                codecs.append(codec)
+            except ValueError:
+                pass
+        _available_codecs = codecs
+    return list(_available_codecs)
+
+
+def write_container(fo, schema, records, block_size: int = 1000,
+                    codec: str = 'null', compression_level: int = None,
+                    validator: bool = False) -> int:
+    """
+    Write records as one Avro container, with block_size records per block
+
+    :param fo: binary file object
+    :param schema: parsed schema
+    :param records: iterable of records
+    :param block_size: number of records per Avro block
+    :param codec: compression codec ('null', 'deflate', 'bzip2', 'xz', 'snappy', 'zstandard', 'lz4')
+    :param compression_level: codec compression level (None for codec default)
+    :param validator: validate records while writing
+    :return: number of written records
+    :rtype: int
+    """
+    block_size = max(int(block_size), 1)
+    avro_writer = Writer(fo, schema, codec=codec,
+                         sync_interval=_NO_SYNC_INTERVAL,
+                         validator=validator,
+                         compression_level=compression_level)
+    count = 0
+    for record in records:
+        avro_writer.write(record)
+        count += 1
+        if count % block_size == 0:
+            avro_writer.flush()
+    avro_writer.flush()
+    return count
+
+
+def valid_records(records, schema, errors: dict):
+    """
+    Iterate over records valid against the schema
+
+    :param records: iterable of records
+    :param schema: parsed schema
+    :param errors: dict filled with invalid records errors, by record index
+    :return: generator of valid records
+    """
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors[index] = 'Record is not a dict'
+            continue
+        try:
+            validate_data(record, schema)
+        except Exception as e:
+            errors[index] = f'Schema error: {e}'
+            continue
+        yield record
+
+
+def write_records(fo, records, schema, block_size: int = 1000,
+                  validate: str = 'eager', codec: str = 'null',
+                  compression_level: int = None) -> tuple:
+    """
+    Stream records into one Avro container, without holding them in memory
+
+    :param fo: binary file object
+    :param records: iterable of records
+    :param schema: parsed schema
+    :param block_size: number of records per Avro block
+    :param validate: validation policy: 'eager' (invalid records are left out and reported), 'on_write' (by the Avro writer, failing on the first invalid record) or 'none'
+    :param codec: compression codec (see available_codecs)
+    :param compression_level: codec compression level (None for codec default)
+    :return: (number of written records, errors of invalid records by index)
+    :rtype: tuple
+    """
+    errors = {}
+    if validate == 'eager':
+        records = valid_records(records, schema, errors)
+    count = write_container(fo, schema, records, block_size, codec,
+                            compression_level, validate == 'on_write')
+    return count, errors
+
+
+class AvroBatch:
+    """
+    Helper class for batches of records sharing the same schema
+
+    Every record is validated individually: invalid records are reported by
+    index in errors and left out of the serialized data, instead of failing
+    the whole batch.
+
+    :param records: iterable of dicts
+    :param schema: Avro schema
+    :param block_size: number of records per Avro block
+    :param validate: validation policy: 'eager' (each record on creation), 'on_write' (by the Avro writer, failing the whole batch) or 'none'
+    :type schema: JSON as string, Dict object, Filename/URL as string with JSON content
+    """
+
+    def __init__(self, records, schema, block_size: int = 1000,
+                 validate: str = 'eager'):
+        self._last_error = None
+        self._schema = None
+        self._schema_origin = None
+        self._records = []
+        self._errors = {}
+        self._avro_data = None
+        self._block_size = max(int(block_size), 1)
+        self._validate = validate
+        self._ok = False
+
+        if validate not in VALIDATION_POLICIES:
+            self._last_error = f'Invalid validation policy: {validate}'
+            return
+
+        success, schema, origin = AvroTools.fetch_schema(schema)
+        if not success:
+            self._last_error = schema
+            return
+        self._schema = schema
+        self._schema_origin = origin
+
+        if validate != 'eager':
+            self._records = list(records)
+            self._ok = True
+            return
+
+        try:
+            self._records = list(valid_records(records, self._schema,
+                                               self._errors))
+        except Exception as e:
+            self._last_error = f'Records reading error: {e}'
+            return
+
+        self._ok = True
+
+    def __len__(self):
+        return len(self._records)
+
+    def write(self, fo, codec: str = 'null', compression_level: int = None) -> int:
+        """
+        Write valid records as one Avro container into a binary file object
+
+        :param fo: binary file object
+        :param codec: compression codec (see available_codecs)
+        :param compression_level: codec compression level (None for codec default)
+        :return: number of written records
+        :rtype: int
+        """
+        return write_container(fo, self._schema, self._records,
+                               self._block_size, codec, compression_level,
+                               self._validate == 'on_write')
+
+    def to_avro(self, codec: str = 'null', compression_level: int = None):
+        """
+        :param codec: compression codec (see available_codecs)
+        :param compression_level: codec compression level (None for codec default)
+        :return: AVRO bytes serialized data with all valid records
+        :rtype: bytes
+        """
+        default = codec == 'null' and compression_level is None
+        if not self._ok or (default and self._avro_data):
+            return self._avro_data
+
+        avro_data = None
+        try:
+            out = io.BytesIO()
+            self.write(out, codec, compression_level)
+            avro_data = out.getvalue()
+        except Exception as e:
+            self._last_error = f'Avro serialization error: {e}'
+
+        if default:
+            self._avro_data = avro_data
+        return avro_data
+
+    @property
+    def data(self):
+        """
+        :return: Valid records
+        :rtype: list
+        """
+        return self._records
+
+    @property
+    def errors(self):
+        """
+        :return: Error messages of invalid records, by record index
+        :rtype: dict
+        """
+        return self._errors
+
+    @property
+    def schema_origin(self):
+        """
+        :return: Source of schema (str, file, URL)
+        :rtype: str
+        """
+        return self._schema_origin
+
+    @property
+    def ok(self):
+        """
+        :return: Avro Batch successfull creation
+        :rtype: bool
+        """
+        return self._ok
+
+    @property
+    def last_error(self):
+        """
+        :return: Last error message
+        :rtype: str
+        """
+        return self._last_error
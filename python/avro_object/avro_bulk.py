@@ -0,0 +1,122 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .avro_batch import available_codecs, write_records
+from .avro_tools import VALIDATION_POLICIES, AvroTools
+
+# Parsed schema of the worker process, set once by _init_worker
+_worker_schema = None
+
+
+def _init_worker(schema):
+    global _worker_schema
+    _worker_schema = schema
+
+
+def _output_name(source: str, out_dir: str) -> str:
+    name = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(out_dir, f'{name}.avro')
+
+
+def convert_file(source: str, schema, out_dir: str, block_size: int = 1000,
+                 validate: str = 'eager', codec: str = 'null') -> dict:
+    """
+    Convert one JSON file to an Avro container, streaming its records
+
+    The source is parsed incrementally (JSON Lines, concatenated JSON values,
+    a JSON array or a single object, see AvroTools.stream_json) and written
+    block by block, so memory usage doesn't depend on the size of the file.
+
+    :param source: JSON file name
+    :param schema: Avro schema
+    :param out_dir: output folder (the output file has the source name with .avro extension)
+    :param block_size: number of records per Avro block
+    :param validate: validation policy ('eager', 'on_write', 'none')
+    :param codec: compression codec (see available_codecs)
+    :return: {'source', 'output', 'records', 'errors', 'error'}
+    :rtype: dict
+    """
+    result = {'source': source, 'output': None,
+              'records': 0, 'errors': {}, 'error': None}
+
+    success, schema, _ = AvroTools.fetch_schema(schema)
+    if not success:
+        result['error'] = schema
+        return result
+    if validate not in VALIDATION_POLICIES:
+        result['error'] = f'Invalid validation policy: {validate}'
+        return result
+
+    if not os.path.isfile(source):
+        result['error'] = f'File not found: {source}'
+        return result
+    success, values, _ = AvroTools.stream_json(source)
+    if not success:
+        result['error'] = values
+        return result
+
+    output = _output_name(source, out_dir)
+    try:
+        with open(output, 'wb') as fo:
+            result['records'], result['errors'] = write_records(
+                fo, values, schema, block_size, validate, codec)
+        result['output'] = output
+    except Exception as e:
+        result['error'] = f'Avro serialization error: {e}'
+        if os.path.isfile(output):
+            os.remove(output)
+    return result
+
+
+def _convert_worker(source: str, out_dir: str, block_size: int,
+                    validate: str, codec: str) -> dict:
+    return convert_file(source, _worker_schema, out_dir, block_size, validate,
+                        codec)
+
+
+def convert_many(sources, schema, out_dir: str, workers: int = None,
+                 block_size: int = 1000, validate: str = 'eager',
+                 codec: str = 'null') -> list:
+    """
+    Convert JSON files to Avro containers using a pool of processes
+
+    The schema is parsed once and shipped once to each worker process.
+    Sources must have distinct output names (source name without folder and
+    extension), otherwise ValueError is raised before converting any file.
+
+    :param sources: iterable of JSON file names
+    :param schema: Avro schema (JSON as string, Dict object, Filename/URL)
+    :param out_dir: output folder (created when missing)
+    :param workers: number of processes (None for CPU count, 1 for current process)
+    :param block_size: number of records per Avro block
+    :param validate: validation policy ('eager', 'on_write', 'none')
+    :param codec: compression codec (see available_codecs)
+    :return: results by source, in sources order (see convert_file)
+    :rtype: list
+    """
+    success, schema, _ = AvroTools.fetch_schema(schema)
+    if not success:
+        raise ValueError(f'Invalid schema: {schema}')
+    if codec not in available_codecs():
+        raise ValueError(f'Unavailable codec: {codec}')
+    sources = list(sources)
+    outputs = {}
+    for source in sources:
+        output = os.path.normcase(_output_name(source, out_dir))
+        if output in outputs:
+            raise ValueError(f'Sources {outputs[output]} and {source} '
+                             f'have the same output file: {output}')
+        outputs[output] = source
+    os.makedirs(out_dir, exist_ok=True)
+
+    if workers == 1 or len(sources) <= 1:
+        return [convert_file(source, schema, out_dir, block_size, validate,
+                             codec)
+                for source in sources]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(schema,)) as executor:
+        futures = [executor.submit(_convert_worker, source, out_dir,
+                                   block_size, validate, codec)
+                   for source in sources]
+        return [future.result() for future in futures]
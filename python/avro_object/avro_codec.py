@@ -0,0 +1,295 @@
+import io
+import json
+import os
+import threading
+
+from fastavro import parse_schema, schemaless_reader, schemaless_writer
+from fastavro import validate as validate_data
+from fastavro.schema import extract_logical_type, extract_record_type
+from fastavro.write import LOGICAL_WRITERS, Writer
+
+from .avro_batch import write_container
+from .avro_reader import SYNC_SIZE
+from .avro_tools import SINGLE_OBJECT_MAGIC, AvroTools
+
+_IDENTITY_TYPES = ('null', 'boolean', 'int', 'long', 'float', 'double',
+                   'string')
+
+
+def _long_bytes(value: int) -> bytes:
+    """
+    Zigzag varint encoding of a long
+    """
+    value = (value << 1) ^ (value >> 63)
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+class AvroCodec:
+    """
+    Precompiled encoder/decoder of one schema, for hot loops
+
+    Everything schema-dependent is prepared once: the parsed schema and its
+    named types, the single-object header, the container header (each
+    container gets its own random sync marker), and a converter of records
+    to the Avro JSON encoding (replacing the symbol parser of fastavro's
+    json_writer). Codecs hold no per-record
+    state, so they can be shared by threads and AvroObject instances (see
+    for_schema).
+
+    :param schema: Avro schema (JSON as string, Dict object, Filename/URL)
+    """
+    _codecs = {}
+    _lock = threading.Lock()
+
+    def __init__(self, schema):
+        if not isinstance(schema, dict) or '__fastavro_parsed' not in schema:
+            success, parsed, _ = AvroTools.fetch_schema(schema)
+            if not success:
+                raise ValueError(f'Invalid schema: {parsed}')
+            schema = parsed
+        self.schema = schema
+        self._named_schemas = {}
+        parse_schema(schema, self._named_schemas)
+        self._named_converters = {}
+        self._to_json_value = self._converter(schema)
+
+        out = io.BytesIO()
+        Writer(out, schema)
+        # Container header without its sync marker (random per container)
+        self._header = out.getvalue()[:-SYNC_SIZE]
+        self._single_object_header = SINGLE_OBJECT_MAGIC + \
+            AvroTools.schema_fingerprint(schema)
+
+    @classmethod
+    def for_schema(cls, schema) -> 'AvroCodec':
+        """
+        Codec of a parsed schema, shared by every caller of the same schema object
+
+        Parsed schemas are shared by the schema cache, so codecs are memoized
+        by schema identity (keeping a reference to avoid id reuse).
+
+        :param schema: parsed schema
+        :rtype: AvroCodec
+        """
+        entry = cls._codecs.get(id(schema))
+        if entry is not None and entry.schema is schema:
+            return entry
+
+        codec = cls(schema)
+        with cls._lock:
+            if len(cls._codecs) >= AvroTools.schema_cache.max_size:
+                cls._codecs.clear()
+            cls._codecs[id(schema)] = codec
+        return codec
+
+    def encode(self, record) -> bytes:
+        """
+        :param record: record (or datum) of the schema
+        :return: schemaless Avro datum
+        :rtype: bytes
+        """
+        out = io.BytesIO()
+        schemaless_writer(out, self.schema, record)
+        return out.getvalue()
+
+    def encode_single_object(self, record) -> bytes:
+        """
+        :param record: record (or datum) of the schema
+        :return: schemaless Avro datum with single-object encoding header
+        :rtype: bytes
+        """
+        return self._single_object_header + self.encode(record)
+
+    def decode(self, data):
+        """
+        :param data: schemaless Avro datum (bytes or binary file object)
+        :return: decoded record (or datum)
+        """
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = io.BytesIO(data)
+        return schemaless_reader(data, self.schema)
+
+    def to_json(self, record) -> str:
+        """
+        :param record: record (or datum) of the schema
+        :return: record in Avro JSON encoding (as written by fastavro's json_writer)
+        :rtype: str
+        """
+        return json.dumps(self._to_json_value(record))
+
+    def to_container(self, records, block_size: int = 1000,
+                     codec: str = 'null', compression_level: int = None,
+                     validator: bool = False) -> bytes:
+        """
+        Records as one Avro container, with the precompiled header and a new sync marker
+
+        :param records: list of records
+        :param block_size: number of records per Avro block
+        :param codec: compression codec (other than 'null' written by fastavro)
+        :param compression_level: codec compression level (None for codec default)
+        :param validator: validate records before encoding
+        :rtype: bytes
+        """
+        if codec != 'null':
+            out = io.BytesIO()
+            write_container(out, self.schema, records, block_size, codec,
+                            compression_level, validator)
+            return out.getvalue()
+
+        block_size = max(int(block_size), 1)
+        sync_marker = os.urandom(SYNC_SIZE)
+        parts = [self._header, sync_marker]
+        for start in range(0, len(records), block_size):
+            block = records[start:start + block_size]
+            if validator:
+                for record in block:
+                    validate_data(record, self.schema)
+            data = b''.join([self.encode(record) for record in block])
+            parts += [_long_bytes(len(block)), _long_bytes(len(data)), data,
+                      sync_marker]
+        return b''.join(parts)
+
+    def _converter(self, schema):
+        """
+        Compile the conversion of values of the schema to Avro JSON values
+        """
+        record_type = extract_record_type(schema)
+        logical_type = extract_logical_type(schema)
+        prepare = LOGICAL_WRITERS.get(logical_type) if logical_type else None
+
+        if record_type in _IDENTITY_TYPES:
+            convert = None
+        elif record_type in ('bytes', 'fixed'):
+            def convert(datum):
+                return datum.decode('iso-8859-1')
+        elif record_type == 'enum':
+            symbols = schema['symbols']
+
+            def convert(datum):
+                return symbols[symbols.index(datum)]
+        elif record_type == 'array':
+            items = self._converter(schema['items'])
+            if items is None:
+                def convert(datum):
+                    return list(datum)
+            else:
+                def convert(datum):
+                    return [items(item) for item in datum]
+        elif record_type == 'map':
+            values = self._converter(schema['values'])
+            if values is None:
+                def convert(datum):
+                    return dict(datum)
+            else:
+                def convert(datum):
+                    return {key: values(value) for key, value in datum.items()}
+        elif record_type in ('record', 'error'):
+            convert = self._record_converter(schema)
+        elif record_type in ('union', 'error_union'):
+            convert = self._union_converter(schema)
+        else:
+            convert = self._named_converter(record_type)
+
+        if prepare is None:
+            return convert
+        if convert is None:
+            return lambda datum: prepare(datum, schema)
+        return lambda datum: convert(prepare(datum, schema))
+
+    def _named_converter(self, name: str):
+        # Named types are compiled once, and resolved on first use (recursive types)
+        def convert(datum):
+            converter = self._named_converters.get(name)
+            if converter is None:
+                converter = self._converter(self._named_schemas[name]) \
+                    or (lambda value: value)
+                self._named_converters[name] = converter
+            return converter(datum)
+        return convert
+
+    def _record_converter(self, schema):
+        fields = []
+        for field in schema['fields']:
+            field_type = field['type']
+            required = 'default' not in field and 'null' not in field_type
+            fields.append((field['name'], self._converter(field_type),
+                           field.get('default'), required))
+
+        def convert(datum):
+            record = {}
+            for name, field_convert, default, required in fields:
+                if required and name not in datum:
+                    raise ValueError(f'no value and no default for {name}')
+                value = datum.get(name, default)
+                record[name] = value if field_convert is None \
+                    else field_convert(value)
+            return record
+        return convert
+
+    def _union_converter(self, schema):
+        candidates = []
+        for candidate in schema:
+            candidate_type = extract_record_type(candidate)
+            if candidate_type in ('record', 'error', 'enum', 'fixed'):
+                name = candidate['name']
+            else:
+                name = candidate_type
+            label = candidate.get('name', candidate.get('type')) \
+                if isinstance(candidate, dict) else candidate
+            # Candidates are validated as the field of a parsed record, so
+            # the public validate resolves named types
+            branch = {'type': 'record', 'name': '__AvroCodecBranch',
+                      'fields': [{'name': 'value', 'type': candidate}],
+                      '__fastavro_parsed': True,
+                      '__named_schemas': self._named_schemas}
+            candidates.append((branch, candidate_type, name,
+                               label if candidate_type != 'null' else None,
+                               self._converter(candidate)))
+
+        def select(datum):
+            # Same choice of branch as fastavro's write_union
+            if isinstance(datum, tuple):
+                name, datum = datum
+                for candidate in candidates:
+                    if candidate[2] == name:
+                        return candidate, datum
+                raise ValueError(f'provided union type name {name} not found '
+                                 f'in schema {schema}')
+            best, most_fields, could_be_float = None, -1, False
+            for candidate in candidates:
+                candidate_type = candidate[1]
+                if could_be_float:
+                    if candidate_type == 'double':
+                        return candidate, datum
+                    continue
+                if not validate_data({'value': datum}, candidate[0],
+                                     raise_errors=False):
+                    continue
+                if candidate_type == 'record':
+                    record = candidate[0]['fields'][0]['type']
+                    if not isinstance(record, dict):
+                        record = self._named_schemas[record]
+                    fields = len({field['name'] for field in
+                                  record['fields']}.intersection(datum))
+                    if fields > most_fields:
+                        best, most_fields = candidate, fields
+                elif candidate_type == 'float':
+                    best, could_be_float = candidate, True
+                else:
+                    return candidate, datum
+            if best is None:
+                raise ValueError(f'{datum!r} (type {type(datum)}) do not '
+                                 f'match {schema}')
+            return best, datum
+
+        def convert(datum):
+            (_, _, _, label, candidate_convert), datum = select(datum)
+            if candidate_convert is not None:
+                datum = candidate_convert(datum)
+            return datum if label is None else {label: datum}
+        return convert
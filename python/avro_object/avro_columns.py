@@ -0,0 +1,892 @@
+import bz2
+import io
+import lzma
+import zlib
+from collections.abc import Mapping
+from itertools import islice
+
+from fastavro.write import Writer
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .avro_batch import write_container
+from .avro_reader import AvroReader
+from .avro_tools import VALIDATION_POLICIES, AvroTools
+
+# NumPy dtypes of Avro primitive types (other types are stored as objects)
+NUMPY_TYPES = {
+    'int': 'int32',
+    'long': 'int64',
+    'float': 'float32',
+    'double': 'float64',
+    'boolean': 'bool',
+}
+
+# Representations of string columns: Python str objects or Arrow-style
+# buffers (utf-8 data + offsets)
+STRING_POLICIES = ('object', 'offsets')
+
+# Size of float and double values
+_FIXED_SIZES = {'float': 4, 'double': 8}
+
+# Zero bytes after decoded blocks (reads of a union index and a value
+# starting at the block end stay in range)
+_BLOCK_PADDING = 32
+
+
+def _deflate(data: bytes, level: int) -> bytes:
+    # Raw deflate stream (no zlib header and Adler-32 trailer), as the spec requires
+    compressor = zlib.compressobj(-1 if level is None else level,
+                                  zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+# Block compression of the vectorized encoder (other codecs are written
+# row by row by fastavro)
+_BLOCK_COMPRESSORS = {
+    'null': lambda data, level: data,
+    'deflate': _deflate,
+    'bzip2': lambda data, level: bz2.compress(data, 9 if level is None else level),
+    'xz': lambda data, level: lzma.compress(data, preset=level),
+}
+
+_INT_RANGES = {'int32': (-(1 << 31), (1 << 31) - 1),
+               'int64': (-(1 << 63), (1 << 63) - 1)}
+
+
+def _require_numpy():
+    if numpy is None:
+        raise ImportError('numpy is required for columnar data: '
+                          'pip install avro-object-furlan[numpy]')
+
+
+def column_type(field_type) -> tuple:
+    """
+    Column type of an Avro field type
+
+    :param field_type: parsed Avro type
+    :return: (column type: NumPy dtype name, 'string' or 'object', bool nullable)
+    :rtype: tuple
+    """
+    nullable = False
+    if isinstance(field_type, list) and len(field_type) == 2 \
+            and 'null' in field_type:
+        nullable = True
+        field_type = field_type[1] if field_type[0] == 'null' else field_type[0]
+    if isinstance(field_type, dict):
+        if 'logicalType' in field_type:
+            return 'object', nullable
+        field_type = field_type['type']
+    if not isinstance(field_type, str):
+        return 'object', nullable
+    if field_type == 'string':
+        return 'string', nullable
+    return NUMPY_TYPES.get(field_type, 'object'), nullable
+
+
+class StringColumn:
+    """
+    Arrow-style string column: utf-8 data in one buffer, value i is
+    data[offsets[i]:offsets[i + 1]]
+
+    :param data: utf-8 encoded values
+    :param offsets: int64 array with len(column) + 1 offsets
+    """
+
+    def __init__(self, data: bytes, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError(f'Index out of range: {index}')
+        return self.data[self.offsets[index]:self.offsets[index + 1]].decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @classmethod
+    def from_values(cls, values) -> 'StringColumn':
+        """
+        :param values: iterable of str (None is stored as an empty string, for masked values of nullable columns)
+        :rtype: StringColumn
+        """
+        _require_numpy()
+        encoded = [b'' if value is None else value.encode('utf-8')
+                   for value in values]
+        offsets = numpy.zeros(len(encoded) + 1, dtype='int64')
+        numpy.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return cls(b''.join(encoded), offsets)
+
+    @classmethod
+    def concatenate(cls, columns: list) -> 'StringColumn':
+        """
+        :param columns: list of StringColumn
+        :rtype: StringColumn
+        """
+        offsets = [numpy.zeros(1, dtype='int64')]
+        base = 0
+        for column in columns:
+            offsets.append(column.offsets[1:] + base)
+            base += len(column.data)
+        return cls(b''.join(column.data for column in columns),
+                   numpy.concatenate(offsets))
+
+
+def _varints(values) -> tuple:
+    """
+    Zigzag varint encoding of integers
+
+    :param values: int64 array
+    :return: (uint8 matrix with one encoded value per row, lengths)
+    :rtype: tuple
+    """
+    values = values.astype('int64')
+    rest = ((values << 1) ^ (values >> 63)).view('uint64')
+    matrix = numpy.zeros((len(values), 10), dtype='uint8')
+    lengths = numpy.ones(len(values), dtype='int64')
+    seven = numpy.uint64(7)
+    for width in range(1, 11):
+        matrix[:, width - 1] = rest & numpy.uint64(0x7F)
+        rest = rest >> seven
+        more = rest != 0
+        if not more.any():
+            break
+        matrix[more, width - 1] |= 0x80
+        lengths += more
+    return matrix[:, :width], lengths
+
+
+def _encode_long(value: int) -> bytes:
+    matrix, lengths = _varints(numpy.array([value], dtype='int64'))
+    return matrix[0, :lengths[0]].tobytes()
+
+
+def _assemble(segments: list, count: int) -> bytes:
+    """
+    Interleave encoded field segments into row-wise Avro data
+
+    :param segments: list of (uint8 matrix, lengths) for values with one row
+        per record, or (uint8 data, offsets, lengths) for variable-size values
+    :param count: number of records
+    :rtype: bytes
+    """
+    row_sizes = numpy.zeros(count, dtype='int64')
+    for segment in segments:
+        row_sizes += segment[-1]
+    positions = numpy.cumsum(row_sizes) - row_sizes
+    out = numpy.empty(int(row_sizes.sum()), dtype='uint8')
+
+    for segment in segments:
+        lengths = segment[-1]
+        if len(segment) == 2:
+            matrix = segment[0]
+            columns = numpy.arange(matrix.shape[1])
+            used = columns < lengths[:, None]
+            out[(positions[:, None] + columns)[used]] = matrix[used]
+        else:
+            data, offsets, _ = segment
+            total = int(lengths.sum())
+            if total:
+                # Position of each byte inside its value
+                inside = numpy.arange(total) - numpy.repeat(
+                    numpy.cumsum(lengths) - lengths, lengths)
+                out[numpy.repeat(positions, lengths) + inside] = \
+                    data[numpy.repeat(offsets[:-1], lengths) + inside]
+        positions += lengths
+    return out.tobytes()
+
+
+class _FieldEncoder:
+    """
+    Vectorized encoder of one record field from a column
+
+    :param field: parsed record field
+    :param column: NumPy array, StringColumn or list
+    :param mask: validity (True for non-null values), None for non-nullable fields
+    :param null_index: union branch index of null (nullable fields)
+    :param validate: check column types and ranges
+    """
+
+    def __init__(self, field: dict, column, mask, null_index: int,
+                 validate: bool):
+        self.name = field['name']
+        self.dtype, self.nullable = column_type(field['type'])
+        self.avro_type = field['type'] if not self.nullable else \
+            field['type'][1 - null_index]
+        if isinstance(self.avro_type, dict):
+            self.avro_type = self.avro_type['type']
+        self.null_index = null_index
+        self.mask = mask
+        self.column = column
+        if isinstance(column, StringColumn):
+            return
+
+        if not isinstance(column, numpy.ndarray) or column.dtype == object:
+            values = list(column)
+            if not self.nullable:
+                if any(value is None for value in values):
+                    raise ValueError(
+                        f'Column {self.name}: null in non-nullable field')
+            elif self.mask is None:
+                self.mask = numpy.fromiter(
+                    (value is not None for value in values), 'bool', len(values))
+            if self.dtype == 'string':
+                self.column = values
+                return
+            if self.nullable:
+                # Null values are encoded by the union index only
+                zero = self.dtype != 'bool' and 0
+                values = [zero if value is None else value for value in values]
+            self.column = numpy.array(values, dtype=self.dtype)
+
+        if validate:
+            self._validate()
+
+    def _validate(self):
+        kind = self.column.dtype.kind
+        if self.dtype == 'bool' and kind != 'b':
+            raise ValueError(f'Column {self.name}: booleans expected')
+        if self.dtype in ('int32', 'int64') and kind not in 'iu':
+            raise ValueError(f'Column {self.name}: integers expected')
+        if self.dtype in ('float32', 'float64') and kind not in 'iuf':
+            raise ValueError(f'Column {self.name}: numbers expected')
+        # Range of int columns, and of unsigned arrays of long columns
+        if (self.dtype == 'int32' or kind == 'u') and self.dtype in _INT_RANGES \
+                and len(self.column):
+            values = self.column if self.mask is None else self.column[self.mask]
+            low, high = _INT_RANGES[self.dtype]
+            if len(values) and (int(values.min()) < low or int(values.max()) > high):
+                kind_name = 'int' if self.dtype == 'int32' else 'long'
+                raise ValueError(
+                    f'Column {self.name}: values out of {kind_name} range')
+
+    def segments(self, start: int, stop: int) -> list:
+        """
+        :return: encoded segments of the records [start, stop)
+        :rtype: list
+        """
+        count = stop - start
+        segments = []
+        valid = None
+        if self.nullable:
+            valid = numpy.ones(count, dtype='bool') if self.mask is None \
+                else numpy.asarray(self.mask[start:stop], dtype='bool')
+            index = numpy.where(valid, 1 - self.null_index, self.null_index)
+            segments.append(((index * 2).astype('uint8')[:, None],
+                             numpy.ones(count, dtype='int64')))
+
+        if self.dtype == 'string':
+            column = self.column
+            if isinstance(column, StringColumn):
+                offsets = column.offsets[start:stop + 1]
+                data = numpy.frombuffer(column.data, dtype='uint8')
+            else:
+                try:
+                    column = StringColumn.from_values(column[start:stop])
+                except AttributeError:
+                    raise ValueError(f'Column {self.name}: strings expected')
+                offsets = column.offsets
+                data = numpy.frombuffer(column.data, dtype='uint8')
+            lengths = numpy.diff(offsets)
+            if valid is not None:
+                lengths = lengths * valid
+            matrix, sizes = _varints(lengths)
+            if valid is not None:
+                sizes = sizes * valid
+            segments.append((matrix, sizes))
+            segments.append((data, offsets, lengths))
+            return segments
+
+        values = self.column[start:stop]
+        if self.avro_type in ('int', 'long'):
+            matrix, lengths = _varints(values)
+        elif self.avro_type == 'boolean':
+            matrix = values.astype('uint8')[:, None]
+            lengths = numpy.ones(count, dtype='int64')
+        else:
+            dtype = '<f4' if self.avro_type == 'float' else '<f8'
+            matrix = values.astype(dtype).view('uint8').reshape(count, -1)
+            lengths = numpy.full(count, matrix.shape[1], dtype='int64')
+        if valid is not None:
+            lengths = lengths * valid
+        segments.append((matrix, lengths))
+        return segments
+
+
+class _Block:
+    """
+    Encoded records of a block, with the zigzag varint starting at each
+    position (decoded once for the whole block)
+
+    Byte positions past the records are clipped to the block size, so the
+    tables of positions can be composed by indexing.
+
+    :param data: decompressed block data
+    """
+
+    def __init__(self, data):
+        self.size = len(data)
+        self.buffer = numpy.zeros(self.size + _BLOCK_PADDING, dtype='uint8')
+        self.buffer[:self.size] = numpy.frombuffer(data, dtype='uint8')
+        self.positions = numpy.arange(len(self.buffer))
+        # Last byte of the varint at each position (the padding ends them)
+        ends = numpy.where(self.buffer < 0x80, self.positions, len(self.buffer))
+        ends = numpy.minimum.accumulate(ends[::-1])[::-1]
+        # Varints are at most 10 bytes long (clipped at invalid positions)
+        extra = numpy.minimum(ends - self.positions, 9)
+        value = (self.buffer & 0x7F).astype('int64')
+        # Only the values with more bytes are read on each step
+        more = numpy.flatnonzero(extra)
+        byte = 1
+        while len(more):
+            value[more] |= (self.buffer[more + byte] & 0x7F).astype('int64') \
+                << 7 * byte
+            more = more[extra[more] > byte]
+            byte += 1
+        # Zigzag decoding (logical shift of the unsigned value)
+        self.values = ((value >> 1) & _INT_RANGES['int64'][1]) ^ -(value & 1)
+        self.after = self.positions + extra + 1
+        self._tables = {}
+
+    def table(self, avro_type: str):
+        """
+        :param avro_type: primitive type name
+        :return: position after a value starting at each position
+        :rtype: numpy.ndarray
+        """
+        table = self._tables.get(avro_type)
+        if table is None:
+            if avro_type in ('int', 'long'):
+                table = self.after
+            elif avro_type == 'string':
+                table = self.after + numpy.clip(self.values, 0, self.size)
+            else:
+                table = self.positions + _FIXED_SIZES.get(avro_type, 1)
+            table = numpy.minimum(table, self.size)
+            self._tables[avro_type] = table
+        return table
+
+
+class _FieldDecoder:
+    """
+    Vectorized decoder of one record field into a column
+
+    Fields are decoded for all records of a block at once, from the record
+    positions found with the skip tables (see _decode_block).
+
+    :param field: parsed record field (numeric, boolean or string, or nullable union of them)
+    :param strings: string columns as 'object' arrays or 'offsets' (StringColumn)
+    """
+
+    def __init__(self, field: dict, strings: str):
+        self.name = field['name']
+        self.dtype, self.nullable = column_type(field['type'])
+        self.null_index = field['type'].index('null') if self.nullable else 0
+        self.avro_type = field['type'] if not self.nullable else \
+            field['type'][1 - self.null_index]
+        if isinstance(self.avro_type, dict):
+            self.avro_type = self.avro_type['type']
+        self.strings = strings
+
+    def skip(self, block: _Block, positions):
+        """
+        :param positions: array of positions, or slice of positions
+        :return: positions after the field starting at positions
+        """
+        table = block.table(self.avro_type)
+        if not self.nullable:
+            return table[positions]
+        after_index = block.table('long')[positions]
+        return numpy.where(block.values[positions] != self.null_index,
+                           table[after_index], after_index)
+
+    def decode(self, block: _Block, positions) -> tuple:
+        """
+        :return: (column chunk, validity mask or None, positions after the field)
+        :rtype: tuple
+        """
+        mask = None
+        if self.nullable:
+            index = block.values[positions]
+            if ((index != 0) & (index != 1)).any():
+                raise ValueError(f'Field {self.name}: invalid union index')
+            mask = index != self.null_index
+            positions = block.after[positions]
+            values, positions[mask] = self._decode_value(block,
+                                                         positions[mask])
+        else:
+            values, positions = self._decode_value(block, positions)
+
+        if self.avro_type == 'string':
+            return self._strings(values, mask), mask, positions
+        if mask is not None:
+            column = numpy.zeros(len(mask), dtype=self.dtype)
+            column[mask] = values
+            values = column
+        return values, mask, positions
+
+    def _decode_value(self, block: _Block, positions) -> tuple:
+        if self.avro_type in ('int', 'long'):
+            return (block.values[positions].astype(self.dtype),
+                    block.after[positions])
+        if self.avro_type == 'boolean':
+            return block.buffer[positions] != 0, positions + 1
+        if self.avro_type == 'string':
+            lengths = block.values[positions]
+            starts = block.after[positions]
+            after = starts + lengths
+            if len(lengths) and (lengths.min() < 0 or after.max() > block.size):
+                raise ValueError(f'Field {self.name}: invalid string length')
+            total = int(lengths.sum())
+            # Position of each byte inside its value
+            inside = numpy.arange(total) - numpy.repeat(
+                numpy.cumsum(lengths) - lengths, lengths)
+            data = block.buffer[numpy.repeat(starts, lengths) + inside]
+            return (lengths, data.tobytes()), after
+        size = _FIXED_SIZES[self.avro_type]
+        values = block.buffer[positions[:, None] + numpy.arange(size)]
+        values = values.view('<f4' if size == 4 else '<f8').reshape(-1)
+        return values.astype(self.dtype), positions + size
+
+    def _strings(self, values: tuple, mask):
+        lengths, data = values
+        if mask is not None:
+            # Null values are empty strings of the buffer
+            all_lengths = numpy.zeros(len(mask), dtype='int64')
+            all_lengths[mask] = lengths
+            lengths = all_lengths
+        offsets = numpy.zeros(len(lengths) + 1, dtype='int64')
+        numpy.cumsum(lengths, out=offsets[1:])
+        column = StringColumn(data, offsets)
+        if self.strings == 'offsets':
+            return column
+
+        chunk = numpy.empty(len(column), dtype='object')
+        text = data.decode('utf-8')
+        if len(text) == len(data):
+            # ASCII data: character offsets are byte offsets
+            bounds = offsets.tolist()
+            chunk[:] = [text[bounds[i]:bounds[i + 1]]
+                        for i in range(len(column))]
+        else:
+            chunk[:] = list(column)
+        if mask is not None:
+            chunk[~mask] = None
+        return chunk
+
+
+def _decode_block(decoders: list, data, count: int) -> list:
+    """
+    Decode the records of a block into column chunks
+
+    Record positions depend on the sizes of the previous records, so the
+    position after a record starting at every byte of the block is computed
+    first (vectorized), and the positions of the records are found by
+    chaining these positions; then each field is decoded for all records at
+    once.
+
+    :param decoders: list of _FieldDecoder of all record fields
+    :param data: decompressed block data
+    :param count: number of records
+    :return: list of (column chunk, validity mask or None), by decoder
+    :rtype: list
+    """
+    block = _Block(data)
+    # Records take at least one byte
+    if count > block.size:
+        raise ValueError('Invalid block: records do not match the block size')
+    # Slice of all positions (a view of the tables of the first field)
+    following = slice(0, block.size + 1)
+    for decoder in decoders:
+        following = decoder.skip(block, following)
+
+    # Record starts by pointer doubling: jump is the position after `step`
+    # records starting at each position, doubled up to about sqrt(count)
+    starts = numpy.zeros(count, dtype='int64')
+    jump = following
+    known = step = 1
+    while known < count:
+        new = min(step, count - known)
+        starts[known:known + new] = jump[starts[known - step:known - step + new]]
+        known += new
+        if known < count and step * step < count:
+            jump = jump[jump]
+            step *= 2
+    if count and (starts[-1] >= block.size
+                  or following[starts[-1]] != block.size):
+        raise ValueError('Invalid block: records do not match the block size')
+
+    chunks = []
+    positions = starts
+    for decoder in decoders:
+        column, mask, positions = decoder.decode(block, positions)
+        chunks.append((column, mask))
+    # Fields decoded from the record starts end at the next record
+    if count and (positions[:-1] != starts[1:]).any():
+        raise ValueError('Invalid block: records do not match the block size')
+    return chunks
+
+
+class _RowView(Mapping):
+    """
+    Mapping view of one row of columns (the row is selected by index)
+    """
+    __slots__ = ('_columns', '_masks', 'index')
+
+    def __init__(self, columns: dict, masks: dict):
+        self._columns = columns
+        self._masks = masks
+        self.index = 0
+
+    def __getitem__(self, name):
+        mask = self._masks.get(name)
+        if mask is not None and not mask[self.index]:
+            return None
+        return self._columns[name][self.index]
+
+    def get(self, name, default=None):
+        if name not in self._columns:
+            return default
+        return self[name]
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+
+class _ColumnBuilder:
+    """
+    Accumulates chunks of records as column chunks
+    """
+
+    def __init__(self, name: str, dtype: str, nullable: bool, strings: str):
+        self.name = name
+        self.dtype = dtype
+        self.nullable = nullable
+        self.strings = strings
+        self.chunks = []
+        self.masks = []
+
+    def add(self, records: list):
+        name = self.name
+        values = [record.get(name) for record in records]
+        if self.nullable:
+            self.masks.append(numpy.fromiter(
+                (value is not None for value in values), 'bool', len(values)))
+        if self.dtype == 'string' and self.strings == 'offsets':
+            self.chunks.append(StringColumn.from_values(values))
+        elif self.dtype in ('string', 'object'):
+            chunk = numpy.empty(len(values), dtype='object')
+            chunk[:] = values
+            self.chunks.append(chunk)
+        elif self.nullable:
+            zero = self.dtype != 'bool' and 0
+            self.chunks.append(numpy.fromiter(
+                (zero if value is None else value for value in values),
+                self.dtype, len(values)))
+        else:
+            self.chunks.append(numpy.fromiter(values, self.dtype, len(values)))
+
+    def column(self):
+        if self.dtype == 'string' and self.strings == 'offsets':
+            return StringColumn.concatenate(self.chunks)
+        dtype = 'object' if self.dtype == 'string' else self.dtype
+        if not self.chunks:
+            return numpy.empty(0, dtype=dtype)
+        return numpy.concatenate(self.chunks)
+
+    def mask(self):
+        if not self.masks:
+            return numpy.empty(0, dtype='bool')
+        return numpy.concatenate(self.masks)
+
+
+class AvroColumns:
+    """
+    Columnar data of records
+
+    Numeric and boolean fields are stored as NumPy arrays, strings as object
+    arrays or StringColumn buffers, and other types (records, arrays, maps,
+    enums, logical types) as object arrays. Nullable fields (union of null
+    and one type) have a validity mask (True for non-null values), and null
+    values are stored as zero/empty values.
+
+    :param columns: dict of column name -> array
+    :param validity: dict of column name -> bool array, for nullable columns
+    :param schema: parsed record schema of the columns
+    """
+
+    def __init__(self, columns: dict, validity: dict = None, schema=None):
+        self.columns = columns
+        self.validity = validity or {}
+        self.schema = schema
+
+    def __len__(self):
+        for column in self.columns.values():
+            return len(column)
+        return 0
+
+    def __getitem__(self, name: str):
+        return self.columns[name]
+
+    def __contains__(self, name: str):
+        return name in self.columns
+
+    @property
+    def names(self) -> list:
+        """
+        :return: column names
+        :rtype: list
+        """
+        return list(self.columns)
+
+    @staticmethod
+    def _builders(schema, fields: list, strings: str) -> list:
+        if strings not in STRING_POLICIES:
+            raise ValueError(f'Invalid string policy: {strings}')
+        if not isinstance(schema, dict) or schema.get('type') != 'record':
+            raise ValueError('Columnar data requires a record schema')
+        builders = []
+        for field in schema['fields']:
+            if fields is None or field['name'] in fields:
+                dtype, nullable = column_type(field['type'])
+                builders.append(_ColumnBuilder(field['name'], dtype,
+                                               nullable, strings))
+        return builders
+
+    @classmethod
+    def _build(cls, records, schema, builders: list,
+               chunk_size: int) -> 'AvroColumns':
+        records = iter(records)
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            for builder in builders:
+                builder.add(chunk)
+        return cls({builder.name: builder.column() for builder in builders},
+                   {builder.name: builder.mask() for builder in builders
+                    if builder.nullable},
+                   schema)
+
+    @classmethod
+    def from_records(cls, records, schema, fields: list = None,
+                     strings: str = 'object',
+                     chunk_size: int = 4096) -> 'AvroColumns':
+        """
+        Columnar data of records
+
+        :param records: iterable of dicts
+        :param schema: record schema (JSON as string, Dict object, Filename/URL)
+        :param fields: names of exported fields (None for all fields)
+        :param strings: string columns as 'object' arrays or 'offsets' (StringColumn)
+        :param chunk_size: number of records converted at once
+        :rtype: AvroColumns
+        """
+        _require_numpy()
+        success, schema, _ = AvroTools.fetch_schema(schema)
+        if not success:
+            raise ValueError(f'Invalid schema: {schema}')
+        builders = cls._builders(schema, fields, strings)
+        return cls._build(records, schema, builders, chunk_size)
+
+    @classmethod
+    def from_avro(cls, source, fields: list = None, strings: str = 'object',
+                  reader_schema=None, chunk_size: int = 4096) -> 'AvroColumns':
+        """
+        Decode an Avro container into columns
+
+        Containers of flat records (numeric, boolean and string fields, or
+        nullable unions of them) in buffers or files are decoded block by
+        block with NumPy, without building records. Other containers (and
+        reader schemas, file objects, codecs other than null, deflate,
+        bzip2 and xz) are decoded by fastavro in chunks of chunk_size
+        records, so only one chunk of records is held in memory.
+
+        :param source: file name, bytes, bytearray, memoryview, mmap or binary file object
+        :param fields: names of exported fields (None for all fields)
+        :param strings: string columns as 'object' arrays or 'offsets' (StringColumn)
+        :param reader_schema: schema of the decoded records (None for the writer schema)
+        :param chunk_size: number of records converted at once (records decoded by fastavro)
+        :rtype: AvroColumns
+        """
+        _require_numpy()
+        with AvroReader(source, reader_schema) as avro_reader:
+            schema = avro_reader.reader_schema or avro_reader.schema
+            builders = cls._builders(schema, fields, strings)
+            decoders = cls._decoders(schema, strings) \
+                if reader_schema is None else None
+            try:
+                blocks = avro_reader.block_data() if decoders else None
+            except ValueError:
+                # File objects and codecs without block decompression
+                blocks = None
+            if blocks is None:
+                return cls._build(avro_reader, schema, builders, chunk_size)
+            return cls._decode(blocks, schema, builders, decoders)
+
+    @staticmethod
+    def _decoders(schema, strings: str) -> list:
+        decoders = []
+        for field in schema['fields']:
+            if column_type(field['type'])[0] == 'object':
+                return None
+            decoders.append(_FieldDecoder(field, strings))
+        return decoders or None
+
+    @classmethod
+    def _decode(cls, blocks, schema, builders: list,
+                decoders: list) -> 'AvroColumns':
+        exported = {builder.name: builder for builder in builders}
+        for count, data in blocks:
+            chunks = _decode_block(decoders, data, count)
+            for decoder, (column, mask) in zip(decoders, chunks):
+                builder = exported.get(decoder.name)
+                if builder is not None:
+                    builder.chunks.append(column)
+                    if mask is not None:
+                        builder.masks.append(mask)
+        return cls({builder.name: builder.column() for builder in builders},
+                   {builder.name: builder.mask() for builder in builders
+                    if builder.nullable},
+                   schema)
+
+    @classmethod
+    def from_columns(cls, columns: dict, schema,
+                     validity: dict = None) -> 'AvroColumns':
+        """
+        Columnar data from arrays, to be encoded as Avro records
+
+        :param columns: dict of field name -> NumPy array, StringColumn or list
+        :param schema: record schema (JSON as string, Dict object, Filename/URL)
+        :param validity: dict of field name -> bool array (True for non-null values), for nullable fields. Without mask, None values of lists and object arrays are nulls
+        :rtype: AvroColumns
+        """
+        _require_numpy()
+        success, schema, _ = AvroTools.fetch_schema(schema)
+        if not success:
+            raise ValueError(f'Invalid schema: {schema}')
+        if not isinstance(schema, dict) or schema.get('type') != 'record':
+            raise ValueError('Columnar data requires a record schema')
+        sizes = {len(column) for column in columns.values()}
+        sizes.update(len(mask) for mask in (validity or {}).values())
+        if len(sizes) > 1:
+            raise ValueError('Columns have different lengths')
+        return cls(columns, validity, schema)
+
+    @staticmethod
+    def _values(column, start: int, stop: int) -> list:
+        if isinstance(column, numpy.ndarray):
+            return column[start:stop].tolist()
+        if isinstance(column, StringColumn):
+            return [column[i] for i in range(start, stop)]
+        return list(column[start:stop])
+
+    def rows(self, chunk_size: int = 4096):
+        """
+        Iterate over rows as read-only Mapping views, without building dicts
+
+        The same view is reused for all rows (use dict(row) to keep a row).
+
+        :param chunk_size: number of rows converted to Python values at once
+        :return: generator of Mapping
+        """
+        count = len(self)
+        for start in range(0, count, chunk_size):
+            stop = min(start + chunk_size, count)
+            row = _RowView({name: self._values(column, start, stop)
+                            for name, column in self.columns.items()},
+                           {name: self._values(mask, start, stop)
+                            for name, mask in self.validity.items()})
+            for index in range(stop - start):
+                row.index = index
+                yield row
+
+    def to_records(self):
+        """
+        Iterate over columns as records (null values by validity masks)
+
+        :return: generator of dicts
+        """
+        for row in self.rows():
+            yield dict(row)
+
+    def _encoders(self, validate: bool) -> list:
+        encoders = []
+        for field in self.schema['fields']:
+            dtype, nullable = column_type(field['type'])
+            if dtype == 'object' or field['name'] not in self.columns:
+                return None
+            null_index = field['type'].index('null') if nullable else 0
+            encoders.append(_FieldEncoder(field, self.columns[field['name']],
+                                          self.validity.get(field['name']),
+                                          null_index, validate))
+        return encoders
+
+    def write(self, fo, block_size: int = 1000, codec: str = 'null',
+              compression_level: int = None, validate: str = 'eager') -> int:
+        """
+        Encode columns as Avro records into a binary file object
+
+        Records whose fields are all numeric, boolean or string (or nullable
+        unions of them) are encoded column by column with NumPy, and
+        interleaved into Avro blocks without creating Python objects per
+        value. Other records are written by fastavro through row views.
+
+        :param fo: binary file object
+        :param block_size: number of records per Avro block
+        :param codec: compression codec (see available_codecs)
+        :param compression_level: codec compression level (None for codec default)
+        :param validate: validation policy ('eager', 'on_write', 'none')
+        :return: number of written records
+        :rtype: int
+        """
+        if validate not in VALIDATION_POLICIES:
+            raise ValueError(f'Invalid validation policy: {validate}')
+        if self.schema is None:
+            raise ValueError('Schema is required to encode columns')
+        block_size = max(int(block_size), 1)
+        encoders = self._encoders(validate != 'none')
+        if encoders is None or codec not in _BLOCK_COMPRESSORS:
+            return write_container(fo, self.schema, self.rows(), block_size,
+                                   codec, compression_level,
+                                   validate != 'none')
+
+        compress = _BLOCK_COMPRESSORS[codec]
+        sync_marker = Writer(fo, self.schema, codec=codec).sync_marker
+        count = len(self)
+        for start in range(0, count, block_size):
+            stop = min(start + block_size, count)
+            segments = [segment for encoder in encoders
+                        for segment in encoder.segments(start, stop)]
+            data = compress(_assemble(segments, stop - start),
+                            compression_level)
+            fo.write(_encode_long(stop - start) + _encode_long(len(data)))
+            fo.write(data)
+            fo.write(sync_marker)
+        return count
+
+    def to_avro(self, block_size: int = 1000, codec: str = 'null',
+                compression_level: int = None, validate: str = 'eager') -> bytes:
+        """
+        :return: Avro container with the columns as records (see write)
+        :rtype: bytes
+        """
+        out = io.BytesIO()
+        self.write(out, block_size, codec, compression_level, validate)
+        return out.getvalue()
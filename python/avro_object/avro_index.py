@@ -0,0 +1,178 @@
+import json
+import os
+from bisect import bisect_right
+from itertools import islice
+
+from .avro_reader import AvroReader
+
+INDEX_VERSION = 1
+INDEX_EXTENSION = '.idx'
+
+
+class AvroIndex:
+    """
+    Block index of an Avro container
+
+    Records the position, record count and size of each block, so records
+    can be read by number and containers can be split in block-aligned byte
+    ranges without decoding the whole file. The index can be persisted as a
+    JSON sidecar file (container name + .idx).
+
+    :param blocks: list of (position, record count, size in bytes)
+    :param header_size: size of the container header
+    :param size: size of the container
+    :param sync_marker: sync marker of the container
+    :param mtime: modification time of the container file (ns), None for buffers
+    """
+
+    def __init__(self, blocks: list, header_size: int, size: int,
+                 sync_marker: bytes, mtime: int = None):
+        self.blocks = [tuple(block) for block in blocks]
+        self.header_size = header_size
+        self.size = size
+        self.sync_marker = sync_marker
+        self.mtime = mtime
+        self._first_records = []
+        count = 0
+        for _, block_count, _ in self.blocks:
+            self._first_records.append(count)
+            count += block_count
+        self.record_count = count
+
+    def __len__(self):
+        return self.record_count
+
+    @classmethod
+    def build(cls, source) -> 'AvroIndex':
+        """
+        Build index scanning the blocks of a container (records are not decoded)
+
+        :param source: file name, bytes, memoryview, mmap or AvroReader
+        :rtype: AvroIndex
+        """
+        if isinstance(source, AvroReader):
+            return cls(list(source.blocks()), source.header_size, source.size,
+                       source.sync_marker)
+        with AvroReader(source) as avro_reader:
+            return cls.build(avro_reader)
+
+    @classmethod
+    def for_file(cls, file_name: str, rebuild: bool = False) -> 'AvroIndex':
+        """
+        Load index from the sidecar file, building and saving it when missing or outdated
+
+        Saved indexes are used only when the container size, sync marker and
+        modification time are unchanged.
+
+        :param file_name: Avro container file name
+        :param rebuild: always build the index
+        :rtype: AvroIndex
+        """
+        index_name = file_name + INDEX_EXTENSION
+        # Taken before building, so changes while building outdate the index
+        mtime = os.stat(file_name).st_mtime_ns
+        if not rebuild and os.path.isfile(index_name):
+            try:
+                index = cls.load(index_name)
+                if index.mtime == mtime:
+                    with AvroReader(file_name) as avro_reader:
+                        if index.size == avro_reader.size \
+                                and index.sync_marker == avro_reader.sync_marker:
+                            return index
+            except (ValueError, KeyError, TypeError):
+                pass
+
+        index = cls.build(file_name)
+        index.mtime = mtime
+        index.save(index_name)
+        return index
+
+    def save(self, index_name: str):
+        """
+        Save index as JSON
+
+        :param index_name: index file name
+        """
+        with open(index_name, 'w') as f:
+            json.dump({'version': INDEX_VERSION,
+                       'size': self.size,
+                       'header_size': self.header_size,
+                       'sync': self.sync_marker.hex(),
+                       'mtime': self.mtime,
+                       'blocks': self.blocks}, f)
+
+    @classmethod
+    def load(cls, index_name: str) -> 'AvroIndex':
+        """
+        Load index saved as JSON
+
+        :param index_name: index file name
+        :rtype: AvroIndex
+        """
+        with open(index_name) as f:
+            index = json.load(f)
+        if index.get('version') != INDEX_VERSION:
+            raise ValueError(f'Unsupported index version: {index.get("version")}')
+        return cls(index['blocks'], index['header_size'], index['size'],
+                   bytes.fromhex(index['sync']), index.get('mtime'))
+
+    def block_of(self, record: int) -> int:
+        """
+        :param record: record number
+        :return: number of the block containing the record
+        :rtype: int
+        """
+        if record < 0 or record >= self.record_count:
+            raise IndexError(f'Record out of range: {record}')
+        return bisect_right(self._first_records, record) - 1
+
+    def read_records(self, source, start: int, stop: int = None):
+        """
+        Iterate over records [start, stop) decoding only the blocks containing them
+
+        :param source: file name, bytes, memoryview, mmap or AvroReader of the indexed container
+        :param start: first record number
+        :param stop: record number after the last record (None for all records)
+        :return: generator of records
+        """
+        stop = self.record_count if stop is None else min(stop, self.record_count)
+        if start >= stop:
+            return
+        if not isinstance(source, AvroReader):
+            with AvroReader(source) as avro_reader:
+                yield from self.read_records(avro_reader, start, stop)
+            return
+
+        first = self.block_of(start)
+        last = self.block_of(stop - 1)
+        position, _, _ = self.blocks[first]
+        end = self.blocks[last][0] + self.blocks[last][2]
+        skip = start - self._first_records[first]
+        yield from islice(source.read_blocks(position, end),
+                          skip, skip + stop - start)
+
+    def split(self, parts: int) -> list:
+        """
+        Split the container in block-aligned byte ranges with similar record counts
+
+        Each range can be read with AvroReader.read_range(start, end).
+
+        :param parts: maximum number of ranges
+        :return: list of (start, end) byte positions
+        :rtype: list
+        """
+        if not self.blocks:
+            return []
+        parts = max(min(parts, len(self.blocks)), 1)
+        ranges = []
+        start = self.blocks[0][0]
+        target = 1
+        for i, (position, count, size) in enumerate(self.blocks):
+            end = position + size
+            last = i == len(self.blocks) - 1
+            if last or self._first_records[i] + count >= \
+                    self.record_count * target / parts:
+                ranges.append((start, end))
+                start = end
+                target += 1
+        return ranges
@@ -1,12 +1,22 @@
+import asyncio
 import datetime
 import io
-import json
-import os
+import mmap
+from itertools import islice
 
-from fastavro import (is_avro, json_writer, parse_schema, reader, validate,
-                      writer)
+from fastavro import json_reader, reader, schemaless_reader
+from fastavro import validate as validate_data
 
-from .avro_tools import AvroTools
+from .avro_async import AvroAsync
+from .avro_batch import AvroBatch
+from .avro_codec import AvroCodec
+from .avro_columns import AvroColumns
+from .avro_reader import AvroReader
+from .avro_tools import (AVRO_MAGIC, CACHE_POLICIES, SINGLE_OBJECT_MAGIC,
+                         VALIDATION_POLICIES, AvroTools)
+from .instrumentation import Instrumentation
+from .schema_registry import (CONFLUENT_HEADER_SIZE, CONFLUENT_MAGIC,
+                              REGISTRY_PREFIX, SchemaRegistry)
 
 _json_fetch_modes = []
 
@@ -17,17 +27,43 @@ class AvroObject:
 
     :param data: (un)serialized data
     :param schema: Avro schema
+    :param datum: bytes data is a schemaless Avro datum (requires schema)
+    :param json_backend: JSON backend ('orjson', 'ujson', 'json'), None for AvroTools.json_backend
+    :param validate: validation policy against schema: 'eager' (on creation), 'on_write' (by to_avro/to_json) or 'none'
+    :param lazy: defer fetching, parsing and validation until data is accessed
+    :param cache: cache policy: 'all' (native and encoded data), 'native' (native data only) or 'encoded' (encoded data only, native data is decoded on each access)
+    :param registry: schema registry for bytes in Confluent wire format (magic byte 0 + schema ID)
+    :param reader_schema: schema of decoded Avro data (projection, defaults and promotions by Avro schema resolution), None for the writer schema
     :type data: JSON as string, Dict object, Filename/URL as string with JSON content, Avro as bytes with binary serialized content
     :type schema: JSON as string, Dict object, Filename/URL as string with JSON content
 
+    Avro bytes in single-object encoding (header C3 01 + schema fingerprint) are detected when schema is informed.
+
+    Lazy objects created from an Avro container keep the original bytes, so to_avro() forwards them without decoding.
+
     Schema creation tool: https://toolslick.com/generation/metadata/avro-schema-from-json
 
     """
 
-    def __init__(self, data, schema=None):
+    __slots__ = ('_last_error', '_object_data', '_json_data', '_avro_data',
+                 '_origin', '_schema', '_schema_origin', '_json_backend',
+                 '_validate', '_pending', '_cache', '_json_avro', '_list_data',
+                 '_reader_schema', '_ok')
+
+    def __init__(self, data, schema=None, datum: bool = False,
+                 json_backend: str = None, validate: str = 'eager',
+                 lazy: bool = False, cache: str = 'all',
+                 registry: SchemaRegistry = None, reader_schema=None):
         """
         :param data: dict, list of dicts, JSON str, file, bytes
         :param schema: dict 
+        :param datum: bytes data is a schemaless Avro datum
+        :param json_backend: JSON backend name
+        :param validate: validation policy ('eager', 'on_write', 'none')
+        :param lazy: defer loading until data is accessed
+        :param cache: cache policy ('all', 'native', 'encoded')
+        :param registry: schema registry client
+        :param reader_schema: schema of decoded Avro data
         """
         self._last_error = None     # Last error captured
         self._object_data = None
@@ -36,49 +72,196 @@ class AvroObject:
         self._origin = None
         self._schema = None
         self._schema_origin = None
+        self._json_backend = json_backend
+        self._validate = validate
+        self._pending = None
+        self._cache = cache
+        self._json_avro = False     # JSON data written by fastavro (Avro JSON encoding)
+        self._list_data = False
+        self._reader_schema = reader_schema
 
         self._ok = False
-        if schema is None:
-            self._schema = None
-        elif isinstance(schema, str):
-            try:
-                success, schema, origin = AvroTools.fetch_json(schema)
-                if success:
-                    schema = json.loads(schema)
-                    self._schema_origin = origin
-                else:
-                    schema = None
+        if validate not in VALIDATION_POLICIES:
+            self._last_error = f'Invalid validation policy: {validate}'
+            return
+        if cache not in CACHE_POLICIES:
+            self._last_error = f'Invalid cache policy: {cache}'
+            return
 
-            except Exception as e:
-                self._last_error = str(e)
-                schema = None
+        if lazy:
+            self._pending = (data, schema, datum, registry)
+            if isinstance(data, bytes) and not datum and data[:4] == AVRO_MAGIC \
+                    and reader_schema is None:
+                self._origin = 'binary_avro'
+                self._avro_data = data
+            elif isinstance(data, dict) or isinstance(data, list):
+                self._origin = type(data).__name__
+            return
+
+        self._load(data, schema, datum, registry)
+        self._apply_cache_policy()
+
+    def _ensure_loaded(self):
+        if self._pending is not None:
+            data, schema, datum, registry = self._pending
+            self._pending = None
+            self._load(data, schema, datum, registry)
+            self._apply_cache_policy()
+
+    @classmethod
+    async def create(cls, data, schema=None, **kwargs):
+        """
+        Create AvroObject without blocking the event loop
+
+        Schema and data are fetched concurrently, and parsing/validation run
+        in the executor (see AvroAsync).
+
+        :param data: dict, list of dicts, JSON str, file, bytes
+        :param schema: Avro schema
+        :param kwargs: AvroObject arguments
+        :rtype: AvroObject
+        """
+        kwargs['lazy'] = True
+        avro_object = cls(data, schema, **kwargs)
+        await avro_object.load_async()
+        return avro_object
+
+    async def load_async(self):
+        """
+        Load lazy object without blocking the event loop
+        """
+        if self._pending is None:
+            return
+        data, schema, datum, registry = self._pending
+        self._pending = None
+
+        # File names are read by _load, in the executor (Avro or JSON)
+        prefetch = isinstance(data, str) and AvroTools.fetch_json_file \
+            not in AvroTools.fetch_methods_for(data)
+        fetches = [AvroAsync.fetch_schema(schema) if schema is not None
+                   else asyncio.sleep(0),
+                   AvroAsync.fetch_json(data, self._json_backend)
+                   if prefetch else asyncio.sleep(0)]
+        fetched_schema, fetched_data = await asyncio.gather(*fetches)
+
+        await AvroAsync.run(self._load, data, schema, datum, registry,
+                            fetched_schema, fetched_data)
+        self._apply_cache_policy()
+
+    async def to_json_async(self, json_backend: str = None):
+        """
+        to_json() running in the executor
+        """
+        await self.load_async()
+        return await AvroAsync.run(self.to_json, json_backend)
 
+    async def to_avro_async(self, **kwargs):
+        """
+        to_avro() running in the executor
+        """
+        await self.load_async()
+        return await AvroAsync.run(self.to_avro, **kwargs)
+
+    def _apply_cache_policy(self):
+        if self._cache == 'native':
+            self._json_data = None
+            self._avro_data = None
+        elif self._cache == 'encoded' and self._ok and self._object_data is not None \
+                and (self._avro_data or self._json_data):
+            self._list_data = isinstance(self._object_data, list)
+            self._object_data = None
+
+    def _native(self):
+        if self._object_data is not None or not self._ok:
+            return self._object_data
+
+        # Native data dropped by the 'encoded' cache policy
+        if self._avro_data:
+            records = list(reader(io.BytesIO(self._avro_data)))
+        elif self._json_data and self._json_avro:
+            records = list(json_reader(
+                io.StringIO(self._json_data), self._schema))
+        elif self._json_data:
+            return AvroTools.json_loads(self._json_data, self._json_backend)
+        else:
+            return None
+        return records if self._list_data else records[0] if records else None
+
+    def _load(self, data, schema, datum: bool, registry: SchemaRegistry,
+              fetched_schema: tuple = None, fetched_data: tuple = None):
+        if not Instrumentation.enabled:
+            return self._load_data(data, schema, datum, registry,
+                                   fetched_schema, fetched_data)
+        self._load_data(data, schema, datum, registry, fetched_schema,
+                        fetched_data)
+        Instrumentation.count('objects')
+        if not self._ok:
+            Instrumentation.count('errors')
+
+    def _load_data(self, data, schema, datum: bool, registry: SchemaRegistry,
+                   fetched_schema: tuple, fetched_data: tuple):
+        timed = Instrumentation.enabled
         if schema is not None:
-            try:
-                self._schema = parse_schema(schema)
-                if self._schema_origin is None:
-                    self._schema_origin = type(schema).__name__
-            except Exception as e:
-                self._last_error = str(e)
-                schema = None
-                
+            if timed:
+                start = Instrumentation.clock()
+            success, schema, origin = fetched_schema or AvroTools.fetch_schema(
+                schema)
+            if timed:
+                Instrumentation.record('fetch_schema', start)
+            if success:
+                self._schema = schema
+                self._schema_origin = origin
+            else:
+                self._last_error = schema
+
+        if isinstance(data, str) and fetched_data is None and \
+                AvroTools.fetch_json_file in AvroTools.fetch_methods_for(data):
+            # File name: opened once, as Avro container or JSON
+            fetched_data = self._load_file(data)
+            if fetched_data is None:
+                return
+
+        if isinstance(data, (bytearray, memoryview, mmap.mmap)):
+            if AvroReader.is_avro(data):
+                self._origin = 'binary_avro'
+                self._read_container(data)
+                return
+            data = bytes(data)
 
         if isinstance(data, bytes):
             b_avro = False
             try:
                 bdata = io.BytesIO(data)
-                if is_avro(bdata):
-                    self._origin = 'binary_avro'
-                    bdata.seek(0)
+                schema_id = SchemaRegistry.schema_id(data) \
+                    if registry and not datum else None
+                if schema_id is not None:
+                    self._origin = 'binary_confluent'
+                    b_avro = True
+                    self._schema = registry.get_schema(schema_id)
+                    self._schema_origin = f'{REGISTRY_PREFIX}{schema_id}'
+                    bdata.seek(CONFLUENT_HEADER_SIZE)
+                    self._object_data = self._read_datum(bdata, self._schema)
+                    self._ok = True
+                elif self._schema is not None and not datum \
+                        and data[:2] == SINGLE_OBJECT_MAGIC:
+                    self._origin = 'binary_single_object'
                     b_avro = True
-                    avro_reader = reader(bdata)
-                    self._schema = avro_reader.schema
-                    obj_data = []
-                    for record in avro_reader:
-                        obj_data.append(record)
-                    self._object_data = None if len(obj_data) == 0 else obj_data[0] if len(
-                        obj_data) == 1 else obj_data
+                    if data[2:10] != AvroTools.schema_fingerprint(self._schema):
+                        raise ValueError('Schema fingerprint mismatch')
+                    bdata.seek(10)
+                    self._object_data = self._read_datum(bdata, self._schema)
                     self._ok = True
+                elif datum:
+                    self._origin = 'binary_datum'
+                    b_avro = True
+                    if self._schema is None:
+                        raise ValueError('Schema is required for datum')
+                    self._object_data = self._read_datum(bdata, self._schema)
+                    self._ok = True
+                elif data[:4] == AVRO_MAGIC:
+                    self._origin = 'binary_avro'
+                    b_avro = True
+                    self._read_container(data)
                 else:
                     self._origin = 'binary_string'
                     data = data.decode('utf-8')
@@ -88,20 +271,18 @@ class AvroObject:
                     'Avro binary' if b_avro else 'String decoding')+f' error: {e}'
 
         if isinstance(data, str):
-            success, json_data, origin = AvroTools.fetch_json(data)
+            success, json_object, origin, json_data = fetched_data or \
+                AvroTools.fetch_json_object(data, self._json_backend)
             if not self._origin:
                 self._origin = origin
             if not success:
-                self._last_error = json_data
+                self._last_error = json_object
                 return
 
-            try:
-                self._object_data = json.loads(json_data)
-                self._json_data = json_data
-                if self._schema is None:
-                    self._ok = True
-            except Exception as e:
-                self._last_error = f'JSON parsing error: {e}'
+            self._object_data = json_object
+            self._json_data = json_data
+            if self._schema is None:
+                self._ok = True
 
         elif isinstance(data, dict) or isinstance(data, list):
             self._origin = type(data).__name__
@@ -110,57 +291,294 @@ class AvroObject:
                 self._ok = True
 
         if self._object_data is not None and not self._ok and self._schema is not None:
+            if self._validate != 'eager':
+                self._ok = True
+                return
+            if timed:
+                start = Instrumentation.clock()
             try:
-                validate(self._object_data, self._schema)
+                validate_data(self._object_data, self._schema)
                 self._ok = True
             except Exception as e:
                 self._last_error = f'Schema error: {e}'
+            if timed:
+                Instrumentation.record('validate', start)
+
+    def _load_file(self, file_name: str) -> tuple:
+        """
+        Read Avro container file (memory-mapped) or fetch JSON file
+
+        :return: fetched JSON as AvroTools.fetch_json_object, None for Avro containers
+        """
+        try:
+            f = open(file_name, 'rb')
+        except OSError:
+            # Not a file: other fetch methods (or JSON string)
+            return AvroTools.fetch_json_object(file_name, self._json_backend)
+        with f:
+            if f.read(len(AVRO_MAGIC)) == AVRO_MAGIC:
+                self._origin = f'file://{file_name}'
+                try:
+                    buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (ValueError, OSError):
+                    f.seek(0)
+                    buffer = f.read()
+                try:
+                    self._read_container(buffer)
+                finally:
+                    if isinstance(buffer, mmap.mmap):
+                        buffer.close()
+                return None
+            f.seek(0)
+            content = f.read()
+        try:
+            json_data = content.decode('utf-8')
+        except UnicodeDecodeError as e:
+            return False, str(e), None, None
+        return AvroTools.parse_json(json_data, f'file://{file_name}',
+                                    self._json_backend)
+
+    def _read_datum(self, fo, writer_schema):
+        timed = Instrumentation.enabled
+        if timed:
+            start = Instrumentation.clock()
+        if self._reader_schema is None:
+            datum = AvroCodec.for_schema(writer_schema).decode(fo)
+        else:
+            success, plan = AvroTools.resolver.resolve(writer_schema,
+                                                       self._reader_schema)
+            if not success:
+                raise ValueError(plan)
+            self._schema = plan['reader_schema']
+            datum = schemaless_reader(fo, writer_schema, plan['reader_schema'])
+        if timed:
+            Instrumentation.record('decode', start)
+            # Message size, including encoding headers
+            Instrumentation.count('avro_bytes_in', fo.tell())
+            Instrumentation.count('records_in')
+        return datum
+
+    def _read_container(self, source):
+        timed = Instrumentation.enabled
+        try:
+            if timed:
+                start = Instrumentation.clock()
+            with AvroReader(source, self._reader_schema) as avro_reader:
+                self._schema = avro_reader.reader_schema or avro_reader.schema
+                obj_data = list(avro_reader)
+                if timed:
+                    Instrumentation.record('decode', start)
+                    Instrumentation.count('avro_bytes_in', avro_reader.size)
+                    Instrumentation.count('records_in', len(obj_data))
+            self._object_data = None if len(obj_data) == 0 else obj_data[0] if len(
+                obj_data) == 1 else obj_data
+            # Source bytes are kept only when encoded with the object schema
+            if self._cache == 'encoded' and self._reader_schema is None:
+                self._avro_data = bytes(source)
+            self._ok = True
+        except Exception as e:
+            self._last_error = f'Avro binary error: {e}'
+
+    @classmethod
+    def from_records(cls, records, schema, block_size: int = 1000,
+                     validate: str = 'eager') -> AvroBatch:
+        """
+        Create a batch of records sharing the same schema, serialized as one Avro container
+
+        :param records: iterable of dicts
+        :param schema: Avro schema (JSON as string, Dict object, Filename/URL)
+        :param block_size: number of records per Avro block
+        :param validate: validation policy ('eager', 'on_write', 'none')
+        :rtype: AvroBatch
+        """
+        return AvroBatch(records, schema, block_size, validate)
+
+    @classmethod
+    def from_columns(cls, columns: dict, schema,
+                     validity: dict = None) -> AvroColumns:
+        """
+        Create columnar data (dict of NumPy arrays or lists) to be encoded as Avro records without building dicts
+
+        :param columns: dict of field name -> NumPy array, StringColumn or list
+        :param schema: record schema (JSON as string, Dict object, Filename/URL)
+        :param validity: dict of field name -> bool array (True for non-null values), for nullable fields
+        :rtype: AvroColumns
+        """
+        return AvroColumns.from_columns(columns, schema, validity)
+
+    @staticmethod
+    def iter_records(source, limit: int = None, reader_schema=None):
+        """
+        Iterate over records of an Avro container, decoding them block by block
+
+        :param source: bytes, file name or binary file object with Avro content
+        :param limit: maximum number of records (None for all records)
+        :param reader_schema: schema of the decoded records (None for the writer schema)
+        :return: generator of records
+        """
+        with AvroReader(source, reader_schema) as avro_reader:
+            yield from islice(avro_reader, limit)
+
+    @staticmethod
+    def iter_json(source: str, json_backend: str = None):
+        """
+        Iterate over the records of a JSON source, parsing them incrementally
+
+        :param source: JSON Lines, concatenated JSON values or JSON array (file name, URL or string)
+        :param json_backend: JSON backend name (None for AvroTools.json_backend)
+        :return: generator of records
+        """
+        success, values, _ = AvroTools.stream_json(source, json_backend)
+        if not success:
+            raise ValueError(values)
+        yield from values
 
     def __str__(self):
-        return f'{self._origin}:{self.to_json()}' + (f'[!{self._last_error}]' if self.last_error else '')
+        return f'{self.origin}:{self.to_json()}' + (f'[!{self._last_error}]' if self.last_error else '')
 
     def __repr__(self):
         return self.__str__()
 
-    def to_json(self):
+    def to_json(self, json_backend: str = None):
         """    
+        :param json_backend: JSON backend name (for objects without schema)
         :return: JSON serialized data
         :rtype: str
         """
+        self._ensure_loaded()
         if not self._ok or self._json_data:
             return self._json_data
 
+        timed = Instrumentation.enabled
+        if timed:
+            start = Instrumentation.clock()
+        json_data = None
         if self._schema is None:
             try:
-                self._json_data = json.dumps(
-                    self._object_data, default=AvroTools._json_converter)
+                json_data = AvroTools.json_dumps(
+                    self._native(), json_backend or self._json_backend)
             except Exception as e:
                 self._last_error = f'JSON serialization error: {e}'
         else:
-            out = io.StringIO()
-            json_writer(out, self._schema, self._object_data if isinstance(
-                self._object_data, list) else [self._object_data])
-            out.flush()
-            out.seek(0)
-            self._json_data = out.read()
+            try:
+                records = self._records()
+                if self._validate == 'on_write':
+                    for record in records:
+                        validate_data(record, self._schema)
+                json_data = '\n'.join(map(
+                    AvroCodec.for_schema(self._schema).to_json, records))
+                self._json_avro = True
+            except Exception as e:
+                self._last_error = f'JSON serialization error: {e}'
+        if timed:
+            Instrumentation.record('to_json', start)
+            if json_data is not None:
+                Instrumentation.count('json_chars_out', len(json_data))
+                Instrumentation.count('records_out', len(self._records()))
 
-        return self._json_data
+        self._json_data = json_data
+        self._apply_cache_policy()
+        return json_data
 
-    def to_avro(self):
+    def to_avro(self, container: bool = True, single_object: bool = False,
+                schema_id: int = None, codec: str = 'null',
+                compression_level: int = None, block_size: int = 1000):
         """
+        :param container: Object Container File (True) or schemaless datum (False)
+        :param single_object: schemaless datum with single-object encoding header
+        :param schema_id: schemaless datum in Confluent wire format with this registry schema ID
+        :param codec: container compression codec ('null', 'deflate', 'bzip2', 'xz', 'snappy', 'zstandard', 'lz4')
+        :param compression_level: codec compression level (None for codec default)
+        :param block_size: number of records per container block
         :return: AVRO bytes serialized data (when schema is informed) 
         :rtype: bytes
         """
-        if not self._ok or self._avro_data or not self._schema:
+        if single_object or not container or schema_id is not None:
+            return self._to_avro_datum(single_object, schema_id)
+
+        # Only the default container encoding is cached
+        default = codec == 'null' and compression_level is None \
+            and block_size == 1000
+        if default and self._avro_data:
             return self._avro_data
 
-        out = io.BytesIO()
-        writer(out, self._schema, self._object_data if isinstance(
-            self._object_data, list) else [self._object_data])
-        out.flush()
-        out.seek(0)
-        self._avro_data = out.read()
-        return self._avro_data
+        self._ensure_loaded()
+        if not self._ok or (default and self._avro_data) or not self._schema:
+            return self._avro_data if default else None
+
+        timed = Instrumentation.enabled
+        if timed:
+            start = Instrumentation.clock()
+        avro_data = None
+        try:
+            records = self._records()
+            avro_data = AvroCodec.for_schema(self._schema).to_container(
+                records, block_size, codec, compression_level,
+                self._validate == 'on_write')
+            if timed:
+                Instrumentation.record('to_avro', start)
+                Instrumentation.count('avro_bytes_out', len(avro_data))
+                Instrumentation.count('records_out', len(records))
+        except Exception as e:
+            self._last_error = f'Avro serialization error: {e}'
+
+        if default:
+            self._avro_data = avro_data
+            self._apply_cache_policy()
+        return avro_data
+
+    def to_columns(self, fields: list = None, strings: str = 'object'):
+        """
+        :param fields: names of exported fields (None for all fields)
+        :param strings: string columns as 'object' arrays or 'offsets' (StringColumn)
+        :return: columnar data of the records (requires schema and numpy)
+        :rtype: AvroColumns
+        """
+        self._ensure_loaded()
+        if not self._ok or not self._schema:
+            return None
+
+        try:
+            if self._object_data is None and self._avro_data:
+                return AvroColumns.from_avro(self._avro_data, fields, strings)
+            return AvroColumns.from_records(self._records(), self._schema,
+                                            fields, strings)
+        except Exception as e:
+            self._last_error = f'Columnar export error: {e}'
+            return None
+
+    def _records(self) -> list:
+        object_data = self._native()
+        return object_data if isinstance(object_data, list) else [object_data]
+
+    def _to_avro_datum(self, single_object: bool, schema_id: int = None):
+        self._ensure_loaded()
+        if not self._ok or not self._schema:
+            return None
+
+        timed = Instrumentation.enabled
+        try:
+            if timed:
+                start = Instrumentation.clock()
+            object_data = self._native()
+            if self._validate == 'on_write':
+                validate_data(object_data, self._schema)
+            codec = AvroCodec.for_schema(self._schema)
+            if schema_id is not None:
+                avro_data = CONFLUENT_MAGIC + schema_id.to_bytes(
+                    CONFLUENT_HEADER_SIZE - 1, 'big') + codec.encode(object_data)
+            elif single_object:
+                avro_data = codec.encode_single_object(object_data)
+            else:
+                avro_data = codec.encode(object_data)
+            if timed:
+                Instrumentation.record('to_avro', start)
+                Instrumentation.count('avro_bytes_out', len(avro_data))
+                Instrumentation.count('records_out')
+            return avro_data
+        except Exception as e:
+            self._last_error = f'Avro serialization error: {e}'
+            return None
 
     @property
     def json(self):
@@ -168,6 +586,9 @@ class AvroObject:
         :return: JSON serialized data
         :rtype: str        
         """
+        self._ensure_loaded()
+        if self._json_data is None and self._cache != 'all':
+            return self.to_json()
         return self._json_data
 
     @property
@@ -176,7 +597,8 @@ class AvroObject:
         :return: Native unserialized data
         :rtype: dict
         """
-        return self._object_data
+        self._ensure_loaded()
+        return self._native()
 
     @property
     def origin(self):
@@ -184,6 +606,8 @@ class AvroObject:
         :return: Source of data (str, file, URL, Avro binary)
         :rtype: str
         """
+        if self._origin is None:
+            self._ensure_loaded()
         return self._origin
 
     @property
@@ -192,6 +616,7 @@ class AvroObject:
         :return: Source of schema (str, file, URL)
         :rtype: str
         """
+        self._ensure_loaded()
         return self._schema_origin
 
     @property
@@ -200,6 +625,7 @@ class AvroObject:
         :return: Avro Object successfull creation
         :rtype: bool
         """
+        self._ensure_loaded()
         return self._ok
 
     @property
@@ -208,4 +634,5 @@ class AvroObject:
         :return: Last error message
         :rtype: str
         """
+        self._ensure_loaded()
         return self._last_error
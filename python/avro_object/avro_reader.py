@@ -0,0 +1,407 @@
+import bz2
+import io
+import lzma
+import mmap
+import os
+import zlib
+from itertools import islice
+
+from fastavro import reader
+
+from .avro_tools import AVRO_MAGIC, AvroTools
+
+SYNC_SIZE = 16
+
+# Window size when searching sync markers in buffers without find()
+_FIND_CHUNK_SIZE = 1 << 16
+
+# Block decompression of block_data (other codecs are read by fastavro only)
+_BLOCK_DECOMPRESSORS = {
+    'null': lambda data: data,
+    'deflate': lambda data: zlib.decompress(data, -15),
+    'bzip2': bz2.decompress,
+    'xz': lzma.decompress,
+}
+
+
+def read_long(buffer, pos: int) -> tuple:
+    """
+    Decode Avro long (zigzag varint) from buffer
+
+    :param buffer: bytes, memoryview or mmap
+    :param pos: position of the encoded long
+    :return: (value, position after the encoded long)
+    :rtype: tuple
+    """
+    b = buffer[pos]
+    n = b & 0x7F
+    shift = 7
+    pos += 1
+    while b & 0x80:
+        b = buffer[pos]
+        n |= (b & 0x7F) << shift
+        shift += 7
+        pos += 1
+    return (n >> 1) ^ -(n & 1), pos
+
+
+def header_size(buffer) -> int:
+    """
+    Size of the Avro container header (magic, metadata and sync marker)
+
+    :param buffer: bytes, memoryview or mmap with Avro container
+    :rtype: int
+    """
+    pos = len(AVRO_MAGIC)
+    count, pos = read_long(buffer, pos)
+    while count != 0:
+        if count < 0:
+            _, pos = read_long(buffer, pos)
+            count = -count
+        for _ in range(count):
+            size, pos = read_long(buffer, pos)  # key
+            size, pos = read_long(buffer, pos + size)  # value
+            pos += size
+        count, pos = read_long(buffer, pos)
+    return pos + SYNC_SIZE
+
+
+def find(buffer, sub: bytes, start: int) -> int:
+    """
+    Find sub sequence in buffer without copying the whole buffer
+
+    :return: position of sub, -1 when not found
+    :rtype: int
+    """
+    if not isinstance(buffer, memoryview):
+        return buffer.find(sub, start)
+    start = max(start, 0)
+    while start < len(buffer):
+        chunk = bytes(buffer[start:start + _FIND_CHUNK_SIZE + len(sub) - 1])
+        pos = chunk.find(sub)
+        if pos >= 0:
+            return start + pos
+        start += _FIND_CHUNK_SIZE
+    return -1
+
+
+class BufferIO(io.RawIOBase):
+    """
+    Read-only file object over segments of a buffer (bytes, memoryview, mmap)
+
+    Only the requested bytes are copied on each read.
+
+    :param buffer: source buffer
+    :param segments: list of (start, end) positions, None for whole buffer
+    """
+
+    def __init__(self, buffer, segments: list = None):
+        super().__init__()
+        self._buffer = buffer
+        self._segments = segments or [(0, len(buffer))]
+        self._size = sum(end - start for start, end in self._segments)
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._pos = min(max(offset, 0), self._size)
+        return self._pos
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self._size - self._pos
+        chunks = []
+        skip = self._pos
+        for start, end in self._segments:
+            if size <= 0:
+                break
+            length = end - start
+            if skip >= length:
+                skip -= length
+                continue
+            first = start + skip
+            last = min(end, first + size)
+            chunks.append(bytes(self._buffer[first:last]))
+            size -= last - first
+            self._pos += last - first
+            skip = 0
+        return b''.join(chunks)
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+
+class AvroReader:
+    """
+    Lazy reader of Avro containers
+
+    Records are decoded block by block while iterating, so memory usage
+    doesn't depend on the size of the container. Files are memory-mapped and
+    buffers (bytes, bytearray, memoryview, mmap) are read in place, so only
+    the block being decoded is copied.
+
+    Records are decoded with reader_schema, when informed, applying Avro
+    schema resolution (see SchemaResolver): writer fields missing in the
+    reader schema are skipped, missing fields are filled with defaults and
+    types are promoted.
+
+    :param source: Avro container
+    :param reader_schema: schema of the decoded records (dict, str JSON, file name, URL), None for the writer schema
+    :type source: bytes, bytearray, memoryview, mmap, file name as string, binary file object
+    """
+
+    def __init__(self, source, reader_schema=None):
+        self._fo = None
+        self._file = None
+        self._buffer = None
+        self._header_size = None
+        self._reader_schema = None
+        if reader_schema is not None:
+            success, reader_schema, _ = AvroTools.fetch_schema(reader_schema)
+            if not success:
+                raise ValueError(f'Reader schema error: {reader_schema}')
+            self._reader_schema = reader_schema
+        if isinstance(source, bytearray):
+            source = memoryview(source)
+        if isinstance(source, (bytes, memoryview, mmap.mmap)):
+            self._buffer = source
+        elif isinstance(source, str):
+            if not os.path.isfile(source):
+                raise FileNotFoundError(f"File not found: {source}")
+            self._file = open(source, 'rb')
+            try:
+                self._buffer = mmap.mmap(self._file.fileno(), 0,
+                                         access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                # Empty files (and some devices) can't be mapped
+                self._fo = self._file
+        elif hasattr(source, 'read'):
+            self._fo = source
+        else:
+            raise TypeError(
+                f"Invalid Avro source: {type(source).__name__}")
+
+        if self._buffer is not None:
+            if isinstance(self._buffer, memoryview) and self._buffer.format != 'B':
+                self._buffer = self._buffer.cast('B')
+            self._fo = io.BytesIO(self._buffer) if isinstance(
+                self._buffer, bytes) else BufferIO(self._buffer)
+
+        try:
+            self._reader = reader(self._fo, self._reader_schema)
+            if self._reader_schema is not None:
+                success, plan = AvroTools.resolver.resolve(
+                    self._reader.writer_schema, self._reader_schema)
+                if not success:
+                    raise ValueError(plan)
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        return iter(self._reader)
+
+    @staticmethod
+    def is_avro(source) -> bool:
+        """
+        Verify if buffer or file name has an Avro container header
+
+        :param source: bytes, bytearray, memoryview, mmap or file name
+        :rtype: bool
+        """
+        try:
+            if isinstance(source, str):
+                with open(source, 'rb') as f:
+                    return f.read(len(AVRO_MAGIC)) == AVRO_MAGIC
+            return bytes(source[:len(AVRO_MAGIC)]) == AVRO_MAGIC
+        except (OSError, TypeError):
+            return False
+
+    def close(self):
+        """
+        Close the underlying file, when opened by the reader
+        """
+        if isinstance(self._buffer, mmap.mmap) and self._file is not None:
+            self._buffer.close()
+        if self._file is not None:
+            self._file.close()
+        self._buffer = None
+        self._file = None
+        self._fo = None
+
+    def read(self, limit: int = None) -> list:
+        """
+        Read records
+
+        :param limit: maximum number of records (None for all records)
+        :rtype: list
+        """
+        return list(islice(self._reader, limit))
+
+    def _require_buffer(self):
+        if self._buffer is None:
+            raise ValueError('Random access requires a file name or buffer source')
+
+    @property
+    def header_size(self) -> int:
+        """
+        :return: Size of the container header (position of the first block)
+        :rtype: int
+        """
+        self._require_buffer()
+        if self._header_size is None:
+            self._header_size = header_size(self._buffer)
+        return self._header_size
+
+    def sync_position(self, position: int) -> int:
+        """
+        Position of the first block starting at or after position
+
+        :param position: byte position in the container
+        :return: block position (container size when there is no block after position)
+        :rtype: int
+        """
+        self._require_buffer()
+        if position <= self.header_size:
+            return self.header_size
+        pos = find(self._buffer, self.sync_marker, position - SYNC_SIZE)
+        return len(self._buffer) if pos < 0 else pos + SYNC_SIZE
+
+    def blocks(self):
+        """
+        Iterate over blocks of the container, without decoding records
+
+        :return: generator of (position, record count, size in bytes)
+        """
+        self._require_buffer()
+        sync_marker = self.sync_marker
+        pos = self.header_size
+        size = len(self._buffer)
+        while pos < size:
+            count, data_pos = read_long(self._buffer, pos)
+            length, data_pos = read_long(self._buffer, data_pos)
+            end = data_pos + length + SYNC_SIZE
+            if bytes(self._buffer[end - SYNC_SIZE:end]) != sync_marker:
+                raise ValueError(f'Invalid sync marker at {end - SYNC_SIZE}')
+            yield pos, count, end - pos
+            pos = end
+
+    def block_data(self):
+        """
+        Iterate over the encoded records of each block, without decoding them
+
+        :return: generator of (record count, decompressed block data)
+        :raises ValueError: source without random access (file objects), or codec other than null, deflate, bzip2 and xz
+        """
+        self._require_buffer()
+        decompress = _BLOCK_DECOMPRESSORS.get(self.codec)
+        if decompress is None:
+            raise ValueError(f'Unsupported codec for block data: {self.codec}')
+        return self._block_data(decompress)
+
+    def _block_data(self, decompress):
+        for position, count, _ in self.blocks():
+            _, pos = read_long(self._buffer, position)
+            length, pos = read_long(self._buffer, pos)
+            yield count, decompress(self._buffer[pos:pos + length])
+
+    def read_blocks(self, start: int, end: int):
+        """
+        Iterate over records of the blocks between two block positions
+
+        :param start: position of the first block
+        :param end: position after the last block
+        :return: generator of records
+        """
+        self._require_buffer()
+        if start >= end:
+            return
+        segments = [(0, self.header_size), (start, end)]
+        yield from reader(BufferIO(self._buffer, segments), self._reader_schema)
+
+    def read_range(self, start: int, end: int = None):
+        """
+        Iterate over records of the blocks starting in the byte range [start, end)
+
+        Adjacent ranges return every record exactly once, so a container can
+        be split in byte ranges for parallel readers.
+
+        :param start: start byte position
+        :param end: end byte position (None for container end)
+        :return: generator of records
+        """
+        self._require_buffer()
+        first = self.sync_position(start)
+        last = len(self._buffer) if end is None else self.sync_position(end)
+        yield from self.read_blocks(first, last)
+
+    @property
+    def size(self) -> int:
+        """
+        :return: Size of the container in bytes
+        :rtype: int
+        """
+        self._require_buffer()
+        return len(self._buffer)
+
+    @property
+    def sync_marker(self) -> bytes:
+        """
+        :return: Sync marker of the container
+        :rtype: bytes
+        """
+        if self._buffer is None:
+            return self._reader._header['sync']
+        return bytes(self._buffer[self.header_size - SYNC_SIZE:self.header_size])
+
+    @property
+    def schema(self):
+        """
+        :return: Writer schema of the container
+        :rtype: dict
+        """
+        return self._reader.writer_schema
+
+    @property
+    def reader_schema(self):
+        """
+        :return: Parsed reader schema (None when records are decoded with the writer schema)
+        :rtype: dict
+        """
+        return self._reader_schema
+
+    @property
+    def codec(self) -> str:
+        """
+        :return: Compression codec of the container blocks
+        :rtype: str
+        """
+        return self.metadata.get('avro.codec', 'null')
+
+    @property
+    def metadata(self):
+        """
+        :return: Metadata of the container header
+        :rtype: dict
+        """
+        return self._reader.metadata
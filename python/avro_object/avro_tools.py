@@ -1,24 +1,567 @@
-import datetime
+import hashlib
+import io
 import json
-import numbers
 import os
 import re
+import threading
+import time
+from collections import OrderedDict
 from inspect import signature
 
 import requests
 from fastavro import parse_schema, is_avro
+from fastavro.schema import fingerprint, to_parsing_canonical_form
+
+from .json_backend import (JSON_BACKENDS, JsonBackend, default_json_backend,
+                           get_json_backend, json_default)
+from .instrumentation import Instrumentation
+from .json_stream import iter_json
+from .schema_inference import SchemaInference
+
+# Avro object container file header
+AVRO_MAGIC = b'Obj\x01'
+
+# Avro single-object encoding header
+SINGLE_OBJECT_MAGIC = b'\xc3\x01'
+
+# Validation policies of schema-backed objects:
+# eager: validate on creation, on_write: validate by the fastavro writers,
+# none: no validation (trusted data)
+VALIDATION_POLICIES = ('eager', 'on_write', 'none')
+
+# Cache policies of AvroObject serialized/unserialized data:
+# all: native and encoded data, native: native data only,
+# encoded: encoded data only (native data is decoded on each access)
+CACHE_POLICIES = ('all', 'native', 'encoded')
+
+URL_PATTERN = re.compile(
+    r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+")
+
+# Sources starting with these characters are literal JSON (never fetched)
+JSON_START = frozenset('{["')
+
+# Sources starting with a scheme (scheme://) are not file names
+SCHEME_PATTERN = re.compile(r'[a-zA-Z][a-zA-Z0-9+.-]*://')
+
+# Maximum number of cached source classifications
+DISPATCH_CACHE_SIZE = 1024
+
+
+class SchemaCache:
+    """
+    Thread-safe LRU cache of parsed schemas
+
+    Schemas informed as dict/list are keyed by a hash of its content, schemas
+    informed as str are keyed by the source itself. Entries loaded from files
+    are invalidated when the file modification time changes. Volatile sources
+    (URLs, registry subjects, see AvroTools.is_volatile) are fetched on every
+    call, through the cache of their fetch method, and cached by their content.
+
+    Schemas already parsed by fastavro are returned as they are.
+
+    :param max_size: maximum number of cached schemas
+    """
+
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _key(source):
+        if isinstance(source, str):
+            return 'str', source
+        content = json.dumps(source, sort_keys=True, default=str)
+        return 'hash', hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def get(self, source) -> tuple:
+        """
+        Get parsed schema from cache, loading and parsing it when needed
+
+        :param source: dict, list or str (JSON, file name, URL)
+        :return: (bool Success, parsed schema or error message, origin)
+        """
+        if isinstance(source, str):
+            if AvroTools.is_volatile(source):
+                # Fetched every time (e.g. registry subjects), cached by content
+                success, json_data, origin = AvroTools.fetch_json(source)
+                if not success:
+                    return False, json_data, origin
+                success, schema, _ = self.get(json_data)
+                return success, schema, origin if success else None
+            key = 'str', source
+        elif isinstance(source, dict) and '__named_schemas' in source:
+            # Already parsed (e.g. shared by this cache)
+            return True, source, 'dict'
+        else:
+            # Keyed by content on every call: dicts may be changed after use
+            try:
+                key = self._key(source)
+            except Exception as e:
+                return False, str(e), None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                schema, origin, path, mtime = entry
+                if path is None or self._mtime(path) == mtime:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, schema, origin
+                del self._entries[key]
+            self.misses += 1
+
+        success, schema, origin, path = self._load(source)
+        if not success:
+            return False, schema, origin
+
+        with self._lock:
+            self._entries[key] = (schema, origin, path,
+                                  self._mtime(path) if path else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max(self.max_size, 0):
+                self._entries.popitem(last=False)
+
+        return True, schema, origin
+
+    @staticmethod
+    def _load(source) -> tuple:
+        path = None
+        if isinstance(source, str):
+            success, source, origin, _ = AvroTools.fetch_json_object(source)
+            if not success:
+                return False, source, origin, None
+            if origin and origin.startswith('file://'):
+                path = origin[len('file://'):]
+        else:
+            origin = type(source).__name__
+
+        try:
+            return True, parse_schema(source), origin, path
+        except Exception as e:
+            return False, str(e), origin, None
+
+    def invalidate(self, source=None):
+        """
+        Remove one source (or all sources when None) from cache
+        """
+        with self._lock:
+            if source is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self._key(source), None)
+
+    def info(self) -> dict:
+        """
+        :return: cache statistics (hits, misses, size, max_size)
+        :rtype: dict
+        """
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'size': len(self._entries),
+                    'max_size': self.max_size}
+
+
+# Writer primitive types readable as each reader primitive type
+_PROMOTIONS = {
+    'long': ('int',),
+    'float': ('int', 'long'),
+    'double': ('int', 'long', 'float'),
+    'string': ('bytes',),
+    'bytes': ('string',),
+}
+
+
+class SchemaResolver:
+    """
+    Thread-safe LRU cache of Avro schema resolution plans
+
+    A plan is computed once per (writer, reader) pair of schemas, keyed by
+    their fingerprints: schemas are checked for compatibility (projection,
+    defaults, promotions) and the reader schema is parsed for the decoders.
+    Plans are also memoized by the identity of the parsed schemas, so
+    decoding many messages with the same schemas computes no fingerprints.
+
+    :param max_size: maximum number of cached plans
+    """
+
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._identities = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def resolve(self, writer_schema, reader_schema) -> tuple:
+        """
+        Get the resolution plan of a pair of schemas
+
+        :param writer_schema: parsed schema of the encoded data
+        :param reader_schema: schema expected by the consumer (dict, str JSON, file name, URL)
+        :return: (bool Success, plan or error message). Plan: {'reader_schema'}
+        :rtype: tuple
+        """
+        # Parsed on every call (unless already parsed): dicts may be changed
+        # after use, and str sources may be files changed on disk
+        success, reader_schema, _ = AvroTools.fetch_schema(reader_schema)
+        if not success:
+            return False, f'Reader schema error: {reader_schema}'
+
+        # Parsed schemas are shared by the schema cache, so plans are also
+        # memoized by their identity (keeping references to avoid id reuse)
+        identity_key = id(writer_schema), id(reader_schema)
+        identity = self._identities.get(identity_key)
+        if identity is not None and identity[0] is writer_schema \
+                and identity[1] is reader_schema:
+            with self._lock:
+                self.hits += 1
+            return identity[2]
+
+        try:
+            key = (AvroTools.schema_fingerprint(writer_schema),
+                   AvroTools.schema_fingerprint(reader_schema))
+        except Exception as e:
+            return False, f'Schema resolution error: {e}'
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            try:
+                entry = True, self._plan(writer_schema, reader_schema)
+            except ValueError as e:
+                entry = False, f'Schema resolution error: {e}'
+            with self._lock:
+                self._entries[key] = entry
+                while len(self._entries) > max(self.max_size, 0):
+                    self._entries.popitem(last=False)
+
+        with self._lock:
+            if len(self._identities) >= max(self.max_size, 1):
+                self._identities.clear()
+            self._identities[identity_key] = (writer_schema, reader_schema, entry)
+        return entry
+
+    @classmethod
+    def _plan(cls, writer_schema, reader_schema) -> dict:
+        cls._check(writer_schema, reader_schema, cls._named(writer_schema),
+                   cls._named(reader_schema), set(), '')
+        return {'reader_schema': reader_schema}
+
+    @staticmethod
+    def _named(schema) -> dict:
+        # Writer schemas read from container headers don't keep named types
+        if isinstance(schema, dict) and '__named_schemas' not in schema:
+            schema = parse_schema(schema)
+        return schema.get('__named_schemas', {}) \
+            if isinstance(schema, dict) else {}
+
+    @staticmethod
+    def _deref(schema, named: dict):
+        while isinstance(schema, str) and schema in named:
+            schema = named[schema]
+        return schema
+
+    @staticmethod
+    def _type(schema) -> str:
+        if isinstance(schema, list):
+            return 'union'
+        if isinstance(schema, dict):
+            schema = schema['type']
+            return schema if isinstance(schema, str) else 'union'
+        return schema
+
+    @staticmethod
+    def _field_names(record) -> dict:
+        fields = {}
+        for field in record['fields']:
+            fields[field['name']] = field
+            for alias in field.get('aliases', []):
+                fields.setdefault(alias, field)
+        return fields
+
+    @classmethod
+    def _matches(cls, writer, reader, writer_named, reader_named) -> bool:
+        try:
+            cls._check(writer, reader, writer_named, reader_named, set(), '')
+            return True
+        except ValueError:
+            return False
+
+    @classmethod
+    def _check(cls, writer, reader, writer_named, reader_named, seen: set,
+               path: str):
+        writer = cls._deref(writer, writer_named)
+        reader = cls._deref(reader, reader_named)
+        if isinstance(writer, dict) and isinstance(writer['type'], (list, dict)):
+            writer = writer['type']
+        if isinstance(reader, dict) and isinstance(reader['type'], (list, dict)):
+            reader = reader['type']
+        w_type, r_type = cls._type(writer), cls._type(reader)
+        where = path or '<root>'
+
+        # Writer unions are resolved by the branch of each datum, so at
+        # least one branch must be readable
+        if w_type == 'union':
+            if not any(cls._matches(branch, reader, writer_named, reader_named)
+                       for branch in writer):
+                raise ValueError(f'{where}: no writer union branch matches reader')
+            return
+        if r_type == 'union':
+            if not any(cls._matches(writer, branch, writer_named, reader_named)
+                       for branch in reader):
+                raise ValueError(f'{where}: {w_type} does not match reader union')
+            return
+
+        if w_type != r_type:
+            if w_type in _PROMOTIONS.get(r_type, ()):
+                return
+            raise ValueError(f'{where}: {w_type} can not be read as {r_type}')
+
+        if w_type in ('record', 'enum', 'fixed'):
+            if writer['name'] != reader['name'] \
+                    and writer['name'] not in reader.get('aliases', []):
+                raise ValueError(
+                    f'{where}: {w_type} {writer["name"]} does not match {reader["name"]}')
+
+        if w_type == 'fixed' and writer['size'] != reader['size']:
+            raise ValueError(f'{where}: fixed sizes differ')
+        elif w_type == 'array':
+            cls._check(writer['items'], reader['items'], writer_named,
+                       reader_named, seen, f'{path}[]')
+        elif w_type == 'map':
+            cls._check(writer['values'], reader['values'], writer_named,
+                       reader_named, seen, f'{path}{{}}')
+        elif w_type == 'record':
+            # Recursive records are checked once
+            pair = (writer['name'], reader['name'])
+            if pair in seen:
+                return
+            seen.add(pair)
+            writer_fields = cls._field_names(writer)
+            for field in reader['fields']:
+                field_path = f'{path}.{field["name"]}' if path else field['name']
+                writer_field = None
+                for name in [field['name']] + field.get('aliases', []):
+                    writer_field = writer_fields.get(name)
+                    if writer_field is not None:
+                        break
+                if writer_field is None:
+                    if 'default' not in field:
+                        raise ValueError(
+                            f'{field_path}: missing in writer schema and without default')
+                    continue
+                cls._check(writer_field['type'], field['type'], writer_named,
+                           reader_named, seen, field_path)
+
+    def invalidate(self):
+        """
+        Remove all plans from cache
+        """
+        with self._lock:
+            self._entries.clear()
+            self._identities.clear()
+
+    def info(self) -> dict:
+        """
+        :return: cache statistics (hits, misses, size, max_size)
+        :rtype: dict
+        """
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'size': len(self._entries),
+                    'max_size': self.max_size}
+
+
+class HttpCache:
+    """
+    HTTP client with pooled sessions and a conditional-request cache
+
+    Documents are served from cache while younger than ttl seconds. Older
+    documents are revalidated with If-None-Match/If-Modified-Since headers,
+    when the server informed ETag/Last-Modified.
+
+    :param timeout: request timeout in seconds
+    :param ttl: seconds a cached document is used without revalidation
+    :param max_size: maximum number of cached documents
+    """
+
+    def __init__(self, timeout: float = 10, ttl: float = 300, max_size: int = 128):
+        self.timeout = timeout
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        :return: HTTP session of the current thread (keeps connections alive)
+        :rtype: requests.Session
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def get(self, url: str) -> str:
+        """
+        Get document content, from cache when possible
+
+        :param url: document URL
+        :return: document content
+        :rtype: str
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None and time.monotonic() - entry[3] < self.ttl:
+                self._entries.move_to_end(url)
+                self.hits += 1
+                return entry[0]
+
+        headers = {}
+        if entry is not None:
+            if entry[1]:
+                headers['If-None-Match'] = entry[1]
+            if entry[2]:
+                headers['If-Modified-Since'] = entry[2]
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and entry is not None:
+            content = entry[0]
+            etag, last_modified = entry[1], entry[2]
+            with self._lock:
+                self.revalidations += 1
+        else:
+            response.raise_for_status()
+            content = response.text
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            with self._lock:
+                self.misses += 1
+
+        with self._lock:
+            self._entries[url] = (content, etag, last_modified, time.monotonic())
+            self._entries.move_to_end(url)
+            while len(self._entries) > max(self.max_size, 0):
+                self._entries.popitem(last=False)
+        return content
+
+    def invalidate(self, url: str = None):
+        """
+        Remove one document (or all documents when None) from cache
+        """
+        with self._lock:
+            if url is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(url, None)
+
+    def info(self) -> dict:
+        """
+        :return: cache statistics (hits, misses, revalidations, size, max_size)
+        :rtype: dict
+        """
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'revalidations': self.revalidations,
+                    'size': len(self._entries),
+                    'max_size': self.max_size}
+
 
 class AvroTools:
     """
     Tools for AvroObject
     """
     _json_fetch_modes = []
+    _json_stream_modes = []
+    _fetch_prefixes = {}
+    _dispatch_cache = {}
     _last_error = None
+    _fingerprints = {}
+    schema_cache = SchemaCache()
+    resolver = SchemaResolver()
+    http = HttpCache()
+    json_backend = default_json_backend()
 
     @classmethod
     def get_last_error(cls)->str:
         return str(cls._last_error)
 
+    @classmethod
+    def set_json_backend(cls, name: str = None) -> bool:
+        """
+        Set the JSON backend used for parsing and serialization
+
+        :param name: 'orjson', 'ujson', 'json' or None for the fastest available
+        :return: Success
+        :rtype: bool
+        """
+        try:
+            cls.json_backend = get_json_backend(name)
+            cls._last_error = None
+            return True
+        except Exception as e:
+            cls._last_error = str(e)
+            return False
+
+    @staticmethod
+    def json_backend_names() -> list:
+        """
+        :return: Names of available JSON backends, by preference order
+        :rtype: list
+        """
+        return list(JSON_BACKENDS)
+
+    @classmethod
+    def get_json_backend(cls, name: str = None) -> JsonBackend:
+        """
+        :param name: backend name or None for the current JSON backend
+        :rtype: JsonBackend
+        """
+        return cls.json_backend if name is None else get_json_backend(name)
+
+    @classmethod
+    def json_loads(cls, s, json_backend: str = None):
+        """
+        Parse JSON using the current (or informed) JSON backend
+        """
+        return cls.get_json_backend(json_backend).loads(s)
+
+    @classmethod
+    def json_dumps(cls, obj, json_backend: str = None) -> str:
+        """
+        Serialize to JSON using the current (or informed) JSON backend
+        """
+        return cls.get_json_backend(json_backend).dumps(obj)
+
     @classmethod
     def fetch_json(cls, source: str) -> tuple:
         '''Load JSON string from various medium and returns as string
@@ -26,35 +569,206 @@ class AvroTools:
         :param source: string JSON, file name, URL, another registered source by add_fetch_method
         :rtype: tuple (bool Success, str JSON or error message, origin)
         '''
+        success, data, origin, json_data = cls.fetch_json_object(source)
+        if not success:
+            return False, data, None
+        return True, json_data, origin
+
+    @classmethod
+    def fetch_json_object(cls, source: str, json_backend: str = None) -> tuple:
+        '''Load JSON string from various medium and returns it already parsed
+
+        :param source: string JSON, file name, URL, another registered source by add_fetch_method
+        :param json_backend: JSON backend name (None for the current backend)
+        :rtype: tuple (bool Success, parsed object or error message, origin, str JSON)
+        '''
+        timed = Instrumentation.enabled
         try:
-            for method in cls._json_fetch_modes:
+            if timed:
+                start = Instrumentation.clock()
+            json_data, origin, error = source, "string", None
+            for method in cls.fetch_methods_for(source):
                 success, message, origin = method(source)
                 if success:
+                    json_data = message
                     break
                 else:
-                    origin = "string"
+                    origin, error = "string", message
+
+            if timed:
+                Instrumentation.record('fetch', start)
+                Instrumentation.count('json_chars_in', len(json_data))
+                start = Instrumentation.clock()
+            try:
+                json_object = cls.json_loads(json_data, json_backend)
+            except Exception:
+                if error is None:
+                    raise
+                # Not JSON either: report why the source was not fetched
+                raise ValueError(error) from None
+            if timed:
+                Instrumentation.record('json_parse', start)
+            return True, json_object, origin, json_data
+        except Exception as e:
+            return False, str(e), None, None
+
+    @classmethod
+    def parse_json(cls, json_data: str, origin: str, json_backend: str = None) -> tuple:
+        '''Parse JSON string already fetched (as fetch_json_object)
 
-            # Try to parse JSON str
-            json.loads(message if success else source)
-            return True, (message if success else source), origin
+        :param json_data: JSON string
+        :param origin: origin of the JSON string
+        :param json_backend: JSON backend name (None for the current backend)
+        :rtype: tuple (bool Success, parsed object or error message, origin, str JSON)
+        '''
+        timed = Instrumentation.enabled
+        try:
+            if timed:
+                Instrumentation.count('json_chars_in', len(json_data))
+                start = Instrumentation.clock()
+            json_object = cls.json_loads(json_data, json_backend)
+            if timed:
+                Instrumentation.record('json_parse', start)
+            return True, json_object, origin, json_data
+        except Exception as e:
+            return False, str(e), None, None
+
+    @classmethod
+    def stream_json(cls, source: str, json_backend: str = None) -> tuple:
+        '''Open JSON source as a stream of values, parsed incrementally (see iter_json)
+
+        Files and URLs are read in chunks, as JSON Lines, concatenated JSON
+        values or items of a JSON array. Sources of other fetch methods (and
+        JSON strings) are fetched whole, and then parsed incrementally.
+
+        :param source: string JSON, file name, URL, another registered source by add_fetch_method
+        :param json_backend: JSON backend name of JSON Lines (None for the current backend)
+        :rtype: tuple (bool Success, iterator of parsed values or error message, origin)
+        '''
+        try:
+            loads = cls.get_json_backend(json_backend).loads
+            for method in cls.fetch_methods_for(source, stream=True):
+                success, fo, origin = method(source)
+                if success:
+                    return True, cls._iter_stream(fo, loads), origin
+
+            text, origin = source, 'string'
+            for method in cls.fetch_methods_for(source):
+                if method in (cls.fetch_json_file, cls.fetch_json_url):
+                    continue
+                success, message, method_origin = method(source)
+                if success:
+                    text, origin = message, method_origin
+                    break
+            return True, iter_json(io.StringIO(text), loads), origin
         except Exception as e:
             return False, str(e), None
 
+    @staticmethod
+    def _iter_stream(fo, loads):
+        with fo:
+            yield from iter_json(fo, loads)
+
+    @classmethod
+    def fetch_schema(cls, source) -> tuple:
+        '''Load and parse schema, using the process-wide schema cache
+
+        :param source: dict, string JSON, file name, URL
+        :rtype: tuple (bool Success, parsed schema or error message, origin)
+        '''
+        return cls.schema_cache.get(source)
+
+    @classmethod
+    def fetch_methods_for(cls, source, stream: bool = False) -> tuple:
+        """
+        Fetch methods that may handle the source, in registration order
+
+        Sources are classified once (classifications are cached): literal
+        JSON (starting with {, [ or ") is never fetched, sources starting
+        with a declared prefix are dispatched to the methods declaring it,
+        plain paths (no scheme://) to the file methods, and every non-JSON
+        source to the methods registered without declared prefixes.
+
+        :param source: string JSON, file name, URL, another registered source by add_fetch_method
+        :param stream: stream methods (stream_json) instead of fetch methods
+        :rtype: tuple
+        """
+        modes = cls._json_stream_modes if stream else cls._json_fetch_modes
+        if not isinstance(source, str):
+            return tuple(modes)
+        first = source[:1]
+        if first in JSON_START or (first.isspace() and
+                                   source.lstrip()[:1] in JSON_START):
+            return ()
+
+        key = (source, stream)
+        methods = cls._dispatch_cache.get(key)
+        if methods is None:
+            claimed = any(prefixes and source.startswith(prefixes)
+                          for prefixes in cls._fetch_prefixes.values())
+            path = not claimed and not SCHEME_PATTERN.match(source)
+            methods = tuple(method for method in modes
+                            if cls._handles(method, source, path))
+            if len(cls._dispatch_cache) >= DISPATCH_CACHE_SIZE:
+                cls._dispatch_cache.clear()
+            cls._dispatch_cache[key] = methods
+        return methods
+
+    @classmethod
+    def is_volatile(cls, source: str) -> bool:
+        """
+        Source content may change between fetches (e.g. URLs, latest version
+        of a registry subject), as declared by a fetch_volatile predicate
+        attribute of its fetch methods
+
+        :param source: string JSON, file name, URL, another registered source by add_fetch_method
+        :rtype: bool
+        """
+        for method in cls.fetch_methods_for(source):
+            volatile = getattr(method, 'fetch_volatile', None)
+            if volatile is not None and volatile(source):
+                return True
+        return False
+
+    @classmethod
+    def _handles(cls, method, source: str, path: bool) -> bool:
+        prefixes = cls._fetch_prefixes.get(method)
+        if prefixes is None:
+            return True
+        if not prefixes:
+            return path
+        return source.startswith(prefixes)
+
     @classmethod
     def reset_fetch_methods(cls):
         """
         Resets default fetch methods (File, URL and string)
         """
         cls._json_fetch_modes.clear()
-        for method in [AvroTools.fetch_json_file, AvroTools.fetch_json_url]:
-            cls._json_fetch_modes.append(method)
+        cls._json_stream_modes.clear()
+        cls._fetch_prefixes.clear()
+        cls._dispatch_cache.clear()
+        for fetch, stream, prefixes in [
+                (AvroTools.fetch_json_file, AvroTools.stream_json_file, ()),
+                (AvroTools.fetch_json_url, AvroTools.stream_json_url,
+                 ('http://', 'https://'))]:
+            cls._json_fetch_modes.append(fetch)
+            cls._json_stream_modes.append(stream)
+            cls._fetch_prefixes[fetch] = cls._fetch_prefixes[stream] = prefixes
 
     @classmethod
-    def add_fetch_method(cls, method) -> bool:
+    def add_fetch_method(cls, method, prefixes: tuple = None) -> bool:
         """
         Add custom fetch method
 
+        Methods receive only the sources starting with one of its prefixes,
+        declared by the prefixes argument or a fetch_prefixes attribute of the
+        method (methods without prefixes receive every non-JSON source).
+        Schemas of sources matched by a fetch_volatile predicate attribute of
+        the method are not cached by source (see is_volatile).
+
         :param method: (str source) -> (bool Success, str JSON/Error, str origin name)
+        :param prefixes: source prefixes handled by the method (e.g. ('s3://',))
         :return: Success
         :rtype: bool
         """
@@ -64,8 +778,15 @@ class AvroTools:
                 return False
             if not (sign.return_annotation is tuple):
                 return False
+            if prefixes is None:
+                prefixes = getattr(method, 'fetch_prefixes', None)
+            if isinstance(prefixes, str):
+                prefixes = (prefixes,)
             if method not in cls._json_fetch_modes:
                 cls._json_fetch_modes.append(method)
+            cls._fetch_prefixes[method] = \
+                None if prefixes is None else tuple(prefixes)
+            cls._dispatch_cache.clear()
             return True
         except:
             pass
@@ -84,10 +805,43 @@ class AvroTools:
                     content = f.read()
                 return True, content, f"file://{source}"
             except Exception as e:
-                return False, str(e)
+                return False, str(e), f"file://{source}"
         else:
             return False, f"File not found: {source}", f"file://{source}"
 
+    @staticmethod
+    def stream_json_file(source: str) -> tuple:
+        """Open file for streaming
+
+        :param source: str with file name
+        :return: (bool Success, text file object or Error, origin)
+        """
+        if os.path.isfile(source):
+            try:
+                return True, open(source, 'r', encoding='utf-8'), f"file://{source}"
+            except Exception as e:
+                return False, str(e), f"file://{source}"
+        return False, f"File not found: {source}", f"file://{source}"
+
+    @staticmethod
+    def stream_json_url(source: str) -> tuple:
+        """Open URL for streaming (bypassing the HTTP cache)
+
+        :param source: str with URL
+        :return: (bool Success, text file object or Error, origin)
+        """
+        if not URL_PATTERN.fullmatch(source):
+            return False, f"Source is not an URL: {source}", source
+        try:
+            response = AvroTools.http.session.get(
+                source, stream=True, timeout=AvroTools.http.timeout)
+            response.raise_for_status()
+            response.raw.decode_content = True
+            return True, io.TextIOWrapper(
+                response.raw, encoding=response.encoding or 'utf-8'), source
+        except Exception as e:
+            return False, str(e), source
+
     @staticmethod
     def fetch_json_url(source: str) -> tuple:
         """Try to parse json from url
@@ -95,15 +849,12 @@ class AvroTools:
         :param source: str with URL
         :return: (bool Success, str JSON or Error, origin)
         """
-
-        pattern = re.compile(
-            r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+")
-        if pattern.fullmatch(source):
+        if URL_PATTERN.fullmatch(source):
             try:
-                content = requests.get(url=source).text
+                content = AvroTools.http.get(source)
                 return True, content, source
             except Exception as e:
-                return False, str(e)
+                return False, str(e), source
         else:
             return False, f"Source is not an URL: {source}", source
 
@@ -112,10 +863,7 @@ class AvroTools:
         """
         Default JSON serializer for datetime
         """
-        for t in [datetime.time, datetime.date, datetime]:
-            if isinstance(o, t):
-                return o.__str__()
-        return None
+        return json_default(o)
 
     @staticmethod
     def isAvroBinary(bin_data: bytes) -> bool:
@@ -124,6 +872,29 @@ class AvroTools:
         """
         return isinstance(bin_data, bytes) and (len(bin_data) > 15) and (bin_data[:16] == b'Obj\x01\x04\x14avro.codec')
 
+    @classmethod
+    def schema_fingerprint(cls, schema) -> bytes:
+        """
+        CRC-64-AVRO fingerprint of the schema parsing canonical form, as used
+        by the single-object encoding
+
+        :param schema: parsed schema
+        :return: 8 bytes fingerprint (little-endian)
+        :rtype: bytes
+        """
+        # Parsed schemas are shared by the schema cache, so they are
+        # memoized by identity (keeping a reference to avoid id reuse)
+        entry = cls._fingerprints.get(id(schema))
+        if entry is not None and entry[0] is schema:
+            return entry[1]
+
+        fp = bytes.fromhex(fingerprint(
+            to_parsing_canonical_form(schema), 'CRC-64-AVRO'))
+        if len(cls._fingerprints) >= cls.schema_cache.max_size:
+            cls._fingerprints.clear()
+        cls._fingerprints[id(schema)] = (schema, fp)
+        return fp
+
     @classmethod
     def validateSchema(cls,schema) -> bool:
         """
@@ -140,58 +911,35 @@ class AvroTools:
             cls._last_error=str(e)
             return False
 
-    @staticmethod
-    def create_schema(data: dict, name: str, namespace: str = 'namespace.test', doc: str = None):
+    @classmethod
+    def create_schema(cls, data, name: str, namespace: str = 'namespace.test',
+                      doc: str = None, **kwargs):
         '''
-        Create schema from object (incomplete)
+        Infer record schema from one record or an iterable of records (single pass, see SchemaInference)
 
-        :param data: source object
+        :param data: dict or iterable of dicts (list, generator, AvroObject.iter_records, ...)
         :param name: Name of schema
         :param namespace: Namespace of schema
         :param doc: Documentation
-        :return: Schema
+        :param kwargs: SchemaInference arguments (sample_rate, max_records, max_fields, string_formats, seed)
+        :return: Schema (None on error, see get_last_error)
         :rtype: dict
         '''
-        if not isinstance(data, dict):
-            return None
-        schema = {
-            'doc': 'A weather reading.',
-            'name': 'Weather',
-            'namespace': 'test',
-            'type': 'record',
-            'fields': [
-                    {'name': 'station', 'type': 'string'},
-                    {'name': 'time', 'type': 'long'},
-                    {'name': 'temp', 'type': 'int'},
-            ],
-        }
-
-        o_type = None
-        if isinstance(data, dict):
-            o_type = 'record'
-        elif isinstance(data, list):
-            o_type = 'array'
-        elif isinstance(data, str):
-            o_type = 'string'
-        elif isinstance(data, numbers.Integral):
-            o_type = 'int'
-        elif isinstance(data, numbers.Real):
-            o_type = 'float'
-        else:
-            return None
-        if not name:
+        try:
+            if not isinstance(data, dict) and (
+                    isinstance(data, (str, bytes)) or not hasattr(data, '__iter__')):
+                raise ValueError(f'Records expected: {type(data).__name__}')
+            schema = SchemaInference.infer(data, name, namespace, doc, **kwargs)
+            cls._last_error = None
+            return schema
+        except (ValueError, TypeError) as e:
+            cls._last_error = str(e)
             return None
-        schema = {
-            'namespace': namespace,
-            'type': o_type,
-            'name': name,
-            'fields': []
-        }
-        if isinstance(doc, str) and len(doc) > 0:
-            schema['doc'] = doc
-
-        for k, v in data.items():
-            field = AvroTools.create_schema(data=v, name=k)
-            schema['fields'].append(field)
 
-        return schema
+
+Instrumentation.add_cache('schema', AvroTools.schema_cache)
+Instrumentation.add_cache('resolver', AvroTools.resolver)
+Instrumentation.add_cache('http', AvroTools.http)
+
+# URL documents are fetched through AvroTools.http (TTL and revalidation)
+AvroTools.fetch_json_url.fetch_volatile = URL_PATTERN.fullmatch
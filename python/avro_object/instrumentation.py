@@ -0,0 +1,192 @@
+import threading
+import time
+
+# Timed phases of AvroObject
+PHASES = ('fetch_schema', 'fetch', 'json_parse', 'validate', 'decode',
+          'to_json', 'to_avro')
+
+# Counters of AvroObject (JSON sizes in characters, Avro sizes in bytes)
+COUNTERS = ('objects', 'errors', 'json_chars_in', 'json_chars_out',
+            'avro_bytes_in', 'avro_bytes_out', 'records_in', 'records_out')
+
+
+class Instrumentation:
+    """
+    Opt-in timers and counters of the AvroObject hot paths
+
+    Disabled by default: instrumented code only checks Instrumentation.enabled,
+    so the overhead is one attribute lookup per phase. When enabled, each
+    phase duration (seconds) and counter increment is aggregated (count, sum
+    and max for timers) and sent to the registered observers, as
+    observer(kind, name, value) with kind 'timer' or 'counter'. Schema
+    documents loaded by fetch_schema (cache misses) are also reported by the
+    fetch and json_parse phases.
+
+    Aggregates and the statistics of registered caches are exported by
+    snapshot() and to_prometheus().
+    """
+    enabled = False
+    _observers = []
+    _caches = {}
+    _timers = {}
+    _counters = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def enable(cls, enabled: bool = True):
+        """
+        Enable (or disable) instrumentation
+
+        :param enabled: collect timers and counters
+        """
+        cls.enabled = enabled
+
+    @classmethod
+    def disable(cls):
+        cls.enabled = False
+
+    @classmethod
+    def add_observer(cls, observer) -> bool:
+        """
+        Add observer of timers and counters (called synchronously, from the instrumented thread)
+
+        :param observer: (str kind, str name, float value) -> None
+        :return: Success
+        :rtype: bool
+        """
+        if not callable(observer):
+            return False
+        with cls._lock:
+            if observer not in cls._observers:
+                cls._observers.append(observer)
+        return True
+
+    @classmethod
+    def remove_observer(cls, observer) -> bool:
+        """
+        :return: observer was registered
+        :rtype: bool
+        """
+        with cls._lock:
+            if observer in cls._observers:
+                cls._observers.remove(observer)
+                return True
+        return False
+
+    @classmethod
+    def add_cache(cls, name: str, cache):
+        """
+        Register cache reported by snapshot (any object with an info() -> dict method)
+
+        :param name: cache name
+        :param cache: cache object
+        """
+        cls._caches[name] = cache
+
+    @staticmethod
+    def clock() -> float:
+        """
+        :return: start time of a phase (see record)
+        :rtype: float
+        """
+        return time.perf_counter()
+
+    @classmethod
+    def record(cls, phase: str, start: float):
+        """
+        Record phase duration since start
+
+        :param phase: phase name
+        :param start: phase start time (from clock)
+        """
+        elapsed = time.perf_counter() - start
+        with cls._lock:
+            timer = cls._timers.get(phase)
+            if timer is None:
+                cls._timers[phase] = [1, elapsed, elapsed]
+            else:
+                timer[0] += 1
+                timer[1] += elapsed
+                if elapsed > timer[2]:
+                    timer[2] = elapsed
+        cls._notify('timer', phase, elapsed)
+
+    @classmethod
+    def count(cls, name: str, value: int = 1):
+        """
+        Increment counter
+
+        :param name: counter name
+        :param value: increment
+        """
+        with cls._lock:
+            cls._counters[name] = cls._counters.get(name, 0) + value
+        cls._notify('counter', name, value)
+
+    @classmethod
+    def _notify(cls, kind: str, name: str, value):
+        for observer in cls._observers:
+            try:
+                observer(kind, name, value)
+            except Exception:
+                # Observers must not break the instrumented operation
+                pass
+
+    @classmethod
+    def reset(cls):
+        """
+        Clear timers and counters (observers and caches are kept)
+        """
+        with cls._lock:
+            cls._timers.clear()
+            cls._counters.clear()
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        """
+        :return: aggregated statistics: timers (count, total and max seconds by phase), counters and caches (info of registered caches)
+        :rtype: dict
+        """
+        with cls._lock:
+            timers = {phase: {'count': count, 'total': total, 'max': maximum}
+                      for phase, (count, total, maximum) in cls._timers.items()}
+            counters = dict(cls._counters)
+        return {'enabled': cls.enabled,
+                'timers': timers,
+                'counters': counters,
+                'caches': {name: cache.info()
+                           for name, cache in cls._caches.items()}}
+
+    @classmethod
+    def to_prometheus(cls, prefix: str = 'avro_object') -> str:
+        """
+        Snapshot in the Prometheus text exposition format
+
+        :param prefix: metric names prefix
+        :rtype: str
+        """
+        snapshot = cls.snapshot()
+        lines = [f'# HELP {prefix}_phase_seconds Time spent by phase',
+                 f'# TYPE {prefix}_phase_seconds summary']
+        for phase, timer in sorted(snapshot['timers'].items()):
+            lines.append(f'{prefix}_phase_seconds_count{{phase="{phase}"}} '
+                         f'{timer["count"]}')
+            lines.append(f'{prefix}_phase_seconds_sum{{phase="{phase}"}} '
+                         f'{timer["total"]!r}')
+        lines += [f'# HELP {prefix}_phase_seconds_max Slowest call by phase',
+                  f'# TYPE {prefix}_phase_seconds_max gauge']
+        for phase, timer in sorted(snapshot['timers'].items()):
+            lines.append(f'{prefix}_phase_seconds_max{{phase="{phase}"}} '
+                         f'{timer["max"]!r}')
+        for name, value in sorted(snapshot['counters'].items()):
+            lines += [f'# TYPE {prefix}_{name}_total counter',
+                      f'{prefix}_{name}_total {value}']
+        for metric in ('hits', 'misses', 'size'):
+            kind = 'gauge' if metric == 'size' else 'counter'
+            metric_name = f'{prefix}_cache_{metric}' + \
+                ('' if kind == 'gauge' else '_total')
+            lines.append(f'# TYPE {metric_name} {kind}')
+            for name, info in sorted(snapshot['caches'].items()):
+                if metric in info:
+                    lines.append(f'{metric_name}{{cache="{name}"}} {info[metric]}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,117 @@
+import datetime
+import decimal
+import json
+import os
+import uuid
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+def json_default(o):
+    """
+    Default JSON serializer for date, time and datetime (ISO 8601), UUID and Decimal
+    """
+    if isinstance(o, (datetime.date, datetime.time)):
+        return o.isoformat()
+    if isinstance(o, (uuid.UUID, decimal.Decimal)):
+        return str(o)
+    return None
+
+
+class JsonBackend:
+    """
+    Standard library JSON encoder/decoder
+    """
+    name = 'json'
+
+    def loads(self, s):
+        """
+        :param s: JSON as str or bytes
+        :return: parsed object
+        """
+        return json.loads(s)
+
+    def dumps(self, obj) -> str:
+        """
+        :param obj: object to serialize
+        :return: JSON
+        :rtype: str
+        """
+        return json.dumps(obj, default=json_default)
+
+
+class OrjsonBackend(JsonBackend):
+    """
+    orjson encoder/decoder (native datetime, date and time support)
+    """
+    name = 'orjson'
+
+    def loads(self, s):
+        return orjson.loads(s)
+
+    def dumps(self, obj) -> str:
+        try:
+            return orjson.dumps(obj, default=json_default,
+                                option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except TypeError:
+            # Unsupported by orjson (i.e. integers above 64 bits)
+            return JsonBackend.dumps(self, obj)
+
+
+class UjsonBackend(JsonBackend):
+    """
+    ujson encoder/decoder
+    """
+    name = 'ujson'
+
+    def loads(self, s):
+        return ujson.loads(s)
+
+    def dumps(self, obj) -> str:
+        try:
+            return ujson.dumps(obj, ensure_ascii=False)
+        except (TypeError, OverflowError):
+            # ujson has no datetime support
+            return JsonBackend.dumps(self, obj)
+
+
+# Available backends, by preference order
+JSON_BACKENDS = {}
+for _backend, _module in [(OrjsonBackend, orjson),
+                          (UjsonBackend, ujson),
+                          (JsonBackend, json)]:
+    if _module is not None:
+        JSON_BACKENDS[_backend.name] = _backend()
+
+
+def get_json_backend(name: str = None) -> JsonBackend:
+    """
+    Get JSON backend by name
+
+    :param name: 'orjson', 'ujson', 'json' or None for the fastest available
+    :rtype: JsonBackend
+    """
+    if name is None:
+        return next(iter(JSON_BACKENDS.values()))
+    if name not in JSON_BACKENDS:
+        raise ValueError(f'JSON backend not available: {name}')
+    return JSON_BACKENDS[name]
+
+
+def default_json_backend() -> JsonBackend:
+    """
+    JSON backend selected at import by the environment variable
+    AVRO_OBJECT_JSON_BACKEND, or the fastest available
+    """
+    try:
+        return get_json_backend(os.environ.get('AVRO_OBJECT_JSON_BACKEND'))
+    except ValueError:
+        return get_json_backend()
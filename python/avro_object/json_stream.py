@@ -0,0 +1,121 @@
+import json
+import re
+
+# Characters read at once from streams of concatenated JSON values and arrays
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = re.compile('[ \t\n\r\ufeff]*')
+
+
+def iter_json(fo, loads=json.loads, chunk_size: int = CHUNK_SIZE):
+    """
+    Iterate over the JSON values of a text stream, parsing them incrementally
+
+    Streams are read as JSON Lines (one value per line, parsed by loads),
+    or as concatenated JSON values (values spanning lines) when the first
+    line is not a complete value. Streams starting with '[' are read as a
+    JSON array, yielding its items (only whitespace may follow the array).
+    Memory usage is bounded by the size of one value plus chunk_size.
+
+    :param fo: text file object
+    :param loads: JSON parser of JSON Lines values (str -> object)
+    :param chunk_size: characters read at once (concatenated values and arrays)
+    :return: generator of parsed values
+    :raises ValueError: invalid JSON (with the line number of JSON Lines)
+    """
+    first = ''
+    line_number = 1
+    while not first:
+        char = fo.read(1)
+        if not char:
+            return
+        if char == '\n':
+            line_number += 1
+        first = char.strip().lstrip('\ufeff')
+
+    if first == '[':
+        yield from _iter_values(fo, fo.read(chunk_size), chunk_size, True)
+        return
+
+    line = first + fo.readline()
+    text = line.strip()
+    try:
+        value = loads(text)
+    except ValueError:
+        # Values spanning lines: concatenated JSON values
+        yield from _iter_values(fo, text, chunk_size, False)
+        return
+    yield value
+
+    for line_number, line in enumerate(iter(fo.readline, ''), line_number + 1):
+        text = line.strip()
+        if text:
+            try:
+                value = loads(text)
+            except ValueError as e:
+                raise ValueError(
+                    f'Invalid JSON Lines: line {line_number}: {e}') from e
+            yield value
+
+
+def _iter_values(fo, buffer: str, chunk_size: int, array: bool):
+    decode = json.JSONDecoder().raw_decode
+    pos = 0
+    read_size = chunk_size
+    after_value = after_comma = False
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos == len(buffer):
+            chunk = fo.read(chunk_size)
+            if not chunk:
+                if array:
+                    raise ValueError('Invalid JSON array: missing ]')
+                return
+            buffer, pos = chunk, 0
+            continue
+
+        if array:
+            char = buffer[pos]
+            if char == ']':
+                if after_comma:
+                    raise ValueError('Invalid JSON array: trailing , before ]')
+                _check_end(fo, buffer, pos + 1, chunk_size)
+                return
+            if after_value:
+                if char != ',':
+                    raise ValueError(
+                        f'Invalid JSON array: expected , or ] instead of {char!r}')
+                pos += 1
+                after_value, after_comma = False, True
+                continue
+
+        try:
+            value, end = decode(buffer, pos)
+        except json.JSONDecodeError:
+            end = None
+        if end is None or end == len(buffer):
+            # Incomplete value (or a number that may continue): read more
+            chunk = fo.read(read_size)
+            if chunk:
+                buffer, pos = buffer[pos:] + chunk, 0
+                # Large values are read in growing chunks
+                read_size *= 2
+                continue
+            if end is None:
+                value, end = decode(buffer, pos)
+        read_size = chunk_size
+        yield value
+        pos = end
+        after_value, after_comma = True, False
+
+
+def _check_end(fo, buffer: str, pos: int, chunk_size: int):
+    # Only whitespace may follow a JSON array
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos < len(buffer):
+            raise ValueError(
+                f'Invalid JSON array: unexpected {buffer[pos]!r} after ]')
+        buffer, pos = fo.read(chunk_size), 0
+        if not buffer:
+            return
@@ -0,0 +1,401 @@
+import datetime
+import decimal
+import numbers
+import random
+import re
+import uuid
+
+# Avro names of records and fields
+NAME_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+UUID_PATTERN = re.compile(
+    r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$')
+
+_INT32_RANGE = (-(1 << 31), (1 << 31) - 1)
+
+# Kinds of values by exact Python type (subclasses are checked by isinstance)
+_KINDS = {
+    bool: 'boolean',
+    float: 'double',
+    bytes: 'bytes',
+    datetime.datetime: 'timestamp-micros',
+    datetime.date: 'date',
+    datetime.time: 'time-micros',
+    uuid.UUID: 'uuid',
+    decimal.Decimal: 'decimal',
+}
+
+# Avro types of the inferred kinds, in union order
+_TYPES = {
+    'boolean': 'boolean',
+    'int': 'int',
+    'long': 'long',
+    'double': 'double',
+    'date': {'type': 'int', 'logicalType': 'date'},
+    'time-micros': {'type': 'long', 'logicalType': 'time-micros'},
+    'timestamp-micros': {'type': 'long', 'logicalType': 'timestamp-micros'},
+    'string': 'string',
+    'uuid': {'type': 'string', 'logicalType': 'uuid'},
+    'bytes': 'bytes',
+    'decimal': 'bytes',
+}
+
+
+class _TypeNode:
+    """
+    Types seen in one position of the records (field, array item or map value)
+    """
+    __slots__ = ('count', 'records', 'null', 'kinds', 'fields', 'is_map',
+                 'values', 'items', 'precision', 'scale', 'strings')
+
+    def __init__(self):
+        self.count = 0          # values added (missing record fields are not counted)
+        self.records = 0        # dicts added
+        self.null = False
+        self.kinds = set()
+        self.fields = None      # record fields: name -> _TypeNode
+        self.is_map = False
+        self.values = None      # map values
+        self.items = None       # array items
+        self.precision = 0      # decimal integer digits
+        self.scale = 0          # decimal fraction digits
+        self.strings = None     # format of all strings: 'date', 'uuid' or 'string'
+
+
+class SchemaInference:
+    """
+    Incremental inference of an Avro record schema from records
+
+    Records are scanned once and only the inferred types are kept, so memory
+    doesn't depend on the number of records. Types seen in the same position
+    are merged: numbers are widened (int, long, double), nulls and missing
+    fields make fields nullable, and other combinations become unions.
+    Nested dicts become records, or maps when their keys are not valid Avro
+    names or exceed max_fields. Dates, times, datetimes, UUIDs and decimals
+    become logical types, as well as strings formatted as dates (YYYY-MM-DD)
+    or UUIDs when string_formats is enabled (ISO datetime strings remain
+    strings, as fastavro can't write them as timestamps). Conflicting logical
+    types fall back to their base type.
+
+    :param name: name of the record schema
+    :param namespace: namespace of the record schema
+    :param sample_rate: fraction of the records used for inference (0 to 1)
+    :param max_records: maximum number of inferred records (None for all records)
+    :param max_fields: maximum number of keys of nested records (more keys make a map)
+    :param string_formats: infer date and uuid logical types from strings
+    :param seed: random seed of the sampling
+    """
+
+    def __init__(self, name: str, namespace: str = None,
+                 sample_rate: float = 1.0, max_records: int = None,
+                 max_fields: int = 256, string_formats: bool = True,
+                 seed=None):
+        if not name or not NAME_PATTERN.match(name):
+            raise ValueError(f'Invalid schema name: {name}')
+        self.name = name
+        self.namespace = namespace
+        self.sample_rate = sample_rate
+        self.max_records = max_records
+        self.max_fields = max_fields
+        self.string_formats = string_formats
+        self.seen = 0
+        self._random = random.Random(seed)
+        self._root = _TypeNode()
+        self._root.fields = {}
+
+    def __len__(self):
+        return self._root.count
+
+    @property
+    def full(self) -> bool:
+        """
+        :return: max_records were inferred
+        :rtype: bool
+        """
+        return self.max_records is not None and \
+            self._root.count >= self.max_records
+
+    def add(self, record: dict) -> bool:
+        """
+        Infer types of one record (subject to sampling)
+
+        :param record: dict
+        :return: record was used for inference
+        :rtype: bool
+        """
+        if not isinstance(record, dict):
+            raise ValueError(f'Record is not a dict: {type(record).__name__}')
+        self.seen += 1
+        if self.full or (self.sample_rate < 1 and
+                         self._random.random() >= self.sample_rate):
+            return False
+        self._add_record(self._root, record, True)
+        return True
+
+    def add_many(self, records) -> int:
+        """
+        Infer types of records (stops when max_records were inferred)
+
+        :param records: iterable of dicts
+        :return: number of records used for inference
+        :rtype: int
+        """
+        count = len(self)
+        for record in records:
+            if self.full:
+                break
+            self.add(record)
+        return len(self) - count
+
+    def _add(self, node: _TypeNode, value):
+        node.count += 1
+        value_type = type(value)
+        if value_type is str:
+            if node.strings != 'string':
+                self._add_string(node, value)
+            return
+        if value is None:
+            node.null = True
+            return
+
+        kind = _KINDS.get(value_type)
+        if kind is None and value_type is int:
+            kind = 'int' if _INT32_RANGE[0] <= value <= _INT32_RANGE[1] \
+                else 'long'
+        elif kind is None:
+            if isinstance(value, str):
+                self._add_string(node, value)
+                return
+            if isinstance(value, bool):
+                kind = 'boolean'
+            elif isinstance(value, numbers.Integral):
+                kind = 'int' if _INT32_RANGE[0] <= value <= _INT32_RANGE[1] \
+                    else 'long'
+            elif isinstance(value, numbers.Real):
+                kind = 'double'
+            elif isinstance(value, dict):
+                self._add_record(node, value, False)
+                return
+            elif isinstance(value, (list, tuple)):
+                if node.items is None:
+                    node.items = _TypeNode()
+                node.kinds.add('array')
+                for item in value:
+                    self._add(node.items, item)
+                return
+            else:
+                for python_type, python_kind in _KINDS.items():
+                    if isinstance(value, python_type):
+                        kind = python_kind
+                        break
+                else:
+                    kind = 'string'
+        if kind == 'decimal':
+            _, digits, exponent = value.as_tuple()
+            if isinstance(exponent, int):
+                node.scale = max(node.scale, -exponent)
+                node.precision = max(node.precision, len(digits) + exponent)
+        node.kinds.add(kind)
+
+    def _add_string(self, node: _TypeNode, value: str):
+        # Called until a string without format is seen
+        fmt = node.strings
+        if not self.string_formats:
+            fmt = 'string'
+        elif fmt != 'uuid' and len(value) == 10 and DATE_PATTERN.match(value):
+            try:
+                datetime.datetime.strptime(value, '%Y-%m-%d')
+                fmt = 'date'
+            except ValueError:
+                fmt = 'string'
+        elif fmt != 'date' and len(value) == 36 and UUID_PATTERN.match(value):
+            fmt = 'uuid'
+        else:
+            fmt = 'string'
+        node.strings = fmt
+        node.kinds.add('text')
+
+    def _add_record(self, node: _TypeNode, record: dict, root: bool):
+        if root:
+            node.count += 1
+        else:
+            node.kinds.add('record')
+        node.records += 1
+        if node.is_map:
+            for value in record.values():
+                self._add(node.values, value)
+            return
+        if node.fields is None:
+            node.fields = {}
+        fields = node.fields
+        for key, value in record.items():
+            child = fields.get(key)
+            if child is None:
+                if not root and (len(fields) >= self.max_fields or
+                                 not isinstance(key, str) or
+                                 not NAME_PATTERN.match(key)):
+                    # Values of this dict are added again as map values
+                    node.records -= 1
+                    self._to_map(node)
+                    node.records += 1
+                    for map_value in record.values():
+                        self._add(node.values, map_value)
+                    return
+                child = fields[key] = _TypeNode()
+            self._add(child, value)
+
+    def _to_map(self, node: _TypeNode):
+        values = _TypeNode()
+        for child in (node.fields or {}).values():
+            self._merge(values, child)
+        node.fields = None
+        node.is_map = True
+        node.values = values
+
+    def _merge(self, node: _TypeNode, other: _TypeNode):
+        node.count += other.count
+        node.records += other.records
+        node.null = node.null or other.null
+        node.kinds.update(other.kinds)
+        node.precision = max(node.precision, other.precision)
+        node.scale = max(node.scale, other.scale)
+        if other.strings is not None:
+            node.strings = other.strings if node.strings in (None, other.strings) \
+                else 'string'
+        if other.items is not None:
+            if node.items is None:
+                node.items = _TypeNode()
+            self._merge(node.items, other.items)
+        if other.is_map:
+            if not node.is_map:
+                self._to_map(node)
+            self._merge(node.values, other.values)
+        elif other.fields is not None:
+            if node.is_map:
+                for child in other.fields.values():
+                    self._merge(node.values, child)
+                return
+            if node.fields is None:
+                node.fields = {}
+            for key, child in other.fields.items():
+                target = node.fields.get(key)
+                if target is None:
+                    target = node.fields[key] = _TypeNode()
+                self._merge(target, child)
+            if len(node.fields) > self.max_fields:
+                self._to_map(node)
+
+    def schema(self, doc: str = None) -> dict:
+        """
+        :param doc: documentation of the record schema
+        :return: inferred Avro record schema
+        :rtype: dict
+        """
+        schema = {'type': 'record', 'name': self.name}
+        if self.namespace:
+            schema['namespace'] = self.namespace
+        if isinstance(doc, str) and len(doc) > 0:
+            schema['doc'] = doc
+        schema['fields'] = self._fields(self._root, {self.name}, self.name)
+        return schema
+
+    def _fields(self, node: _TypeNode, names: set, path: str) -> list:
+        fields = []
+        for key, child in node.fields.items():
+            avro_type = self._type(child, names, f'{path}_{key}')
+            if child.count < node.records or child.null:
+                # Missing in some records or null
+                avro_type = self._nullable(avro_type)
+                fields.append({'name': key, 'type': avro_type, 'default': None})
+            else:
+                fields.append({'name': key, 'type': avro_type})
+        return fields
+
+    @staticmethod
+    def _nullable(avro_type):
+        if isinstance(avro_type, list):
+            return avro_type if 'null' in avro_type else ['null'] + avro_type
+        return avro_type if avro_type == 'null' else ['null', avro_type]
+
+    def _type(self, node: _TypeNode, names: set, path: str):
+        kinds = set(node.kinds)
+        if 'text' in kinds:
+            kinds.discard('text')
+            kinds.add(node.strings or 'string')
+
+        # Numbers are widened
+        if 'double' in kinds:
+            kinds.difference_update(('int', 'long'))
+        elif 'long' in kinds:
+            kinds.discard('int')
+        # Conflicting logical types fall back to their base type
+        if 'date' in kinds and kinds & {'int', 'long', 'double'}:
+            kinds.discard('date')
+        if kinds & {'time-micros', 'timestamp-micros'} and \
+                kinds & {'long', 'double'}:
+            kinds.difference_update(('time-micros', 'timestamp-micros'))
+        if 'time-micros' in kinds and 'timestamp-micros' in kinds:
+            kinds.difference_update(('time-micros', 'timestamp-micros'))
+            kinds.add('long')
+        if 'uuid' in kinds and 'string' in kinds:
+            kinds.discard('uuid')
+        if 'decimal' in kinds and 'bytes' in kinds:
+            kinds.discard('decimal')
+
+        types = []
+        for kind in _TYPES:
+            if kind not in kinds:
+                continue
+            if kind == 'decimal':
+                types.append({'type': 'bytes', 'logicalType': 'decimal',
+                              'precision': max(node.precision + node.scale, 1),
+                              'scale': node.scale})
+            else:
+                types.append(_TYPES[kind])
+        if 'record' in kinds:
+            if node.is_map:
+                types.append({'type': 'map',
+                              'values': self._type(node.values, names, path)})
+            else:
+                name = self._record_name(path, names)
+                types.append({'type': 'record', 'name': name,
+                              'fields': self._fields(node, names, name)})
+        if 'array' in kinds:
+            types.append({'type': 'array',
+                          'items': self._type(node.items, names, path)})
+
+        if node.null:
+            types.insert(0, 'null')
+        if not types:
+            return 'null'
+        return types[0] if len(types) == 1 else types
+
+    @staticmethod
+    def _record_name(path: str, names: set) -> str:
+        name = path
+        suffix = 1
+        while name in names:
+            suffix += 1
+            name = f'{path}_{suffix}'
+        names.add(name)
+        return name
+
+    @classmethod
+    def infer(cls, records, name: str, namespace: str = None,
+              doc: str = None, **kwargs) -> dict:
+        """
+        Infer the Avro record schema of records in a single pass
+
+        :param records: dict or iterable of dicts
+        :param name: name of the record schema
+        :param namespace: namespace of the record schema
+        :param doc: documentation of the record schema
+        :param kwargs: SchemaInference arguments (sample_rate, max_records, max_fields, string_formats, seed)
+        :rtype: dict
+        """
+        inference = cls(name, namespace, **kwargs)
+        if isinstance(records, dict):
+            records = [records]
+        inference.add_many(records)
+        return inference.schema(doc)
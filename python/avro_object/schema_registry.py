@@ -0,0 +1,140 @@
+import threading
+import time
+
+from fastavro import parse_schema
+
+from .avro_tools import AvroTools
+
+# Confluent wire format: magic byte 0 + schema ID (4 bytes, big-endian)
+CONFLUENT_MAGIC = b'\x00'
+CONFLUENT_HEADER_SIZE = 5
+
+REGISTRY_PREFIX = 'registry:'
+
+
+def _subject_source(source: str) -> bool:
+    # registry:<subject> may resolve to another schema ID after subject_ttl
+    return not source[len(REGISTRY_PREFIX):].isdigit()
+
+
+class SchemaRegistry:
+    """
+    Confluent-compatible schema registry client
+
+    Parsed schemas are cached by ID for the lifetime of the client (IDs are
+    immutable in the registry), subject versions are cached for subject_ttl
+    seconds.
+
+    :param url: registry base URL
+    :param subject_ttl: seconds a subject version lookup is cached
+    :param timeout: request timeout in seconds
+    """
+
+    def __init__(self, url: str, subject_ttl: float = 300, timeout: float = 10):
+        self.url = url.rstrip('/')
+        self.subject_ttl = subject_ttl
+        self.timeout = timeout
+        self._schemas = {}
+        self._subjects = {}
+        self._lock = threading.RLock()
+
+    def _get(self, path: str) -> dict:
+        response = AvroTools.http.session.get(f'{self.url}{path}',
+                                              timeout=self.timeout)
+        response.raise_for_status()
+        return AvroTools.json_loads(response.text)
+
+    def _add_schema(self, schema_id: int, schema_json: str) -> tuple:
+        schema = parse_schema(AvroTools.json_loads(schema_json))
+        with self._lock:
+            return self._schemas.setdefault(schema_id, (schema, schema_json))
+
+    def _get_schema(self, schema_id: int) -> tuple:
+        entry = self._schemas.get(schema_id)
+        if entry is None:
+            response = self._get(f'/schemas/ids/{schema_id}')
+            entry = self._add_schema(schema_id, response['schema'])
+        return entry
+
+    def get_schema(self, schema_id: int) -> dict:
+        """
+        Get parsed schema by ID
+
+        :param schema_id: registry schema ID
+        :return: parsed schema
+        :rtype: dict
+        """
+        return self._get_schema(schema_id)[0]
+
+    def get_subject(self, subject: str, version='latest') -> tuple:
+        """
+        Get schema ID and parsed schema of a subject version
+
+        :param subject: subject name
+        :param version: version number or 'latest'
+        :return: (schema ID, parsed schema)
+        :rtype: tuple
+        """
+        key = (subject, str(version))
+        with self._lock:
+            entry = self._subjects.get(key)
+        if entry is not None and time.monotonic() - entry[1] < self.subject_ttl:
+            return entry[0], self.get_schema(entry[0])
+
+        response = self._get(f'/subjects/{subject}/versions/{version}')
+        schema_id = response['id']
+        with self._lock:
+            self._subjects[key] = (schema_id, time.monotonic())
+        if schema_id not in self._schemas:
+            self._add_schema(schema_id, response['schema'])
+        return schema_id, self._schemas[schema_id][0]
+
+    def fetch_json(self, source: str) -> tuple:
+        """
+        Fetch method for AvroTools.add_fetch_method
+
+        Sources are registry:<id> or registry:<subject>[/<version>]
+
+        :param source: str with registry source
+        :return: (bool Success, str JSON or Error, origin)
+        """
+        if not source.startswith(REGISTRY_PREFIX):
+            return False, f"Source is not a registry schema: {source}", source
+        try:
+            reference = source[len(REGISTRY_PREFIX):]
+            if reference.isdigit():
+                schema_id = int(reference)
+            else:
+                subject, _, version = reference.partition('/')
+                schema_id, _ = self.get_subject(subject, version or 'latest')
+            return True, self._get_schema(schema_id)[1], source
+        except Exception as e:
+            return False, str(e), source
+
+    # Sources dispatched to fetch_json by AvroTools.add_fetch_method
+    fetch_json.fetch_prefixes = (REGISTRY_PREFIX,)
+    # Subject sources are not cached by AvroTools.schema_cache (see subject_ttl)
+    fetch_json.fetch_volatile = _subject_source
+
+    @staticmethod
+    def schema_id(data: bytes) -> int:
+        """
+        Schema ID from Confluent wire format framing
+
+        :param data: framed Avro datum
+        :return: schema ID, None when data is not framed
+        :rtype: int
+        """
+        if isinstance(data, bytes) and len(data) >= CONFLUENT_HEADER_SIZE \
+                and data[:1] == CONFLUENT_MAGIC:
+            return int.from_bytes(data[1:CONFLUENT_HEADER_SIZE], 'big')
+        return None
+
+    def info(self) -> dict:
+        """
+        :return: cache statistics (schemas, subjects)
+        :rtype: dict
+        """
+        with self._lock:
+            return {'schemas': len(self._schemas),
+                    'subjects': len(self._subjects)}
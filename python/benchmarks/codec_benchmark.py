@@ -0,0 +1,118 @@
+"""
+Throughput and compression ratio of Avro container codecs
+
+Generates records of the examples/delivery.avsc schema from a fixed seed
+(so ratios of different runs are comparable), writes them as an Avro
+container with each available codec and reports encoding/decoding
+throughput (records per second) and compression ratio (null codec size /
+codec size).
+
+Usage: python benchmarks/codec_benchmark.py [--count N] [--block-size N]
+                                            [--seed N] [--json]
+"""
+import argparse
+import io
+import json
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastavro import reader  # noqa: E402
+
+from avro_object import AvroBatch, available_codecs  # noqa: E402
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'examples')
+
+_STATUSES = ['A', 'B', 'C', 'F']
+_PRODUCTS = ['Cerveja', 'Refri', 'Amendoim', 'Agua', 'Suco', 'Cha', 'Energetico',
+             'Salgadinho', 'Chocolate', 'Biscoito']
+
+
+def delivery(rnd: random.Random) -> dict:
+    """
+    Random record of the delivery schema (values shaped as examples/delivery.json)
+    """
+    order_date = datetime.datetime(2019, 1, 1) + datetime.timedelta(
+        seconds=rnd.randint(0, 365 * 24 * 3600))
+    delivery_date = order_date + datetime.timedelta(
+        seconds=rnd.randint(3600, 72 * 3600))
+    update_date = delivery_date + datetime.timedelta(
+        seconds=rnd.randint(0, 4 * 3600))
+    return {
+        'business_unity': str(rnd.randint(100, 130)),
+        'map_number': rnd.randint(1, 500),
+        'delivery_date': str(delivery_date),
+        'client_number': rnd.randint(1, 100000),
+        'taxvat': f'{rnd.randint(0, 10 ** 14 - 1):014d}'
+                  if rnd.random() < 0.8 else '',
+        'order_number': rnd.randint(1, 10 ** 7),
+        'order_date': str(order_date),
+        'order_status': rnd.choice(_STATUSES),
+        'buffer_situation': rnd.choice(['?', 'OK', 'PENDING']),
+        'invoice_number': str(rnd.randint(10000, 99999)),
+        'invoice_status_update_date': str(update_date),
+        'invoice_status': rnd.choice(_STATUSES),
+        'invoice_itens': [{'product_number': product + 1,
+                           'item_description': _PRODUCTS[product],
+                           'item_count': rnd.randint(1, 48)}
+                          for product in rnd.sample(range(len(_PRODUCTS)),
+                                                    rnd.randint(1, 6))]
+    }
+
+
+def measure(batch: AvroBatch, codec: str, null_size: int) -> dict:
+    out = io.BytesIO()
+    start = time.perf_counter()
+    batch.write(out, codec)
+    encode_time = time.perf_counter() - start
+    data = out.getvalue()
+
+    start = time.perf_counter()
+    count = sum(1 for _ in reader(io.BytesIO(data)))
+    decode_time = time.perf_counter() - start
+
+    return {'codec': codec,
+            'records': count,
+            'size': len(data),
+            'ratio': round(null_size / len(data), 2),
+            'encode_records_per_s': round(count / encode_time),
+            'decode_records_per_s': round(count / decode_time)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--count', type=int, default=20000)
+    parser.add_argument('--block-size', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='JSON report')
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    batch = AvroBatch([delivery(rnd) for _ in range(args.count)],
+                      os.path.join(EXAMPLES, 'delivery.avsc'),
+                      args.block_size)
+    if not batch.ok:
+        sys.exit(batch.last_error)
+
+    null_size = len(batch.to_avro())
+    results = [measure(batch, codec, null_size)
+               for codec in available_codecs()]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f'{"codec":<12}{"size":>12}{"ratio":>8}{"encode rec/s":>14}'
+          f'{"decode rec/s":>14}')
+    for result in results:
+        print(f'{result["codec"]:<12}{result["size"]:>12}{result["ratio"]:>8}'
+              f'{result["encode_records_per_s"]:>14}'
+              f'{result["decode_records_per_s"]:>14}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Memory footprint of AvroObject instances by cache policy
+
+Creates AvroObject instances of the test User schema, serializes them to JSON
+and Avro, and reports the memory retained per instance.
+
+Usage: python benchmarks/memory_footprint.py [--count N] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from avro_object import AvroObject  # noqa: E402
+from avro_object.avro_tools import CACHE_POLICIES  # noqa: E402
+
+SCHEMA = {
+    'namespace': 'avroobject.test',
+    'type': 'record',
+    'name': 'User',
+    'fields': [
+        {'name': 'UserName', 'type': 'string'},
+        {'name': 'Age', 'type': ['int', 'null']},
+        {'name': 'Active', 'type': 'boolean'}
+    ]
+}
+
+
+def measure(cache: str, count: int) -> dict:
+    # Parse schema before tracing, it is shared by all instances
+    AvroObject({'UserName': '', 'Age': 0, 'Active': True}, SCHEMA)
+
+    tracemalloc.start()
+    objects = []
+    for i in range(count):
+        ao = AvroObject({'UserName': f'User {i:08d}',
+                         'Age': i % 100,
+                         'Active': i % 2 == 0}, SCHEMA, cache=cache)
+        ao.to_json()
+        ao.to_avro()
+        objects.append(ao)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'cache': cache,
+            'count': count,
+            'instance_size': sys.getsizeof(objects[0]),
+            'bytes_per_instance': round(current / count, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--json', action='store_true', help='JSON report')
+    args = parser.parse_args()
+
+    results = [measure(cache, args.count) for cache in CACHE_POLICIES]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f'{"cache":<10}{"instance":>10}{"bytes/instance":>16}')
+    for result in results:
+        print(f'{result["cache"]:<10}{result["instance_size"]:>10}'
+              f'{result["bytes_per_instance"]:>16}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+"""
+Benchmark suite of AvroObject construction, serialization and validation
+
+Runs every constructor path (dict/list, JSON string, JSON file, Avro bytes,
+Avro file, with and without schema), to_json, to_avro, validation and
+create_schema over synthetic datasets (small, wide, nested and large), and
+reports the time per operation. Datasets are generated from a fixed seed, so
+reports of different runs (versions, machines, dependencies) are comparable:
+--output saves a JSON report and --compare checks the medians against a saved
+report, exiting with status 1 when any case regresses beyond --threshold.
+
+Usage: python benchmarks/suite.py [--quick] [--filter TEXT] [--json]
+                                  [--output FILE] [--compare FILE] [--threshold R]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import string
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fastavro  # noqa: E402
+
+import avro_object  # noqa: E402
+from avro_object import AvroObject, AvroTools  # noqa: E402
+
+REPORT_VERSION = 1
+
+USER_SCHEMA = {
+    'namespace': 'avroobject.benchmark',
+    'type': 'record',
+    'name': 'User',
+    'fields': [
+        {'name': 'UserName', 'type': 'string'},
+        {'name': 'Age', 'type': ['int', 'null']},
+        {'name': 'Active', 'type': 'boolean'}
+    ]
+}
+
+# Field types of the wide dataset, by field index
+_WIDE_TYPES = ['int', 'long', 'double', 'string', 'boolean', ['null', 'string']]
+
+
+def _text(rnd: random.Random, size: int) -> str:
+    return ''.join(rnd.choice(string.ascii_letters) for _ in range(size))
+
+
+def _user(rnd: random.Random) -> dict:
+    return {'UserName': _text(rnd, 12),
+            'Age': rnd.randint(18, 90),
+            'Active': rnd.random() < 0.5}
+
+
+def small_dataset(rnd: random.Random, quick: bool) -> tuple:
+    return USER_SCHEMA, _user(rnd)
+
+
+def wide_dataset(rnd: random.Random, quick: bool) -> tuple:
+    fields = [{'name': f'field_{i:03d}', 'type': _WIDE_TYPES[i % len(_WIDE_TYPES)]}
+              for i in range(100)]
+    values = {'int': lambda: rnd.randint(-1000, 1000),
+              'long': lambda: rnd.randint(0, 1 << 40),
+              'double': rnd.random,
+              'string': lambda: _text(rnd, 16),
+              'boolean': lambda: rnd.random() < 0.5}
+    record = {field['name']: values[field['type'] if isinstance(field['type'], str)
+                                    else 'string']()
+              for field in fields}
+    return {'namespace': 'avroobject.benchmark', 'type': 'record',
+            'name': 'Wide', 'fields': fields}, record
+
+
+def nested_dataset(rnd: random.Random, quick: bool) -> tuple:
+    schema = {
+        'namespace': 'avroobject.benchmark',
+        'type': 'record',
+        'name': 'Order',
+        'fields': [
+            {'name': 'id', 'type': 'long'},
+            {'name': 'status', 'type': {'type': 'enum', 'name': 'Status',
+                                        'symbols': ['OPEN', 'PAID', 'SHIPPED']}},
+            {'name': 'customer', 'type': {
+                'type': 'record', 'name': 'Customer',
+                'fields': [{'name': 'name', 'type': 'string'},
+                           {'name': 'email', 'type': ['null', 'string']},
+                           {'name': 'address', 'type': {
+                               'type': 'record', 'name': 'Address',
+                               'fields': [{'name': 'street', 'type': 'string'},
+                                          {'name': 'city', 'type': 'string'},
+                                          {'name': 'zip', 'type': 'string'}]}}]}},
+            {'name': 'items', 'type': {'type': 'array', 'items': {
+                'type': 'record', 'name': 'Item',
+                'fields': [{'name': 'sku', 'type': 'string'},
+                           {'name': 'quantity', 'type': 'int'},
+                           {'name': 'price', 'type': 'double'}]}}},
+            {'name': 'tags', 'type': {'type': 'map', 'values': 'string'}},
+            {'name': 'note', 'type': ['null', 'string'], 'default': None},
+        ]
+    }
+    record = {
+        'id': rnd.randint(0, 1 << 40),
+        'status': rnd.choice(['OPEN', 'PAID', 'SHIPPED']),
+        'customer': {'name': _text(rnd, 20),
+                     'email': f'{_text(rnd, 8)}@example.com',
+                     'address': {'street': _text(rnd, 30),
+                                 'city': _text(rnd, 10),
+                                 'zip': f'{rnd.randint(0, 99999):05d}'}},
+        'items': [{'sku': _text(rnd, 8), 'quantity': rnd.randint(1, 10),
+                   'price': round(rnd.uniform(1, 500), 2)}
+                  for _ in range(20)],
+        'tags': {_text(rnd, 6): _text(rnd, 10) for _ in range(10)},
+        'note': None,
+    }
+    return schema, record
+
+
+def large_dataset(rnd: random.Random, quick: bool) -> tuple:
+    return USER_SCHEMA, [_user(rnd) for _ in range(500 if quick else 5000)]
+
+
+DATASETS = {
+    'small': small_dataset,
+    'wide': wide_dataset,
+    'nested': nested_dataset,
+    'large': large_dataset,
+}
+
+
+def cases(schema: dict, data, tmp: str) -> dict:
+    """
+    Benchmarked operations of one dataset
+
+    Constructors with schema skip validation (validate='none'), so they
+    measure loading only; validation is measured by the validate case (by
+    AvroObject.from_records for lists of records).
+
+    :return: dict of case name -> callable
+    :rtype: dict
+    """
+    json_data = json.dumps(data)
+    json_file = os.path.join(tmp, 'data.json')
+    with open(json_file, 'w') as f:
+        f.write(json_data)
+    avro_data = AvroObject(data, schema, validate='none').to_avro()
+    avro_file = os.path.join(tmp, 'data.avro')
+    with open(avro_file, 'wb') as f:
+        f.write(avro_data)
+    records = data if isinstance(data, list) else None
+    native = type(data).__name__
+
+    def validate():
+        if records is None:
+            return AvroObject(data, schema).ok
+        return AvroObject.from_records(records, schema).ok
+
+    operations = {
+        f'construct_{native}': lambda: AvroObject(data),
+        f'construct_{native}_schema': lambda: AvroObject(
+            data, schema, validate='none'),
+        'construct_json_string': lambda: AvroObject(json_data),
+        'construct_json_string_schema': lambda: AvroObject(
+            json_data, schema, validate='none'),
+        'construct_json_file': lambda: AvroObject(json_file),
+        'construct_json_file_schema': lambda: AvroObject(
+            json_file, schema, validate='none'),
+        'construct_avro_bytes': lambda: AvroObject(avro_data),
+        'construct_avro_file': lambda: AvroObject(avro_file),
+        'validate': validate,
+        'create_schema': lambda: AvroTools.create_schema(data, 'Inferred'),
+    }
+
+    # Serialization objects drop their encoded data ('native' cache policy),
+    # so every call serializes again
+    plain = AvroObject(data, cache='native')
+    typed = AvroObject(data, schema, validate='none', cache='native')
+    operations['to_json'] = plain.to_json
+    operations['to_json_schema'] = typed.to_json
+    operations['to_avro'] = typed.to_avro
+    if records is None:
+        operations['to_avro_datum'] = lambda: typed.to_avro(container=False)
+    return operations
+
+
+def measure(operation, repeat: int, min_time: float) -> dict:
+    """
+    Time per operation: the number of calls per round is calibrated to last
+    at least min_time, and statistics are taken over repeat rounds
+
+    :rtype: dict
+    """
+    timer = timeit.Timer(operation)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    times = [elapsed / number * 1e6
+             for elapsed in timer.repeat(repeat, number)]
+    return {'iterations': number,
+            'repeat': repeat,
+            'min_us': round(min(times), 3),
+            'median_us': round(statistics.median(times), 3),
+            'mean_us': round(statistics.mean(times), 3),
+            'stdev_us': round(statistics.stdev(times) if repeat > 1 else 0.0, 3),
+            'ops_per_s': round(1e6 / statistics.median(times), 1)}
+
+
+def environment() -> dict:
+    return {'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'avro_object': avro_object.version,
+            'fastavro': fastavro.__version__,
+            'json_backend': AvroTools.json_backend.name}
+
+
+def run(quick: bool = False, name_filter: str = None, seed: int = 0) -> dict:
+    """
+    Run the suite
+
+    :param quick: smaller datasets and shorter rounds (smoke runs)
+    :param name_filter: run only cases whose name (dataset/case) contains this text
+    :param seed: seed of the synthetic datasets
+    :return: report (version, environment, settings and results)
+    :rtype: dict
+    """
+    repeat, min_time = (3, 0.02) if quick else (7, 0.2)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for dataset, generate in DATASETS.items():
+            schema, data = generate(random.Random(seed), quick)
+            for case, operation in cases(schema, data, tmp).items():
+                name = f'{dataset}/{case}'
+                if name_filter and name_filter not in name:
+                    continue
+                result = {'name': name, 'dataset': dataset, 'case': case}
+                result.update(measure(operation, repeat, min_time))
+                results.append(result)
+    return {'version': REPORT_VERSION,
+            'environment': environment(),
+            'settings': {'quick': quick, 'seed': seed, 'repeat': repeat,
+                         'min_time': min_time},
+            'results': results}
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list:
+    """
+    Compare medians with a baseline report
+
+    :param threshold: maximum accepted slowdown ratio (0.1: 10% slower)
+    :return: list of (name, baseline median, median, ratio, regressed) of cases in both reports
+    :rtype: list
+    """
+    if baseline.get('version') != REPORT_VERSION:
+        raise ValueError(f'Unsupported report version: {baseline.get("version")}')
+    for setting in ('quick', 'seed'):
+        if baseline['settings'].get(setting) != report['settings'][setting]:
+            raise ValueError(f'Reports of different datasets: {setting} is '
+                             f'{baseline["settings"].get(setting)} in the baseline')
+    medians = {result['name']: result['median_us']
+               for result in baseline['results']}
+    comparison = []
+    for result in report['results']:
+        before = medians.get(result['name'])
+        if not before:
+            continue
+        ratio = result['median_us'] / before
+        comparison.append((result['name'], before, result['median_us'],
+                           round(ratio, 3), ratio > 1 + threshold))
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--quick', action='store_true',
+                        help='smaller datasets and shorter rounds')
+    parser.add_argument('--filter', help='run only cases containing this text')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='JSON report')
+    parser.add_argument('--output', help='save JSON report to file')
+    parser.add_argument('--compare', help='baseline JSON report')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='accepted slowdown ratio against the baseline')
+    args = parser.parse_args()
+
+    report = run(args.quick, args.filter, args.seed)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    comparison = None
+    if args.compare:
+        with open(args.compare) as f:
+            comparison = compare(report, json.load(f), args.threshold)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    elif comparison is None:
+        print(f'{"case":<44}{"median us":>12}{"stdev us":>12}{"ops/s":>12}')
+        for result in report['results']:
+            print(f'{result["name"]:<44}{result["median_us"]:>12.2f}'
+                  f'{result["stdev_us"]:>12.2f}{result["ops_per_s"]:>12.0f}')
+    else:
+        print(f'{"case":<44}{"baseline us":>12}{"median us":>12}{"ratio":>8}')
+        for name, before, after, ratio, regressed in comparison:
+            print(f'{name:<44}{before:>12.2f}{after:>12.2f}{ratio:>8.3f}'
+                  + ('  REGRESSION' if regressed else ''))
+
+    if comparison and any(regressed for *_, regressed in comparison):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
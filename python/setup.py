@@ -24,5 +24,13 @@ setuptools.setup(
         'fastavro',
         'requests'
     ],
+    extras_require={
+        'orjson': ['orjson'],
+        'ujson': ['ujson'],
+        'numpy': ['numpy']
+    },
+    entry_points={
+        'console_scripts': ['avro-object=avro_object.__main__:main']
+    },
     python_requires='>=3.6',
 )
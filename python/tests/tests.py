@@ -1,8 +1,36 @@
+import asyncio
+import datetime
+import io
+import json
+import mmap
+import os
+import tempfile
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from itertools import islice
 from pprint import pprint
-import os
+from unittest import mock
+
+from fastavro import block_reader, json_writer, parse_schema, reader
+
+from avro_object import (AvroAsync, AvroBatch, AvroCodec, AvroColumns,
+                         AvroIndex, Instrumentation,
+                         AvroObject, AvroReader, AvroTools, SchemaInference,
+                         SchemaRegistry, StringColumn, available_codecs,
+                         convert_many)
+from avro_object.__main__ import main as cli_main
+from avro_object.avro_tools import HttpCache, SchemaCache, SchemaResolver
+from avro_object.json_stream import iter_json
+
 
-from avro_object import AvroObject, AvroTools
+def run_async(coroutine):
+    # asyncio.run requires Python 3.7
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
 
 
 class AvroObjectTests(unittest.TestCase):
@@ -62,6 +90,31 @@ class AvroObjectTests(unittest.TestCase):
 
         AvroTools.reset_fetch_methods()
 
+    def test_fetch_dispatch(self):
+        calls = []
+
+        def f_prefix(source: str) -> tuple:
+            calls.append(source)
+            return True, '{"prefix": true}', source
+
+        self.assertTrue(AvroTools.add_fetch_method(f_prefix, 'mem:'))
+        try:
+            with mock.patch('os.path.isfile', side_effect=os.path.isfile) as isfile:
+                for source in ('{"a": 1}', ' [1, 2]', '"text"'):
+                    self.assertEqual((), AvroTools.fetch_methods_for(source))
+                    self.assertTrue(AvroTools.fetch_json(source)[0])
+                self.assertEqual((True, '{"prefix": true}', 'mem:x'),
+                                 AvroTools.fetch_json('mem:x'))
+                self.assertEqual((AvroTools.fetch_json_url,),
+                                 AvroTools.fetch_methods_for('https://host/a'))
+                self.assertEqual(0, isfile.call_count)
+            self.assertEqual(['mem:x'], calls)
+            self.assertEqual((AvroTools.fetch_json_file,),
+                             AvroTools.fetch_methods_for('./examples/delivery.avsc'))
+            self.assertEqual((), AvroTools.fetch_methods_for('s3://bucket/a'))
+        finally:
+            AvroTools.reset_fetch_methods()
+
     def test_schema(self):
 
         o = {
@@ -71,9 +124,12 @@ class AvroObjectTests(unittest.TestCase):
         }
 
         s = AvroTools.create_schema(o, 'schema_teste')
-        pprint(s)
-        pprint(o)
-        self.assertTrue(True, 'ok')
+        self.assertEqual([{'name': 'nome', 'type': 'string'},
+                          {'name': 'idade', 'type': 'int'},
+                          {'name': 'ativo', 'type': 'boolean'}], s['fields'])
+        self.assertTrue(AvroObject(o, s).ok)
+        self.assertIsNone(AvroTools.create_schema(5, 'schema_teste'))
+        self.assertIsNone(AvroTools.create_schema(o, 'invalid name'))
 
     def test_objet_of_schema(self):
         ao = AvroObject(self.obj_ok, self.schema)
@@ -138,6 +194,61 @@ class AvroObjectTests(unittest.TestCase):
             print(aoj.last_error)
         self.assertIsNone(aoj.last_error)
 
+    def test_fetch_json_object(self):
+        obj_json = '{"UserName":"Guionardo","Age":42,"Active":true}'
+        success, obj, origin, json_data = AvroTools.fetch_json_object(obj_json)
+        self.assertTrue(success)
+        self.assertEqual('string', origin)
+        self.assertEqual(self.obj_ok, obj)
+        self.assertIs(obj_json, json_data)
+
+        success, message, origin, json_data = AvroTools.fetch_json_object('{')
+        self.assertFalse(success)
+        self.assertIsNone(json_data)
+
+    def test_json_parsed_once(self):
+        obj_json = '{"UserName":"Guionardo","Age":42,"Active":true}'
+        original_loads = json.loads
+        calls = []
+
+        def counting_loads(*args, **kwargs):
+            calls.append(args)
+            return original_loads(*args, **kwargs)
+
+        json.loads = counting_loads
+        try:
+            ao = AvroObject(obj_json, self.schema, json_backend='json')
+        finally:
+            json.loads = original_loads
+        self.assertTrue(ao.ok, ao.last_error)
+        self.assertEqual(1, len(calls))
+        self.assertEqual(obj_json, ao.json)
+
+    def test_json_backends(self):
+        data = {'UserName': 'Guionardo',
+                'Birth': datetime.date(1977, 5, 4),
+                'Login': datetime.datetime(2019, 10, 1, 8, 30),
+                'Alarm': datetime.time(7, 15)}
+        for backend in AvroTools.json_backend_names():
+            ao = AvroObject(data)
+            obj = json.loads(ao.to_json(json_backend=backend))
+            self.assertEqual({'UserName': 'Guionardo',
+                              'Birth': '1977-05-04',
+                              'Login': '2019-10-01T08:30:00',
+                              'Alarm': '07:15:00'}, obj, backend)
+            ao = AvroObject('{"UserName": "Guionardo"}', json_backend=backend)
+            self.assertEqual({'UserName': 'Guionardo'}, ao.data)
+
+    def test_set_json_backend(self):
+        current = AvroTools.json_backend
+        try:
+            self.assertTrue(AvroTools.set_json_backend('json'))
+            self.assertEqual('json', AvroTools.json_backend.name)
+            self.assertFalse(AvroTools.set_json_backend('simplejson_xyz'))
+            self.assertEqual('json', AvroTools.json_backend.name)
+        finally:
+            AvroTools.json_backend = current
+
     def test_deserialize_avro(self):
         obj_avro = (b'Obj\x01\x04\x14avro.codec\x08null\x16avro.schema\xd6\x03{"type": "record"'
                     b', "name": "User", "namespace": "avroobject.test", "fields": [{"type": "strin'
@@ -148,6 +259,1438 @@ class AvroObjectTests(unittest.TestCase):
         aob = AvroObject(obj_avro)
         pprint(aob.last_error)
 
+    def test_validation_policies(self):
+        for policy in ['eager', 'on_write', 'none']:
+            ao = AvroObject(self.obj_ok, self.schema, validate=policy)
+            self.assertTrue(ao.ok, ao.last_error)
+            self.assertEqual(self.obj_ok, AvroObject(ao.to_avro()).data)
+
+        ao = AvroObject(self.obj_ok, self.schema, validate='lazy')
+        self.assertFalse(ao.ok)
+
+    def test_validation_on_write(self):
+        obj_err = {'UserName': 'Guionardo', 'Age': 42, 'Active': 'yes'}
+        self.assertFalse(AvroObject(obj_err, self.schema).ok)
+
+        ao = AvroObject(obj_err, self.schema, validate='on_write')
+        self.assertTrue(ao.ok)
+        self.assertIsNone(ao.to_avro())
+        self.assertIn('Avro serialization error', ao.last_error)
+        self.assertIsNone(ao.to_avro(container=False))
+        self.assertIsNone(ao.to_json())
+        self.assertIn('JSON serialization error', ao.last_error)
+
+    def test_lazy_pass_through(self):
+        ao = AvroObject(self.serial_bin, lazy=True)
+        self.assertEqual('binary_avro', ao.origin)
+        self.assertIs(self.serial_bin, ao.to_avro())
+        self.assertIsNone(ao._object_data)
+        self.assertTrue(ao.ok, ao.last_error)
+        self.assertEqual(self.obj_ok, ao.data)
+
+    def test_lazy_loading(self):
+        obj_json = '{"UserName":"Guionardo","Age":42,"Active":true}'
+        ao = AvroObject(obj_json, self.schema, lazy=True)
+        self.assertIsNone(ao._object_data)
+        self.assertIsNone(ao._schema)
+        self.assertEqual('string', ao.origin)
+        self.assertTrue(ao.ok, ao.last_error)
+        self.assertEqual(self.obj_ok, ao.data)
+        self.assertEqual(self.obj_ok, AvroObject(ao.to_avro()).data)
+
+        ao = AvroObject(self.obj_err, self.schema, lazy=True)
+        self.assertEqual('dict', ao.origin)
+        self.assertIsNone(ao.to_json())
+        self.assertFalse(ao.ok)
+        self.assertIsNotNone(ao.last_error)
+
+    def test_slots(self):
+        ao = AvroObject(self.obj_ok, self.schema)
+        self.assertFalse(hasattr(ao, '__dict__'))
+
+    def test_cache_policies(self):
+        ao = AvroObject(self.obj_ok, self.schema, cache='native')
+        self.assertIsNotNone(ao.to_avro())
+        self.assertIsNotNone(ao.to_json())
+        self.assertIsNone(ao._avro_data)
+        self.assertIsNone(ao._json_data)
+        self.assertEqual(self.obj_ok, ao.data)
+
+        ao = AvroObject(self.obj_ok, self.schema, cache='encoded')
+        avro_data = ao.to_avro()
+        self.assertIsNone(ao._object_data)
+        self.assertEqual(self.obj_ok, ao.data)
+        self.assertEqual(avro_data, ao.to_avro())
+        self.assertIsNotNone(ao.to_json())
+
+        ao = AvroObject([self.obj_ok], self.schema, validate='none',
+                        cache='encoded')
+        ao.to_json()
+        self.assertIsNone(ao._object_data)
+        self.assertEqual([self.obj_ok], ao.data)
+
+        ao = AvroObject(self.serial_bin, cache='encoded')
+        self.assertIsNone(ao._object_data)
+        self.assertEqual(self.obj_ok, ao.data)
+
+        ao = AvroObject(self.obj_ok, self.schema, cache='everything')
+        self.assertFalse(ao.ok)
+
+    def test_serialize_datum(self):
+        ao = AvroObject(self.obj_ok, self.schema)
+        datum = ao.to_avro(container=False)
+        self.assertEqual(b'\x12Guionardo\x00T\x01', datum)
+        self.assertLess(len(datum), len(ao.to_avro()))
+
+        aod = AvroObject(datum, self.schema, datum=True)
+        self.assertTrue(aod.ok, aod.last_error)
+        self.assertEqual('binary_datum', aod.origin)
+        self.assertEqual(self.obj_ok, aod.data)
+
+    def test_datum_like_single_object(self):
+        schema = {'type': 'record', 'name': 'Point',
+                  'fields': [{'name': 'x', 'type': 'int'}]}
+        datum = AvroObject({'x': -98}, schema).to_avro(container=False)
+        self.assertEqual(b'\xc3\x01', datum)
+        aod = AvroObject(datum, schema, datum=True)
+        self.assertTrue(aod.ok, aod.last_error)
+        self.assertEqual('binary_datum', aod.origin)
+        self.assertEqual({'x': -98}, aod.data)
+
+    def test_datum_without_schema(self):
+        ao = AvroObject(b'\x12Guionardo\x00T\x01', datum=True)
+        self.assertFalse(ao.ok)
+        self.assertIsNotNone(ao.last_error)
+
+    def test_serialize_single_object(self):
+        ao = AvroObject(self.obj_ok, self.schema)
+        message = ao.to_avro(single_object=True)
+        self.assertEqual(b'\xc3\x01', message[:2])
+        self.assertEqual(AvroTools.schema_fingerprint(ao._schema),
+                         message[2:10])
+
+        aos = AvroObject(message, self.schema)
+        self.assertTrue(aos.ok, aos.last_error)
+        self.assertEqual('binary_single_object', aos.origin)
+        self.assertEqual(self.obj_ok, aos.data)
+
+        other_schema = dict(self.schema, name='Other')
+        aoo = AvroObject(message, other_schema)
+        self.assertFalse(aoo.ok)
+        self.assertIn('fingerprint', aoo.last_error)
+
+    def test_schema_fingerprint(self):
+        # Fingerprint of "int" from the Avro specification (little-endian)
+        self.assertEqual(bytes.fromhex('8f5c393f1ad57572'),
+                         AvroTools.schema_fingerprint('int'))
+
+
+class SchemaCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = {
+            'namespace': 'avroobject.test',
+            'type': 'record',
+            'name': 'User',
+            'fields': [
+                {'name': 'UserName', 'type': 'string'},
+                {'name': 'Age', 'type': ['int', 'null'], 'default': '1'},
+                {'name': 'Active', 'type': 'boolean', 'default': 'False'}
+            ]
+        }
+
+    def test_hits_and_misses(self):
+        cache = SchemaCache()
+        success, first, origin = cache.get(self.schema)
+        self.assertTrue(success)
+        self.assertEqual('dict', origin)
+        success, second, origin = cache.get(dict(self.schema))
+        self.assertIs(first, second)
+        self.assertEqual({'hits': 1, 'misses': 1, 'size': 1, 'max_size': 128},
+                         cache.info())
+
+    def test_parsed_and_changed_schemas(self):
+        cache = SchemaCache()
+        success, parsed, _ = cache.get(self.schema)
+        with mock.patch.object(SchemaCache, '_key') as key:
+            self.assertEqual((True, parsed, 'dict'), cache.get(parsed))
+            key.assert_not_called()
+
+        # Dicts changed after use are parsed again
+        self.schema['fields'].append({'name': 'Email', 'type': 'string'})
+        success, changed, _ = cache.get(self.schema)
+        self.assertIsNot(parsed, changed)
+        self.assertEqual('Email', changed['fields'][-1]['name'])
+        ao = AvroObject({'UserName': 'Guionardo', 'Age': 42}, self.schema)
+        self.assertFalse(ao.ok)
+
+    def test_lru_size_limit(self):
+        cache = SchemaCache(max_size=2)
+        for name in ['A', 'B', 'A', 'C']:
+            cache.get(dict(self.schema, name=name))
+        self.assertEqual(2, len(cache))
+        # 'B' was the least recently used entry
+        cache.get(dict(self.schema, name='A'))
+        cache.get(dict(self.schema, name='B'))
+        self.assertEqual(2, cache.info()['hits'])
+        self.assertEqual(4, cache.info()['misses'])
+
+    def test_file_mtime_invalidation(self):
+        cache = SchemaCache()
+        with tempfile.TemporaryDirectory() as tmp:
+            file_schema = os.path.join(tmp, 'user.avsc')
+            with open(file_schema, 'w') as f:
+                json.dump(self.schema, f)
+            success, first, origin = cache.get(file_schema)
+            self.assertTrue(success, first)
+            self.assertEqual(f'file://{file_schema}', origin)
+            self.assertIs(first, cache.get(file_schema)[1])
+
+            with open(file_schema, 'w') as f:
+                json.dump(dict(self.schema, name='Customer'), f)
+            stat = os.stat(file_schema)
+            os.utime(file_schema, ns=(stat.st_atime_ns,
+                                      stat.st_mtime_ns + 1000000000))
+            success, second, origin = cache.get(file_schema)
+            self.assertEqual('avroobject.test.Customer', second['name'])
+            self.assertEqual(2, cache.info()['misses'])
+
+    def test_avro_object_uses_cache(self):
+        AvroTools.schema_cache.invalidate()
+        AvroObject({'UserName': 'A', 'Age': 1, 'Active': True}, self.schema)
+        ao = AvroObject({'UserName': 'B', 'Age': 2, 'Active': False},
+                        self.schema)
+        self.assertTrue(ao.ok, ao.last_error)
+        self.assertGreaterEqual(AvroTools.schema_cache.info()['hits'], 1)
+
+    def test_bad_schema_not_cached(self):
+        cache = SchemaCache()
+        success, message, _ = cache.get({'anydata': False})
+        self.assertFalse(success)
+        self.assertEqual(0, len(cache))
+
+
+class AvroBatchTests(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = {
+            'namespace': 'avroobject.test',
+            'type': 'record',
+            'name': 'Person',
+            'fields': [
+                {'name': 'Name', 'type': 'string'},
+                {'name': 'Age', 'type': ['int', 'null']}
+            ]
+        }
+        self.records = [{'Name': f'Person {i}', 'Age': i} for i in range(10)]
+
+    def test_from_records(self):
+        batch = AvroObject.from_records(self.records, self.schema)
+        self.assertIsInstance(batch, AvroBatch)
+        self.assertTrue(batch.ok, batch.last_error)
+        self.assertEqual(10, len(batch))
+        self.assertEqual({}, batch.errors)
+        records = list(reader(io.BytesIO(batch.to_avro())))
+        self.assertEqual(self.records, records)
+
+    def test_errors_by_index(self):
+        records = list(self.records)
+        records[3] = {'Name': 'Bad', 'Age': 'three'}
+        records[7] = 'not a record'
+        batch = AvroBatch(records, self.schema)
+        self.assertTrue(batch.ok)
+        self.assertEqual([3, 7], sorted(batch.errors))
+        self.assertEqual(8, len(list(reader(io.BytesIO(batch.to_avro())))))
+
+    def test_block_size(self):
+        batch = AvroBatch(iter(self.records), self.schema, block_size=4)
+        blocks = list(block_reader(io.BytesIO(batch.to_avro())))
+        self.assertEqual([4, 4, 2], [block.num_records for block in blocks])
+
+    def test_single_container_is_smaller(self):
+        batch = AvroBatch(self.records, self.schema)
+        single = sum(len(AvroObject(record, self.schema).to_avro())
+                     for record in self.records)
+        self.assertLess(len(batch.to_avro()) * 5, single)
+
+    def test_validation_policies(self):
+        records = self.records + [{'Name': 'Bad', 'Age': 'eleven'}]
+        batch = AvroBatch(records, self.schema, validate='none')
+        self.assertTrue(batch.ok)
+        self.assertEqual(11, len(batch))
+
+        batch = AvroBatch(records, self.schema, validate='on_write')
+        self.assertTrue(batch.ok)
+        self.assertIsNone(batch.to_avro())
+        self.assertIn('Avro serialization error', batch.last_error)
+
+        batch = AvroBatch(self.records, self.schema, validate='on_write')
+        self.assertEqual(self.records,
+                         list(reader(io.BytesIO(batch.to_avro()))))
+
+    def test_codecs(self):
+        self.assertIn('deflate', available_codecs())
+        batch = AvroBatch(self.records * 50, self.schema, block_size=100)
+        plain = batch.to_avro()
+        for codec in available_codecs():
+            data = batch.to_avro(codec=codec)
+            container = reader(io.BytesIO(data))
+            self.assertEqual(codec, container.metadata['avro.codec'])
+            self.assertEqual(self.records * 50, list(container))
+        self.assertLess(len(batch.to_avro(codec='deflate', compression_level=9)),
+                        len(plain) / 4)
+        self.assertIs(plain, batch.to_avro())
+
+    def test_invalid_codec(self):
+        batch = AvroBatch(self.records, self.schema)
+        self.assertIsNone(batch.to_avro(codec='foo'))
+        self.assertIn('Avro serialization error', batch.last_error)
+        self.assertIsNotNone(batch.to_avro())
+
+        ao = AvroObject(self.records[0], self.schema)
+        self.assertIsNone(ao.to_avro(codec='foo'))
+        self.assertIn('codec', ao.last_error)
+
+    def test_object_codec(self):
+        ao = AvroObject(self.records[0], self.schema)
+        data = ao.to_avro(codec='deflate', block_size=1)
+        self.assertEqual([self.records[0]], list(reader(io.BytesIO(data))))
+        self.assertNotEqual(data, ao.to_avro())
+
+    def test_bad_schema(self):
+        batch = AvroBatch(self.records, {'anydata': False})
+        self.assertFalse(batch.ok)
+        self.assertIsNone(batch.to_avro())
+
+
+class AvroReaderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = {
+            'namespace': 'avroobject.test',
+            'type': 'record',
+            'name': 'Person',
+            'fields': [
+                {'name': 'Name', 'type': 'string'},
+                {'name': 'Age', 'type': 'int'}
+            ]
+        }
+        self.records = [{'Name': f'Person {i}', 'Age': i} for i in range(25)]
+        self.avro_data = AvroBatch(self.records, self.schema,
+                                   block_size=10).to_avro()
+
+    def test_iter_bytes(self):
+        records = AvroObject.iter_records(self.avro_data)
+        self.assertNotIsInstance(records, list)
+        self.assertEqual(self.records, list(records))
+
+    def test_iter_limit(self):
+        records = list(AvroObject.iter_records(self.avro_data, limit=3))
+        self.assertEqual(self.records[:3], records)
+
+    def test_iter_file_and_file_object(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file_name = os.path.join(tmp, 'people.avro')
+            with open(file_name, 'wb') as f:
+                f.write(self.avro_data)
+            self.assertEqual(self.records,
+                             list(AvroObject.iter_records(file_name)))
+            with open(file_name, 'rb') as f:
+                self.assertEqual(self.records[:12],
+                                 list(AvroObject.iter_records(f, 12)))
+                self.assertFalse(f.closed)
+
+    def test_reader_schema(self):
+        with AvroReader(self.avro_data) as avro_reader:
+            self.assertEqual('avroobject.test.Person',
+                             avro_reader.schema['name'])
+            self.assertEqual(self.records[:5], avro_reader.read(5))
+            self.assertEqual(self.records[5:], avro_reader.read())
+
+    def test_buffers(self):
+        for buffer in [bytearray(self.avro_data), memoryview(self.avro_data)]:
+            self.assertEqual(self.records,
+                             list(AvroObject.iter_records(buffer)))
+            ao = AvroObject(buffer)
+            self.assertTrue(ao.ok, ao.last_error)
+            self.assertEqual('binary_avro', ao.origin)
+            self.assertEqual(self.records, ao.data)
+
+    def test_mmap_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file_name = os.path.join(tmp, 'people.avro')
+            with open(file_name, 'wb') as f:
+                f.write(self.avro_data)
+
+            ao = AvroObject(file_name)
+            self.assertTrue(ao.ok, ao.last_error)
+            self.assertEqual(f'file://{file_name}', ao.origin)
+            self.assertEqual(self.records, ao.data)
+
+            with open(file_name, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    self.assertEqual(self.records,
+                                     list(AvroObject.iter_records(m)))
+
+    def test_file_opened_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            avro_file = os.path.join(tmp, 'people.avro')
+            with open(avro_file, 'wb') as f:
+                f.write(self.avro_data)
+            json_file = os.path.join(tmp, 'people.json')
+            with open(json_file, 'w') as f:
+                json.dump(self.records, f)
+
+            for file_name in (avro_file, json_file):
+                with mock.patch('builtins.open', wraps=open) as opened, \
+                        mock.patch('os.stat', wraps=os.stat) as stat:
+                    ao = AvroObject(file_name, cache='encoded')
+                    self.assertEqual(1, opened.call_count)
+                    self.assertEqual(0, stat.call_count)
+                self.assertTrue(ao.ok, ao.last_error)
+                self.assertEqual(f'file://{file_name}', ao.origin)
+                self.assertEqual(self.records, ao.data)
+
+    def test_read_range(self):
+        with AvroReader(memoryview(self.avro_data)) as avro_reader:
+            size = len(self.avro_data)
+            self.assertEqual(self.avro_data[avro_reader.header_size - 16:
+                                             avro_reader.header_size],
+                             avro_reader.sync_marker)
+            # Adjacent byte ranges return each record exactly once
+            for parts in [1, 2, 3, 7]:
+                bounds = [size * i // parts for i in range(parts + 1)]
+                records = []
+                for start, end in zip(bounds, bounds[1:]):
+                    records.extend(avro_reader.read_range(start, end))
+                self.assertEqual(self.records, records, parts)
+            self.assertEqual([], list(avro_reader.read_range(size - 1)))
+
+        with open('./examples/delivery.json', 'rb') as f:
+            with self.assertRaises(Exception):
+                AvroReader(f)
+
+    def test_invalid_source(self):
+        with self.assertRaises(TypeError):
+            AvroReader(12)
+        with self.assertRaises(FileNotFoundError):
+            AvroReader('./examples/not_found.avro')
+
+
+class SchemaResolverTests(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = {
+            'namespace': 'avroobject.test',
+            'type': 'record',
+            'name': 'Person',
+            'fields': [
+                {'name': 'Name', 'type': 'string'},
+                {'name': 'Age', 'type': 'int'},
+                {'name': 'Tags', 'type': {'type': 'array', 'items': 'string'}}
+            ]
+        }
+        self.reader_schema = {
+            'namespace': 'avroobject.test',
+            'type': 'record',
+            'name': 'Person',
+            'fields': [
+                {'name': 'Age', 'type': 'double'},
+                {'name': 'Active', 'type': 'boolean', 'default': True}
+            ]
+        }
+        self.records = [{'Name': f'Person {i}', 'Age': i, 'Tags': ['a']}
+                        for i in range(5)]
+        self.projected = [{'Age': float(i), 'Active': True} for i in range(5)]
+
+    def test_plan(self):
+        resolver = SchemaResolver()
+        _, writer, _ = AvroTools.fetch_schema(self.schema)
+        success, plan = resolver.resolve(writer, self.reader_schema)
+        self.assertTrue(success, plan)
+        self.assertEqual(['Age', 'Active'],
+                         [f['name'] for f in plan['reader_schema']['fields']])
+        self.assertIs(plan, resolver.resolve(writer, self.reader_schema)[1])
+        self.assertIs(plan, resolver.resolve(writer, dict(self.reader_schema))[1])
+        self.assertEqual(2, resolver.info()['hits'])
+
+    def test_resolved_once(self):
+        data = AvroObject(self.records[0], self.schema).to_avro(container=False)
+        AvroObject(data, self.schema, datum=True, reader_schema=self.reader_schema)
+        with mock.patch.object(AvroTools, 'schema_fingerprint') as fp:
+            for _ in range(3):
+                ao = AvroObject(data, self.schema, datum=True,
+                                reader_schema=self.reader_schema)
+                self.assertEqual(self.projected[0], ao.data)
+            fp.assert_not_called()
+
+        # Reader schemas changed after use are resolved again
+        self.reader_schema['fields'].append(
+            {'name': 'Tags', 'type': {'type': 'array', 'items': 'string'}})
+        ao = AvroObject(data, self.schema, datum=True,
+                        reader_schema=self.reader_schema)
+        self.assertEqual(dict(self.projected[0], Tags=['a']), ao.data)
+
+    def test_incompatible(self):
+        resolver = SchemaResolver()
+        _, writer, _ = AvroTools.fetch_schema(self.schema)
+        success, error = resolver.resolve(writer, {
+            'type': 'record', 'name': 'avroobject.test.Person',
+            'fields': [{'name': 'Age', 'type': 'string'}]})
+        self.assertFalse(success)
+        self.assertIn('Age', error)
+        success, error = resolver.resolve(writer, {
+            'type': 'record', 'name': 'avroobject.test.Person',
+            'fields': [{'name': 'Email', 'type': 'string'}]})
+        self.assertFalse(success)
+        self.assertIn('Email', error)
+
+    def test_container(self):
+        data = AvroBatch(self.records, self.schema).to_avro()
+        ao = AvroObject(data, reader_schema=self.reader_schema)
+        self.assertTrue(ao.ok, ao.last_error)
+        self.assertEqual(self.projected, ao.data)
+        self.assertEqual(self.projected,
+                         list(reader(io.BytesIO(ao.to_avro()))))
+        self.assertEqual(self.projected[:2], list(AvroObject.iter_records(
+            data, 2, reader_schema=self.reader_schema)))
+
+        ao = AvroObject(data, reader_schema=self.reader_schema, lazy=True,
+                        cache='encoded')
+        self.assertEqual(self.projected, ao.data)
+
+    def test_datum(self):
+        data = AvroObject(self.records[0], self.schema).to_avro(container=False)
+        ao = AvroObject(data, self.schema, datum=True,
+                        reader_schema=self.reader_schema)
+        self.assertTrue(ao.ok, ao.last_error)
+        self.assertEqual(self.projected[0], ao.data)
+
+    def test_incompatible_object(self):
+        data = AvroBatch(self.records, self.schema).to_avro()
+        ao = AvroObject(data, reader_schema={
+            'type': 'record', 'name': 'Other',
+            'fields': [{'name': 'Age', 'type': 'int'}]})
+        self.assertFalse(ao.ok)
+        self.assertIn('Schema resolution error', ao.last_error)
+
+
+class AvroColumnsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = {
+            'namespace': 'avroobject.test',
+            'type': 'record',
+            'name': 'Person',
+            'fields': [
+                {'name': 'Name', 'type': 'string'},
+                {'name': 'Age', 'type': ['null', 'int']},
+                {'name': 'Score', 'type': 'double'},
+                {'name': 'Active', 'type': 'boolean'},
+                {'name': 'Tags', 'type': {'type': 'array', 'items': 'string'}}
+            ]
+        }
+        self.records = [{'Name': f'Person {i}',
+                         'Age': None if i % 3 == 0 else i,
+                         'Score': i / 2,
+                         'Active': i % 2 == 0,
+                         'Tags': ['a'] * (i % 3)} for i in range(25)]
+        self.avro_data = AvroBatch(self.records, self.schema,
+                                   block_size=10).to_avro()
+
+    def test_from_avro(self):
+        columns = AvroColumns.from_avro(self.avro_data, chunk_size=7)
+        self.assertEqual(25, len(columns))
+        self.assertEqual(['Name', 'Age', 'Score', 'Active', 'Tags'],
+                         columns.names)
+        self.assertEqual('int32', columns['Age'].dtype)
+        self.assertEqual('float64', columns['Score'].dtype)
+        self.assertEqual('bool', columns['Active'].dtype)
+        self.assertEqual('object', columns['Name'].dtype)
+        self.assertEqual(12.0, columns['Score'][24])
+        self.assertEqual(['Age'], list(columns.validity))
+        self.assertEqual([False, True, True, False],
+                         list(columns.validity['Age'][:4]))
+        self.assertEqual(self.records, list(columns.to_records()))
+
+    def test_fields_and_offsets(self):
+        columns = AvroColumns.from_avro(io.BytesIO(self.avro_data),
+                                        fields=['Name', 'Age'],
+                                        strings='offsets')
+        self.assertEqual(['Name', 'Age'], columns.names)
+        self.assertIsInstance(columns['Name'], StringColumn)
+        self.assertEqual(26, len(columns['Name'].offsets))
+        self.assertEqual('Person 24', columns['Name'][-1])
+        self.assertEqual([r['Name'] for r in self.records],
+                         list(columns['Name']))
+
+    def test_avro_object(self):
+        columns = AvroObject(self.avro_data).to_columns(fields=['Score'])
+        self.assertEqual(sum(r['Score'] for r in self.records),
+                         columns['Score'].sum())
+
+        columns = AvroObject(self.records, self.schema,
+                             validate='none').to_columns()
+        self.assertEqual(self.records, list(columns.to_records()))
+
+        self.assertIsNone(AvroObject(self.records).to_columns())
+        ao = AvroObject(self.records[0], self.schema)
+        self.assertIsNone(ao.to_columns(strings='arrow'))
+        self.assertIn('Columnar export error', ao.last_error)
+
+
+    def test_from_columns(self):
+        import numpy
+        columns = AvroObject.from_columns({
+            'Name': [r['Name'] for r in self.records],
+            'Age': numpy.array([r['Age'] or 0 for r in self.records]),
+            'Score': numpy.arange(25) / 2,
+            'Active': numpy.arange(25) % 2 == 0,
+            'Tags': [r['Tags'] for r in self.records]},
+            self.schema,
+            {'Age': numpy.array([r['Age'] is not None for r in self.records])})
+        self.assertEqual(self.records, list(reader(io.BytesIO(
+            columns.to_avro()))))
+
+    def test_vectorized_encoding(self):
+        import numpy
+        schema = dict(self.schema, fields=self.schema['fields'][:4])
+        records = [{key: value for key, value in record.items() if key != 'Tags'}
+                   for record in self.records]
+        columns = AvroColumns.from_columns({
+            'Name': StringColumn.from_values(r['Name'] for r in records),
+            'Age': [r['Age'] for r in records],
+            'Score': numpy.arange(25) / 2,
+            'Active': numpy.arange(25) % 2 == 0}, schema)
+        for codec in ('null', 'deflate'):
+            data = columns.to_avro(block_size=10, codec=codec)
+            self.assertEqual(records, list(reader(io.BytesIO(data))))
+
+        # Same encoding as fastavro, except for the random sync markers
+        containers = [columns.to_avro(block_size=10),
+                      AvroBatch(records, schema, block_size=10).to_avro()]
+        self.assertEqual(*[data.replace(AvroReader(data).sync_marker, b'')
+                           for data in containers])
+
+    def test_block_decoding(self):
+        schema = {
+            'type': 'record', 'name': 'Flat',
+            'fields': [
+                {'name': 'Name', 'type': 'string'},
+                {'name': 'Nick', 'type': ['string', 'null']},
+                {'name': 'Id', 'type': 'long'},
+                {'name': 'Age', 'type': ['null', 'int']},
+                {'name': 'Ratio', 'type': 'float'},
+                {'name': 'Score', 'type': ['null', 'double']},
+                {'name': 'Active', 'type': ['boolean', 'null']}
+            ]
+        }
+        records = [{'Name': f'Pessoa {i}' if i % 4 else f'Peßoa {i} ☃',
+                    'Nick': None if i % 3 == 0 else 'n' * (i % 5),
+                    'Id': (-1) ** i * (i << (i % 50)),
+                    'Age': None if i % 5 == 0 else -i,
+                    'Ratio': i / 4,
+                    'Score': None if i % 2 else i * 1.5,
+                    'Active': None if i % 7 == 0 else i % 2 == 0}
+                   for i in range(300)]
+        for codec in ('null', 'deflate', 'bzip2', 'xz'):
+            data = AvroBatch(records, schema, block_size=64).to_avro(codec)
+            for strings in ('object', 'offsets'):
+                columns = AvroColumns.from_avro(data, strings=strings)
+                # File objects are decoded record by record by fastavro
+                expected = AvroColumns.from_avro(io.BytesIO(data),
+                                                 strings=strings)
+                self.assertEqual(expected.names, columns.names)
+                for name in columns.names:
+                    self.assertEqual(list(expected[name]), list(columns[name]))
+                    if name != 'Name' and strings == 'object':
+                        self.assertEqual(expected[name].dtype,
+                                         columns[name].dtype)
+                self.assertEqual(list(expected.validity), list(columns.validity))
+                for name, mask in columns.validity.items():
+                    self.assertEqual(list(expected.validity[name]), list(mask))
+                self.assertEqual(records, list(columns.to_records()))
+
+        columns = AvroColumns.from_avro(
+            AvroBatch(records, schema).to_avro(), fields=['Score', 'Nick'])
+        self.assertEqual(['Nick', 'Score'], columns.names)
+        self.assertEqual(['Nick', 'Score'], list(columns.validity))
+        self.assertEqual([r['Nick'] for r in records], list(columns['Nick']))
+
+        # Block sizes that don't match the records
+        data = bytearray(AvroBatch(records[:1], schema).to_avro())
+        size = AvroReader(bytes(data)).header_size + 1
+        data[size] += 2
+        with self.assertRaises(ValueError):
+            AvroColumns.from_avro(data)
+
+    def test_deflate_blocks(self):
+        import zlib
+        from avro_object.avro_reader import read_long
+
+        def blocks(data):
+            pos = AvroReader(data).header_size
+            while pos < len(data):
+                _, pos = read_long(data, pos)
+                size, pos = read_long(data, pos)
+                yield data[pos:pos + size]
+                pos += size + 16
+
+        columns = AvroColumns.from_columns(
+            {'Age': list(range(25)), 'Score': [i / 2 for i in range(25)]},
+            dict(self.schema, fields=self.schema['fields'][1:3]))
+        plain, deflated = [columns.to_avro(block_size=10, codec=codec)
+                           for codec in ('null', 'deflate')]
+        pairs = list(zip(blocks(plain), blocks(deflated)))
+        self.assertEqual(3, len(pairs))
+        for block, compressed in pairs:
+            decompressor = zlib.decompressobj(-15)
+            self.assertEqual(block, decompressor.decompress(compressed))
+            self.assertTrue(decompressor.eof)
+            self.assertEqual(b'', decompressor.unused_data)
+
+    def test_column_errors(self):
+        import numpy
+        schema = dict(self.schema, fields=self.schema['fields'][1:3])
+        with self.assertRaises(ValueError):
+            AvroColumns.from_columns({'Age': [1, 2], 'Score': [1.0]}, schema)
+        columns = AvroColumns.from_columns(
+            {'Age': numpy.array([1.5]), 'Score': numpy.array([1.0])}, schema)
+        with self.assertRaises(ValueError):
+            columns.to_avro()
+        columns = AvroColumns.from_columns(
+            {'Age': numpy.array([1 << 40]), 'Score': numpy.array([1.0])}, schema)
+        with self.assertRaises(ValueError):
+            columns.to_avro()
+
+    def test_unsigned_long_range(self):
+        import numpy
+        schema = {'type': 'record', 'name': 'Counter',
+                  'fields': [{'name': 'Id', 'type': 'long'}]}
+        columns = AvroColumns.from_columns(
+            {'Id': numpy.array([5, (1 << 63) - 1], dtype='uint64')}, schema)
+        self.assertEqual([{'Id': 5}, {'Id': (1 << 63) - 1}],
+                         list(reader(io.BytesIO(columns.to_avro()))))
+        columns = AvroColumns.from_columns(
+            {'Id': numpy.full(3, (1 << 64) - 1, dtype='uint64')}, schema)
+        with self.assertRaisesRegex(ValueError, 'long range'):
+            columns.to_avro()
+
+    def test_compression_levels(self):
+        import bz2
+        import lzma
+        columns = AvroColumns.from_columns(
+            {'Age': list(range(25)), 'Score': [i / 2 for i in range(25)]},
+            dict(self.schema, fields=self.schema['fields'][1:3]))
+        for codec, module, argument in [('bzip2', bz2, 1), ('xz', lzma, 'preset')]:
+            with mock.patch.object(module, 'compress',
+                                   wraps=module.compress) as compress:
+                data = columns.to_avro(codec=codec, compression_level=1)
+            args = compress.call_args
+            self.assertEqual(1, args.args[argument] if isinstance(argument, int)
+                             else args.kwargs[argument])
+            self.assertEqual(25, len(list(reader(io.BytesIO(data)))))
+
+    def test_null_in_non_nullable(self):
+        schema = {'type': 'record', 'name': 'Row', 'fields': [
+            {'name': 'i', 'type': 'int'}, {'name': 's', 'type': 'string'},
+            {'name': 'b', 'type': 'boolean'},
+            {'name': 'n', 'type': ['null', 'int']}]}
+        valid = {'i': [1, 2, 3], 's': ['a', 'b', 'c'], 'b': [True, False, True],
+                 'n': [1, None, 3]}
+        self.assertEqual([None, None, None], [r['n'] for r in reader(io.BytesIO(
+            AvroColumns.from_columns(dict(valid, n=[None] * 3), schema).to_avro()))])
+        for name, values in (('i', [1, None, 3]), ('s', ['a', 'b', None]),
+                             ('b', [True, None, False])):
+            columns = AvroColumns.from_columns(dict(valid, **{name: values}),
+                                               schema)
+            for validate in ('eager', 'none'):
+                with self.assertRaisesRegex(ValueError, f'Column {name}: null'):
+                    columns.to_avro(validate=validate)
+
+
+class SchemaInferenceTests(unittest.TestCase):
+
+    def test_merge_types(self):
+        records = [{'id': 1, 'score': 1, 'name': 'a', 'tags': []},
+                   {'id': 1 << 40, 'score': 2.5, 'name': None,
+                    'tags': ['x', 1]},
+                   {'id': 3, 'score': 3, 'extra': True}]
+        schema = SchemaInference.infer(records, 'Rec')
+        self.assertEqual([
+            {'name': 'id', 'type': 'long'},
+            {'name': 'score', 'type': 'double'},
+            {'name': 'name', 'type': ['null', 'string'], 'default': None},
+            {'name': 'tags', 'type': ['null', {
+                'type': 'array', 'items': ['int', 'string']}],
+             'default': None},
+            {'name': 'extra', 'type': ['null', 'boolean'], 'default': None}],
+            schema['fields'])
+        batch = AvroBatch(records, schema)
+        self.assertEqual({}, batch.errors)
+
+    def test_records_and_maps(self):
+        records = [{'address': {'city': 'X', 'zip': 1},
+                    'counts': {'not-a-name': 1}},
+                   {'address': {'city': 'Y'}, 'counts': {'other key': 2}}]
+        schema = SchemaInference.infer(records, 'Rec', 'test')
+        address, counts = schema['fields']
+        self.assertEqual('record', address['type']['type'])
+        self.assertEqual(['null', 'int'], address['type']['fields'][1]['type'])
+        self.assertEqual({'type': 'map', 'values': 'int'}, counts['type'])
+        decoded = list(reader(io.BytesIO(AvroBatch(records, schema).to_avro())))
+        self.assertEqual(records[0], decoded[0])
+        self.assertIsNone(decoded[1]['address']['zip'])
+
+        schema = SchemaInference.infer(
+            [{'ids': {f'k{i}': i for i in range(10)}}], 'Rec', max_fields=5)
+        self.assertEqual('map', schema['fields'][0]['type']['type'])
+
+    def test_logical_types(self):
+        record = {'day': '2021-02-03',
+                  'id': '5f4704a7-8fa3-46bc-887f-710eba09da17',
+                  'created': datetime.datetime(2021, 2, 3, 4, 5, 6,
+                                               tzinfo=datetime.timezone.utc),
+                  'birthday': datetime.date(2000, 1, 1),
+                  'text': '2021-02-03T04:05:06'}
+        fields = {field['name']: field['type'] for field in
+                  SchemaInference.infer(record, 'Rec')['fields']}
+        self.assertEqual('date', fields['day']['logicalType'])
+        self.assertEqual('uuid', fields['id']['logicalType'])
+        self.assertEqual('timestamp-micros', fields['created']['logicalType'])
+        self.assertEqual('date', fields['birthday']['logicalType'])
+        self.assertEqual('string', fields['text'])
+
+        fields = SchemaInference.infer([{'day': '2021-02-03'},
+                                        {'day': 'tomorrow'}], 'Rec')['fields']
+        self.assertEqual('string', fields[0]['type'])
+        fields = SchemaInference.infer({'day': '2021-02-30'}, 'Rec')['fields']
+        self.assertEqual('string', fields[0]['type'])
+        fields = SchemaInference.infer(record, 'Rec',
+                                       string_formats=False)['fields']
+        self.assertEqual('string', fields[0]['type'])
+
+    def test_sampling(self):
+        records = ({'id': i} for i in range(1000))
+        inference = SchemaInference('Rec', sample_rate=0.1, seed=1)
+        self.assertLess(inference.add_many(records), 200)
+        self.assertEqual(1000, inference.seen)
+
+        inference = SchemaInference('Rec', max_records=10)
+        self.assertEqual(10, inference.add_many({'id': i} for i in range(100)))
+        self.assertTrue(inference.full)
+
+
+class AvroCodecTests(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = parse_schema({
+            'type': 'record', 'name': 'Order', 'namespace': 'avroobject.test',
+            'fields': [
+                {'name': 'id', 'type': 'long'},
+                {'name': 'note', 'type': ['null', 'string'], 'default': None},
+                {'name': 'payload', 'type': 'bytes'},
+                {'name': 'status', 'type': {'type': 'enum', 'name': 'Status',
+                                            'symbols': ['OPEN', 'CLOSED']}},
+                {'name': 'items', 'type': {'type': 'array', 'items': {
+                    'type': 'record', 'name': 'Item',
+                    'fields': [{'name': 'sku', 'type': 'string'},
+                               {'name': 'price', 'type': ['float', 'double']}]}}},
+                {'name': 'tags', 'type': {'type': 'map', 'values': 'string'}},
+                {'name': 'main', 'type': ['null', 'Item'], 'default': None},
+                {'name': 'created', 'type': {'type': 'long',
+                                             'logicalType': 'timestamp-millis'}},
+            ]})
+        self.record = {
+            'id': 1, 'note': 'fragile', 'payload': b'\x00\xff', 'status': 'OPEN',
+            'items': [{'sku': 'A-1', 'price': 9.5}], 'tags': {'a': 'b'},
+            'main': {'sku': 'A-1', 'price': 9.5},
+            'created': datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)}
+
+    def test_to_json(self):
+        codec = AvroCodec(self.schema)
+        for record in (self.record, dict(self.record, note=None, main=None)):
+            out = io.StringIO()
+            json_writer(out, self.schema, [record])
+            self.assertEqual(out.getvalue(), codec.to_json(record))
+        with self.assertRaises(ValueError):
+            codec.to_json(dict(self.record, status='LOST'))
+
+    def test_encode_decode(self):
+        codec = AvroCodec.for_schema(self.schema)
+        self.assertIs(codec, AvroCodec.for_schema(self.schema))
+        decoded = codec.decode(codec.encode(self.record))
+        self.assertEqual(self.record['items'], decoded['items'])
+        self.assertEqual(self.record['created'], decoded['created'])
+
+        single = codec.encode_single_object(self.record)
+        ao = AvroObject(single, self.schema)
+        self.assertTrue(ao.ok, ao.last_error)
+        self.assertEqual(single, ao.to_avro(single_object=True))
+
+        container = codec.to_container([self.record] * 5, block_size=2)
+        self.assertEqual(AvroReader(container).sync_marker, container[-16:])
+        other = codec.to_container([self.record] * 5, block_size=2)
+        self.assertNotEqual(container[-16:], other[-16:])
+        self.assertEqual([2, 2, 1], [block.num_records for block in
+                                     block_reader(io.BytesIO(container))])
+        self.assertEqual(5, len(list(reader(io.BytesIO(container)))))
+
+    def test_recursive(self):
+        codec = AvroCodec({'type': 'record', 'name': 'Node', 'fields': [
+            {'name': 'value', 'type': 'int'},
+            {'name': 'next', 'type': ['null', 'Node'], 'default': None}]})
+        node = {'value': 1, 'next': {'value': 2, 'next': None}}
+        self.assertEqual({'value': 1, 'next': {'Node': {'value': 2, 'next': None}}},
+                         json.loads(codec.to_json(node)))
+        self.assertEqual(node, codec.decode(codec.encode(node)))
+
+
+class InstrumentationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.events = []
+        self.observer = lambda kind, name, value: self.events.append((kind, name))
+        Instrumentation.reset()
+        Instrumentation.add_observer(self.observer)
+
+    def tearDown(self):
+        Instrumentation.disable()
+        Instrumentation.remove_observer(self.observer)
+        Instrumentation.reset()
+
+    def test_disabled(self):
+        AvroObject('./examples/delivery.json',
+                   './examples/delivery.avsc').to_avro()
+        self.assertEqual([], self.events)
+        self.assertEqual({}, Instrumentation.snapshot()['timers'])
+
+    def test_phases(self):
+        Instrumentation.enable()
+        self.assertFalse(Instrumentation.add_observer(None))
+        failing = lambda *args: 1 / 0
+        Instrumentation.add_observer(failing)
+        try:
+            ao = AvroObject('./examples/delivery.json',
+                            './examples/delivery.avsc')
+            self.assertTrue(ao.ok, ao.last_error)
+            avro_data = ao.to_avro()
+            decoded = AvroObject(avro_data)
+            self.assertTrue(decoded.ok, decoded.last_error)
+            json_data = decoded.to_json()
+            self.assertFalse(AvroObject('{', validate='none').ok)
+        finally:
+            Instrumentation.remove_observer(failing)
+
+        snapshot = Instrumentation.snapshot()
+        for phase in ('fetch_schema', 'fetch', 'json_parse', 'validate',
+                      'decode', 'to_json', 'to_avro'):
+            self.assertIn(phase, snapshot['timers'])
+            self.assertGreater(snapshot['timers'][phase]['count'], 0)
+        counters = snapshot['counters']
+        self.assertEqual(3, counters['objects'])
+        self.assertEqual(1, counters['errors'])
+        self.assertEqual(len(avro_data), counters['avro_bytes_in'])
+        self.assertEqual(len(avro_data), counters['avro_bytes_out'])
+        self.assertEqual(len(json_data), counters['json_chars_out'])
+        self.assertEqual({'schema', 'resolver', 'http'}, set(snapshot['caches']))
+        self.assertIn(('timer', 'to_avro'), self.events)
+        self.assertIn(('counter', 'records_out'), self.events)
+
+        metrics = Instrumentation.to_prometheus()
+        self.assertIn('avro_object_phase_seconds_count{phase="decode"} 1\n', metrics)
+        self.assertIn('avro_object_objects_total 3\n', metrics)
+        self.assertIn('avro_object_cache_hits_total{cache="schema"}', metrics)
+
+
+class JsonStreamTests(unittest.TestCase):
+
+    def setUp(self):
+        self.records = [{'id': i, 'name': f'Name {i}'} for i in range(50)]
+
+    def test_formats(self):
+        lines = '\n'.join(json.dumps(r) for r in self.records) + '\n\n'
+        array = json.dumps(self.records, indent=2)
+        concatenated = '\n'.join(json.dumps(r, indent=1) for r in self.records)
+        for text in (lines, array, concatenated):
+            for chunk_size in (1, 7, 1 << 16):
+                self.assertEqual(self.records, list(
+                    iter_json(io.StringIO(text), chunk_size=chunk_size)))
+        self.assertEqual([], list(iter_json(io.StringIO(' \n'))))
+
+    def test_invalid(self):
+        for text in ('[{"id": 1}', '[{"id": 1} {"id": 2}]', '{"id": 1}\n{"id":',
+                     '[1,2]\n[3,4]', '[{"a":1}] garbage', '[1,2,]', '[1, ]',
+                     '[,1]', '[1,,2]'):
+            for chunk_size in (1, 4, 1 << 16):
+                with self.assertRaises(ValueError):
+                    list(iter_json(io.StringIO(text), chunk_size=chunk_size))
+        self.assertEqual([1, 2], list(iter_json(io.StringIO('[1,2] \n'))))
+
+    def test_invalid_line(self):
+        text = '\n{"id": 1}\n\n{"id": 2}\n{"id": 3\n' + '{"id": 4}\n' * 100
+        values = iter_json(io.StringIO(text))
+        self.assertEqual([{'id': 1}, {'id': 2}], [next(values), next(values)])
+        with self.assertRaisesRegex(ValueError, 'line 5'):
+            next(values)
+
+    def test_stream_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file_name = os.path.join(tmp, 'records.jsonl')
+            with open(file_name, 'w') as f:
+                for record in self.records:
+                    f.write(json.dumps(record) + '\n')
+            success, values, origin = AvroTools.stream_json(file_name)
+            self.assertTrue(success)
+            self.assertEqual(f'file://{file_name}', origin)
+            self.assertNotIsInstance(values, list)
+            self.assertEqual(self.records, list(values))
+            self.assertEqual(self.records[:3], list(
+                islice(AvroObject.iter_json(file_name), 3)))
+
+        success, values, origin = AvroTools.stream_json('{"id": 1} {"id": 2}')
+        self.assertEqual('string', origin)
+        self.assertEqual([{'id': 1}, {'id': 2}], list(values))
+
+
+class AvroIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        schema = {
+            'namespace': 'avroobject.test',
+            'type': 'record',
+            'name': 'Person',
+            'fields': [
+                {'name': 'Name', 'type': 'string'},
+                {'name': 'Age', 'type': 'int'}
+            ]
+        }
+        self.schema = schema
+        self.records = [{'Name': f'Person {i}', 'Age': i} for i in range(100)]
+        self.avro_data = AvroBatch(self.records, schema,
+                                   block_size=7).to_avro()
+
+    def test_build(self):
+        index = AvroIndex.build(self.avro_data)
+        self.assertEqual(100, len(index))
+        self.assertEqual(15, len(index.blocks))
+        self.assertEqual([7] * 14 + [2], [block[1] for block in index.blocks])
+        self.assertEqual(len(self.avro_data),
+                         index.blocks[-1][0] + index.blocks[-1][2])
+        self.assertEqual(2, index.block_of(14))
+        with self.assertRaises(IndexError):
+            index.block_of(100)
+
+    def test_read_records(self):
+        index = AvroIndex.build(self.avro_data)
+        for start, stop in [(0, 1), (5, 9), (14, 21), (40, 100), (99, None)]:
+            self.assertEqual(self.records[start:stop],
+                             list(index.read_records(self.avro_data,
+                                                     start, stop)))
+        self.assertEqual([], list(index.read_records(self.avro_data, 50, 50)))
+
+    def test_split(self):
+        index = AvroIndex.build(self.avro_data)
+        ranges = index.split(4)
+        self.assertEqual(4, len(ranges))
+        with AvroReader(self.avro_data) as avro_reader:
+            parts = [list(avro_reader.read_range(start, end))
+                     for start, end in ranges]
+        self.assertEqual(self.records, [r for part in parts for r in part])
+        self.assertTrue(all(20 <= len(part) <= 30 for part in parts))
+
+    def test_sidecar(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file_name = os.path.join(tmp, 'people.avro')
+            with open(file_name, 'wb') as f:
+                f.write(self.avro_data)
+            index = AvroIndex.for_file(file_name)
+            self.assertTrue(os.path.isfile(file_name + '.idx'))
+            loaded = AvroIndex.for_file(file_name)
+            self.assertEqual(index.blocks, loaded.blocks)
+            self.assertEqual(index.sync_marker, loaded.sync_marker)
+            self.assertEqual(self.records[30:33],
+                             list(loaded.read_records(file_name, 30, 33)))
+
+            # Outdated index is rebuilt
+            with open(file_name, 'wb') as f:
+                f.write(self.avro_data[:index.blocks[5][0]])
+            self.assertEqual(35, len(AvroIndex.for_file(file_name)))
+
+            # Same size and sync marker, other block layout: rebuilt by mtime
+            index = AvroIndex.for_file(file_name)
+            records = self.records[:35][::-1]
+            data = AvroBatch(records, self.schema, block_size=7).to_avro()
+            data = data.replace(AvroReader(data).sync_marker, index.sync_marker)
+            self.assertEqual(index.size, len(data))
+            with open(file_name, 'wb') as f:
+                f.write(data)
+            os.utime(file_name, ns=(index.mtime + 10 ** 9,) * 2)
+            self.assertEqual(records[30:33], list(AvroIndex.for_file(
+                file_name).read_records(file_name, 30, 33)))
+
+
+class ConvertManyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.sources = []
+        for i in range(4):
+            file_name = os.path.join(self.tmp.name, f'delivery_{i}.json')
+            with open('./examples/delivery.json') as f:
+                records = [json.load(f)] * (i + 1)
+            with open(file_name, 'w') as f:
+                json.dump(records, f)
+            self.sources.append(file_name)
+        self.out_dir = os.path.join(self.tmp.name, 'out')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_process_pool(self):
+        results = convert_many(self.sources, './examples/delivery.avsc',
+                               self.out_dir, workers=2)
+        self.assertEqual(self.sources, [r['source'] for r in results])
+        for i, result in enumerate(results):
+            self.assertIsNone(result['error'])
+            self.assertEqual(i + 1, result['records'])
+            self.assertEqual(i + 1,
+                             len(list(AvroObject.iter_records(result['output']))))
+
+    def test_bad_source(self):
+        results = convert_many(self.sources[:1] + ['./examples/nothing.json'],
+                               './examples/delivery.avsc', self.out_dir,
+                               workers=1)
+        self.assertIsNone(results[0]['error'])
+        self.assertIsNotNone(results[1]['error'])
+
+    def test_bad_schema(self):
+        with self.assertRaises(ValueError):
+            convert_many(self.sources, {'anydata': False}, self.out_dir)
+
+    def test_duplicate_output(self):
+        other_dir = os.path.join(self.tmp.name, 'other')
+        os.makedirs(other_dir)
+        duplicates = [os.path.join(other_dir, 'delivery_0.json'),
+                      os.path.join(self.tmp.name, 'delivery_1.jsonl')]
+        for duplicate in duplicates:
+            with self.assertRaises(ValueError):
+                convert_many(self.sources[:2] + [duplicate],
+                             './examples/delivery.avsc', self.out_dir,
+                             workers=2)
+        self.assertFalse(os.path.exists(self.out_dir))
+
+    def test_json_lines(self):
+        source = os.path.join(self.tmp.name, 'lines.jsonl')
+        with open('./examples/delivery.json') as f:
+            record = json.load(f)
+        with open(source, 'w') as f:
+            for _ in range(5):
+                f.write(json.dumps(record) + '\n')
+            f.write('{"invalid": true}\n')
+        result = convert_many([source], './examples/delivery.avsc',
+                              self.out_dir, block_size=2)[0]
+        self.assertIsNone(result['error'])
+        self.assertEqual(5, result['records'])
+        self.assertEqual([5], list(result['errors']))
+        with open(result['output'], 'rb') as f:
+            self.assertEqual([2, 2, 1], [block.num_records
+                                         for block in block_reader(f)])
+
+    def test_codec(self):
+        results = convert_many(self.sources[:1], './examples/delivery.avsc',
+                               self.out_dir, codec='deflate')
+        with open(results[0]['output'], 'rb') as f:
+            self.assertEqual('deflate', reader(f).metadata['avro.codec'])
+        with self.assertRaises(ValueError):
+            convert_many(self.sources, './examples/delivery.avsc',
+                         self.out_dir, codec='foo')
+
+    def test_cli(self):
+        code = cli_main(['convert', '--schema', './examples/delivery.avsc',
+                         '--out-dir', self.out_dir, '--workers', '1']
+                        + self.sources)
+        self.assertEqual(0, code)
+        self.assertEqual(4, len(os.listdir(self.out_dir)))
+
+
+class SchemaHTTPHandler(BaseHTTPRequestHandler):
+    schema = json.dumps({'type': 'record', 'name': 'Person',
+                         'fields': [{'name': 'Name', 'type': 'string'}]})
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.headers.get('If-None-Match'))
+        if self.path != '/person.avsc':
+            self.send_response(404)
+            self.end_headers()
+        elif self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+        else:
+            content = self.schema.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(content)))
+            self.send_header('ETag', '"v1"')
+            self.end_headers()
+            self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HttpCacheTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), SchemaHTTPHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever,
+                                      daemon=True)
+        cls.thread.start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/person.avsc'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        SchemaHTTPHandler.requests.clear()
+
+    def test_ttl_cache(self):
+        http = HttpCache(ttl=60)
+        self.assertEqual(SchemaHTTPHandler.schema, http.get(self.url))
+        self.assertEqual(SchemaHTTPHandler.schema, http.get(self.url))
+        self.assertEqual(1, len(SchemaHTTPHandler.requests))
+        self.assertEqual(1, http.info()['hits'])
+
+    def test_conditional_request(self):
+        http = HttpCache(ttl=0)
+        http.get(self.url)
+        self.assertEqual(SchemaHTTPHandler.schema, http.get(self.url))
+        self.assertEqual([None, '"v1"'], SchemaHTTPHandler.requests)
+        self.assertEqual(1, http.info()['revalidations'])
+
+    def test_not_found(self):
+        http = HttpCache()
+        with self.assertRaises(Exception):
+            http.get(self.url.replace('person', 'nobody'))
+        self.assertEqual(0, http.info()['size'])
+
+    def test_fetch_not_found(self):
+        url = self.url.replace('person', 'nobody')
+        success, message, origin = AvroTools.fetch_json(url)
+        self.assertFalse(success)
+        self.assertIn('404', message)
+        success, message, origin = AvroTools.fetch_json_url(url)
+        self.assertEqual((False, url), (success, origin))
+
+        ao = AvroObject({'Name': 'Guionardo'}, url)
+        self.assertIsNone(ao.schema_origin)
+        self.assertIn('404', ao.last_error)
+
+    def test_async_create(self):
+        AvroTools.schema_cache.invalidate()
+        AvroTools.http.invalidate()
+
+        async def create_all():
+            with tempfile.TemporaryDirectory() as tmp:
+                sources = []
+                for i in range(5):
+                    file_name = os.path.join(tmp, f'person_{i}.json')
+                    with open(file_name, 'w') as f:
+                        json.dump({'Name': f'Person {i}'}, f)
+                    sources.append(file_name)
+                avro_file = os.path.join(tmp, 'person.avro')
+                with open(avro_file, 'wb') as f:
+                    f.write(AvroObject({'Name': 'Person 5'}, self.url).to_avro())
+                sources.append(avro_file)
+                return await asyncio.gather(
+                    *[AvroObject.create(source, self.url) for source in sources])
+
+        objects = run_async(create_all())
+        self.assertEqual(6, len(objects))
+        for i, ao in enumerate(objects):
+            self.assertTrue(ao.ok, ao.last_error)
+            self.assertEqual({'Name': f'Person {i}'}, ao.data)
+            self.assertTrue(ao.origin.startswith('file://'))
+        for ao in objects[:5]:
+            self.assertEqual(self.url, ao.schema_origin)
+
+        async def encode():
+            ao = await AvroObject.create({'Name': 'Guionardo'}, self.url)
+            return await ao.to_avro_async(container=False)
+
+        self.assertEqual(b'\x12Guionardo', run_async(encode()))
+
+    def test_async_concurrency_limit(self):
+        active = []
+        peak = []
+
+        def work():
+            active.append(1)
+            peak.append(len(active))
+            threading.Event().wait(0.01)
+            active.pop()
+
+        async def run_all():
+            await asyncio.gather(*[AvroAsync.run(work) for _ in range(10)])
+
+        concurrency = AvroAsync.concurrency
+        AvroAsync.set_concurrency(2)
+        try:
+            run_async(run_all())
+        finally:
+            AvroAsync.set_concurrency(concurrency)
+        self.assertLessEqual(max(peak), 2)
+
+    def test_schema_url_revalidation(self):
+        AvroTools.schema_cache.invalidate()
+        AvroTools.http.invalidate()
+        ttl = AvroTools.http.ttl
+        AvroTools.http.ttl = 0
+        try:
+            objects = [AvroObject({'Name': 'Guionardo'}, self.url)
+                       for _ in range(3)]
+        finally:
+            AvroTools.http.ttl = ttl
+        for ao in objects:
+            self.assertTrue(ao.ok, ao.last_error)
+            self.assertEqual(self.url, ao.schema_origin)
+        self.assertEqual([None, '"v1"', '"v1"'], SchemaHTTPHandler.requests)
+        self.assertIs(objects[0]._schema, objects[2]._schema)
+
+    def test_avro_object_schema_url(self):
+        AvroTools.schema_cache.invalidate()
+        AvroTools.http.invalidate()
+        ao = AvroObject({'Name': 'Guionardo'}, self.url)
+        self.assertTrue(ao.ok, ao.last_error)
+        self.assertEqual(self.url, ao.schema_origin)
+        self.assertIsNotNone(AvroTools.http.session)
+
+
+class RegistryHTTPHandler(BaseHTTPRequestHandler):
+    schema = json.dumps({'type': 'record', 'name': 'Person',
+                         'fields': [{'name': 'Name', 'type': 'string'},
+                                    {'name': 'Age', 'type': 'int'}]})
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        if self.path == '/schemas/ids/7':
+            body = {'schema': self.schema}
+        elif self.path == '/subjects/person-value/versions/latest':
+            body = {'subject': 'person-value', 'version': 3, 'id': 7,
+                    'schema': self.schema}
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/vnd.schemaregistry.v1+json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SchemaRegistryTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), RegistryHTTPHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever,
+                                      daemon=True)
+        cls.thread.start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        RegistryHTTPHandler.requests.clear()
+        self.registry = SchemaRegistry(self.url)
+
+    def test_schema_by_id(self):
+        schema = self.registry.get_schema(7)
+        self.assertIs(schema, self.registry.get_schema(7))
+        self.assertEqual('Person', schema['name'])
+        self.assertEqual(['/schemas/ids/7'], RegistryHTTPHandler.requests)
+
+    def test_subject(self):
+        schema_id, schema = self.registry.get_subject('person-value')
+        self.assertEqual(7, schema_id)
+        self.assertEqual((7, schema), self.registry.get_subject('person-value'))
+        self.assertIs(schema, self.registry.get_schema(7))
+        self.assertEqual(1, len(RegistryHTTPHandler.requests))
+
+        self.registry.subject_ttl = 0
+        self.registry.get_subject('person-value')
+        self.assertEqual(2, len(RegistryHTTPHandler.requests))
+
+    def test_wire_format(self):
+        ao = AvroObject({'Name': 'Guionardo', 'Age': 42}, 'registry:7')
+        self.assertIsNotNone(ao.last_error)
+
+        self.assertTrue(AvroTools.add_fetch_method(self.registry.fetch_json))
+        try:
+            ao = AvroObject({'Name': 'Guionardo', 'Age': 42},
+                            'registry:person-value')
+            self.assertTrue(ao.ok, ao.last_error)
+        finally:
+            AvroTools.reset_fetch_methods()
+
+        message = ao.to_avro(schema_id=7)
+        self.assertEqual(b'\x00\x00\x00\x00\x07', message[:5])
+        self.assertEqual(7, SchemaRegistry.schema_id(message))
+
+        aow = AvroObject(message, registry=self.registry)
+        self.assertTrue(aow.ok, aow.last_error)
+        self.assertEqual('binary_confluent', aow.origin)
+        self.assertEqual('registry:7', aow.schema_origin)
+        self.assertEqual({'Name': 'Guionardo', 'Age': 42}, aow.data)
+
+    def test_subject_ttl_schema_cache(self):
+        self.registry.subject_ttl = 0
+        self.assertTrue(AvroTools.add_fetch_method(self.registry.fetch_json))
+        try:
+            objects = [AvroObject({'Name': 'Guionardo', 'Age': 42},
+                                  'registry:person-value') for _ in range(3)]
+            by_id = [AvroObject({'Name': 'Guionardo', 'Age': 42}, 'registry:7')
+                     for _ in range(2)]
+        finally:
+            AvroTools.reset_fetch_methods()
+            AvroTools.schema_cache.invalidate('registry:7')
+        for ao in objects + by_id:
+            self.assertTrue(ao.ok, ao.last_error)
+        self.assertEqual('registry:person-value', objects[0].schema_origin)
+        self.assertIs(objects[0]._schema, objects[2]._schema)
+        self.assertEqual(3, RegistryHTTPHandler.requests.count(
+            '/subjects/person-value/versions/latest'))
+        self.assertNotIn('/schemas/ids/7', RegistryHTTPHandler.requests)
+
+    def test_datum_like_wire_format(self):
+        schema = {'type': 'record', 'name': 'Item',
+                  'fields': [{'name': 'x', 'type': 'int'},
+                             {'name': 's', 'type': 'string'}]}
+        datum = AvroObject({'x': 0, 's': 'abcd'}, schema).to_avro(container=False)
+        self.assertEqual(b'\x00\x08abcd', datum)
+        aod = AvroObject(datum, schema, datum=True, registry=self.registry)
+        self.assertTrue(aod.ok, aod.last_error)
+        self.assertEqual({'x': 0, 's': 'abcd'}, aod.data)
+        self.assertEqual([], RegistryHTTPHandler.requests)
+
+    def test_unknown_schema_id(self):
+        aow = AvroObject(b'\x00\x00\x00\x00\x08\x02', registry=self.registry)
+        self.assertFalse(aow.ok)
+        self.assertIsNotNone(aow.last_error)
+
 
 if __name__ == '__main__':
     unittest.main()